@@ -1,16 +1,35 @@
 import numpy as np
 from itertools import product
-from Graph import Node, Digraph
+from typing import Literal
+from Graph import Node, Digraph, Tree
+from Error import InvalidClusterTypeError
 
 class Cluster:
+    # Q entries neighbor joining evaluates per block of rows, small enough to stay in cache
+    _NJ_CHUNK = 1 << 15
+    
     def __init__(self, distMatrix: np.ndarray, taxa: list[str]):
         self.distMatrix = np.array(distMatrix, dtype=float)
         self.taxa = taxa
         
-    def upgma(self) -> Digraph:
+    def upgma(self, engine: Literal["python", "numpy"]="numpy", asTree: bool=False) -> Digraph | Tree:
         """Performs UPGMA on a distance matrix with corresponding taxa.
+
+        Args:
+            engine (Literal["python", "numpy"], optional): "python" rebuilds the matrix after every merge,
+                "numpy" updates it in place in O(n^2) overall. Both give the same tree. Defaults to "numpy".
+            asTree (bool, optional): Return the array-backed Tree instead of a Digraph. Defaults to False.
+
+        Returns:
+            Digraph | Tree: Rooted tree of the taxa.
         """
-        distMatrix = self.distMatrix
+        if engine == "numpy":
+            tree = self._upgmaNumpy()
+            return tree if asTree else tree.toDigraph()
+        elif engine != "python":
+            raise InvalidClusterTypeError(f"InvalidClusterTypeError: {engine} is not a valid engine")
+        
+        distMatrix = self.distMatrix.copy()
         np.fill_diagonal(distMatrix, np.inf)
         # Initialize list of node and maps of nodes -> index
         tmpNodes = [Node(taxon) for taxon in self.taxa]
@@ -28,7 +47,6 @@ class Cluster:
             
             # Merge row/col Nodes into new node, remove them and append merged node
             mergeNode = digraph.join((rowNode, colNode), tmpNodes)
-            print(f"Distance = {distance} | Merged: {rowNode} with {colNode}") # For debugging
             
             # Reinitialize list of node and maps of nodes -> index
             newMatrix = np.full((len(self.taxa)-i, len(self.taxa)-i), np.inf)
@@ -50,11 +68,282 @@ class Cluster:
             distMatrix = newMatrix
             nodeToIndex = newNodeToIndex
         
-        return digraph
+        return Tree.fromDigraph(digraph) if asTree else digraph
+    
+    @staticmethod
+    def _rowMinimum(distances: np.ndarray, order: np.ndarray) -> tuple:
+        """Minimum of a distance row and its column, ties going to the oldest cluster.
+        """
+        minimum = distances.min()
+        candidates = np.flatnonzero(distances == minimum)
+        return minimum, candidates[order[candidates].argmin()]
+    
+    def _upgmaNumpy(self) -> Tree:
+        """UPGMA updating one row/column of the distance matrix in place per merge.
+
+        Removed clusters are masked to infinity and each row caches its minimum, so a merge only rescans
+        the merged row and the rows whose cached minimum pointed at a merged cluster. Ties are broken by
+        cluster age exactly like the argmin over the rebuilt matrix of the python engine.
+        """
+        count = len(self.taxa)
+        distMatrix = self.distMatrix.copy()
+        np.fill_diagonal(distMatrix, np.inf)
+        tree = Tree(self.taxa)
+        nodes = np.arange(count) # Tree node held by each slot
+        heights = np.zeros(2*count - 1)
+        sizes = np.ones(count)
+        order = np.arange(count)
+        active = np.ones(count, dtype=bool)
+        rowMin, rowArg = np.empty(count), np.empty(count, dtype=int)
+        for row in range(count):
+            rowMin[row], rowArg[row] = Cluster._rowMinimum(distMatrix[row], order)
+        
+        for i in range(1, count):
+            # Global minimum over the row cache, the tie-break follows the python engine's row-major argmin
+            candidates = np.flatnonzero(active & (rowMin == rowMin[active].min()))
+            first = np.minimum(order[candidates], order[rowArg[candidates]])
+            second = np.maximum(order[candidates], order[rowArg[candidates]])
+            best = np.lexsort((second, first))[0]
+            row, col = candidates[best], rowArg[candidates[best]]
+            if order[row] > order[col]:
+                row, col = col, row
+            distance = distMatrix[row, col]/2
+            rowNode, colNode = nodes[row], nodes[col]
+            
+            # Merged cluster takes the row slot, the col slot is retired
+            nodes[row] = tree.join((rowNode, colNode), (distance - heights[rowNode], distance - heights[colNode]))
+            heights[nodes[row]] = distance
+            merged = (distMatrix[row]*sizes[row] + distMatrix[col]*sizes[col])/(sizes[row] + sizes[col])
+            sizes[row] += sizes[col]
+            order[row] = count + i
+            active[col] = False
+            merged[~active] = np.inf
+            merged[row] = np.inf
+            distMatrix[row], distMatrix[:, row] = merged, merged
+            distMatrix[col], distMatrix[:, col] = np.inf, np.inf
+            rowMin[col] = np.inf
+            if i == count - 1:
+                break
+            
+            rowMin[row], rowArg[row] = Cluster._rowMinimum(distMatrix[row], order)
+            stale = np.flatnonzero(active & ((rowArg == row) | (rowArg == col)))
+            for other in stale:
+                rowMin[other], rowArg[other] = Cluster._rowMinimum(distMatrix[other], order)
+            improved = active & (merged < rowMin)
+            rowMin[improved], rowArg[improved] = merged[improved], row
+        
+        return tree
     
-    def nj(self) -> Digraph:
+    @staticmethod
+    def _oldestPair(rows: np.ndarray, cols: np.ndarray, order: np.ndarray) -> tuple:
+        """Tied pair the python engine's row-major argmin would pick, ordered (older, newer).
+        """
+        first = np.minimum(order[rows], order[cols])
+        second = np.maximum(order[rows], order[cols])
+        best = np.lexsort((second, first))[0]
+        row, col = rows[best], cols[best]
+        return (row, col) if order[row] < order[col] else (col, row)
+    
+    @staticmethod
+    def _sortRow(distances: np.ndarray) -> tuple:
+        """Sorted column order of a distance row and its values rounded down to float32 for bounds.
+        """
+        columns = np.argsort(distances, kind="stable").astype(np.int32)
+        values = distances[columns]
+        bounds = values.astype(np.float32)
+        above = bounds > values
+        bounds[above] = np.nextafter(bounds[above], np.float32(-np.inf))
+        return columns, bounds
+    
+    @staticmethod
+    def _rapidPair(distMatrix: np.ndarray, sortedColumns: np.ndarray, sortedBounds: np.ndarray, start: np.ndarray,
+                   built: np.ndarray, created: np.ndarray, active: np.ndarray, totals: np.ndarray, remaining: int) -> tuple:
+        """Minimum Q entries found by scanning the sorted rows, RapidNJ style.
+
+        A row stops once (r-2)*d - T_i - max(T) for its next sorted distance exceeds the best Q so far.
+        Sorted entries of a retired cluster, or of a slot reused after the row was sorted, are skipped.
+        Leading skipped entries are dropped for good by moving the row's start.
+        """
+        count = len(distMatrix)
+        rows = np.flatnonzero(active)
+        offsets = start[rows]
+        maxTotal = totals[rows].max()
+        qMin, pairRows, pairCols = np.inf, [], []
+        width = 8
+        first = True
+        while len(rows):
+            positions = offsets[:, None] + np.arange(width)
+            inside = positions < count
+            positions = np.minimum(positions, count - 1)
+            cols = sortedColumns[rows[:, None], positions]
+            valid = inside & active[cols] & (created[cols] <= built[rows][:, None]) & (cols != rows[:, None])
+            q = np.where(valid, (remaining - 2)*distMatrix[rows[:, None], cols] - totals[rows][:, None] - totals[cols], np.inf)
+            if first:
+                leading = np.where(valid.any(axis=1), valid.argmax(axis=1), inside.sum(axis=1))
+                start[rows] += leading
+                first = False
+            
+            blockMin = q.min()
+            if blockMin < qMin:
+                qMin, pairRows, pairCols = blockMin, [], []
+            if blockMin == qMin and np.isfinite(qMin):
+                hitRows, hitCols = np.nonzero(q == qMin)
+                pairRows.append(rows[hitRows])
+                pairCols.append(cols[hitRows, hitCols])
+            
+            # Rows whose next sorted distance cannot reach the best Q are done
+            offsets = offsets + width
+            more = offsets < count
+            nextBounds = np.full(len(rows), np.inf)
+            with np.errstate(invalid="ignore"):
+                nextBounds[more] = (remaining - 2)*sortedBounds[rows[more], offsets[more]].astype(float) - totals[rows[more]] - maxTotal
+            slack = 1e-9*(np.abs(nextBounds) + abs(qMin)) if np.isfinite(qMin) else 0
+            keep = more & (nextBounds <= qMin + slack)
+            rows, offsets = rows[keep], offsets[keep]
+            width *= 2
+        return np.concatenate(pairRows), np.concatenate(pairCols)
+    
+    def _njRapid(self) -> Tree:
+        """Neighbor joining updating the distance matrix in place, with the minimum Q entries found by
+        the RapidNJ search.
+        """
+        count = len(self.taxa)
+        distMatrix = self.distMatrix.copy()
+        tree = Tree(self.taxa)
+        nodes = np.arange(count) # Tree node held by each slot
+        order = np.arange(count)
+        active = np.ones(count, dtype=bool)
+        totals = distMatrix.sum(axis=1)
+        masked = distMatrix.copy()
+        np.fill_diagonal(masked, np.inf)
+        sortedColumns = np.empty((count, count), dtype=np.int32)
+        sortedBounds = np.empty((count, count), dtype=np.float32)
+        for row in range(count):
+            sortedColumns[row], sortedBounds[row] = Cluster._sortRow(masked[row])
+        del masked
+        start = np.zeros(count, dtype=int)
+        built = np.zeros(count, dtype=int)
+        created = np.zeros(count, dtype=int)
+        
+        for i in range(1, count):
+            remaining = count - i + 1
+            if remaining <= 4:
+                # Q ties by construction here, so break them on the sums the python engine computes
+                slots = np.flatnonzero(active)
+                slots = slots[np.argsort(order[slots])]
+                totals[slots] = distMatrix[np.ix_(slots, slots)].sum(axis=1)
+            row, col = Cluster._oldestPair(*Cluster._rapidPair(distMatrix, sortedColumns, sortedBounds, start, built,
+                                                               created, active, totals, remaining), order)
+            
+            delta = (totals[row] - totals[col])/((remaining - 2) if remaining > 2 else 2)
+            distance = distMatrix[row, col]
+            
+            # Joined node takes the row slot, the col slot is retired
+            nodes[row] = tree.join((nodes[row], nodes[col]), (0.5*(distance + delta), 0.5*(distance - delta)))
+            merged = (distMatrix[row] + distMatrix[col] - distance)/2
+            active[col] = False
+            merged[~active] = 0
+            merged[row] = 0
+            totals[active] += merged[active] - distMatrix[active, row] - distMatrix[active, col]
+            totals[row] = merged.sum()
+            totals[col] = 0
+            distMatrix[row], distMatrix[:, row] = merged, merged
+            distMatrix[col], distMatrix[:, col] = 0, 0
+            order[row] = count + i
+            if remaining > 2:
+                masked = np.where(active, merged, np.inf)
+                masked[row] = np.inf
+                sortedColumns[row], sortedBounds[row] = Cluster._sortRow(masked)
+                start[row], built[row], created[row] = 0, i, i
+        
+        return tree
+    
+    def _njCompact(self) -> Tree:
+        """Neighbor joining with running row sums and the Q-matrix evaluated a few rows at a time.
+
+        The joined node takes the row slot and the col slot is retired with a row sum of -inf, which
+        makes its Q entries +inf, so no rows or columns move until a quarter of the block is retired
+        and the live slots are compacted. Ties go to the pair the python engine would pick.
+        """
+        count = len(self.taxa)
+        distMatrix = self.distMatrix.astype(float)
+        tree = Tree(self.taxa)
+        nodes = np.arange(count) # Tree node held by each slot
+        order = np.arange(count)
+        totals = distMatrix.sum(axis=1)
+        buffer = np.empty(max(count, Cluster._NJ_CHUNK))
+        
+        for i in range(1, count):
+            remaining = count - i + 1
+            size = len(totals)
+            if 4*remaining <= 3*size:
+                live = np.isfinite(totals)
+                distMatrix, totals, nodes, order = (distMatrix[np.ix_(live, live)], totals[live], nodes[live],
+                                                    order[live])
+                size = remaining
+            # Live slots in age order lay out the python engine's rebuilt matrix
+            slots = np.flatnonzero(np.isfinite(totals))
+            slots = slots[np.argsort(order[slots])]
+            if remaining <= 4:
+                # Q ties by construction here, so break them on the sums the python engine computes
+                totals[slots] = distMatrix[np.ix_(slots, slots)].sum(axis=1)
+            
+            best, rows, cols = np.inf, [], []
+            step = max(1, Cluster._NJ_CHUNK//size)
+            for low in range(0, size, step):
+                high = min(low + step, size)
+                njMatrix = buffer[:(high - low)*size].reshape(high - low, size)
+                np.multiply(distMatrix[low:high], remaining - 2, out=njMatrix)
+                njMatrix -= totals
+                njMatrix.flat[low::size + 1] = np.inf
+                # Subtracting T_i after the row minimum keeps it exact, rounding is monotone
+                rowMins = njMatrix.min(axis=1) - totals[low:high]
+                least = rowMins.min()
+                if least <= best:
+                    tiedRows = np.flatnonzero(rowMins == least)
+                    hits, tiedCols = np.nonzero(njMatrix[tiedRows] - totals[low + tiedRows, None] == least)
+                    tiedRows = tiedRows[hits]
+                    if least < best:
+                        best, rows, cols = least, [], []
+                    rows.append(tiedRows + low)
+                    cols.append(tiedCols)
+            row, col = Cluster._oldestPair(np.concatenate(rows), np.concatenate(cols), order)
+            
+            # Branch lengths use exact row sums, the running ones only pick the pair
+            rowSum, colSum = distMatrix[row, slots].sum(), distMatrix[col, slots].sum()
+            delta = (rowSum - colSum)/((remaining - 2) if remaining > 2 else 2)
+            distance = distMatrix[row, col]
+            nodes[row] = tree.join((nodes[row], nodes[col]), (0.5*(distance + delta), 0.5*(distance - delta)))
+            merged = (distMatrix[row] + distMatrix[col] - distance)/2
+            merged[~np.isfinite(totals)] = 0
+            merged[[row, col]] = 0
+            totals += merged - distMatrix[row] - distMatrix[col]
+            totals[row], totals[col] = merged.sum(), -np.inf
+            distMatrix[row], distMatrix[:, row] = merged, merged
+            distMatrix[col], distMatrix[:, col] = 0, 0
+            order[row] = count + i
+        
+        return tree
+    
+    def nj(self, engine: Literal["python", "numpy", "rapid"]="numpy", asTree: bool=False) -> Digraph | Tree:
         """Performs neighbor joining on distance matrix with corresponding taxa.
+
+        Args:
+            engine (Literal["python", "numpy", "rapid"], optional): "python" rebuilds the matrices after every
+                join, "numpy" keeps running row sums and scans the Q-matrix in cache-sized blocks of rows,
+                "rapid" also keeps sorted rows and prunes Q evaluations with an upper bound (RapidNJ).
+                Defaults to "numpy".
+            asTree (bool, optional): Return the array-backed Tree instead of a Digraph. Defaults to False.
+
+        Returns:
+            Digraph | Tree: Tree of the taxa, rooted at the last join.
         """
+        if engine in ("numpy", "rapid"):
+            tree = self._njRapid() if engine == "rapid" else self._njCompact()
+            return tree if asTree else tree.toDigraph()
+        elif engine != "python":
+            raise InvalidClusterTypeError(f"InvalidClusterTypeError: {engine} is not a valid engine")
+        
         distMatrix = self.distMatrix
         # Initialize list of node and maps of nodes -> index
         tmpNodes = [Node(taxon) for taxon in self.taxa]
@@ -64,7 +353,7 @@ class Cluster:
         # Find minimum
         for i in range(1, len(self.taxa)):
             # Set up neighbor joining matrix
-            njMatrix = np.zeros(distMatrix.shape)
+            njMatrix = np.full(distMatrix.shape, np.inf) # Diagonal never joins a node with itself
             totalDistance = distMatrix.sum(axis=1) # row sum
             for row in range(len(tmpNodes)):
                 for col in range(len(tmpNodes)):
@@ -81,7 +370,6 @@ class Cluster:
             
             # Merge row/col Nodes into new node, remove them and append merged node
             mergeNode = digraph.join((rowNode, colNode), tmpNodes)
-            print(f"Distance = {distMatrix[row, col]} +/- {delta} | Merged: {rowNode} with {colNode}") # For debugging
             
             # Reinitialize list of node and maps of nodes -> index
             newMatrix = np.zeros((len(self.taxa)-i, len(self.taxa)-i))
@@ -103,7 +391,7 @@ class Cluster:
             distMatrix = newMatrix
             nodeToIndex = newNodeToIndex
         
-        return digraph
+        return Tree.fromDigraph(digraph) if asTree else digraph
 
 
     
\ No newline at end of file
@@ -0,0 +1,216 @@
+import numpy as np
+from typing import Literal
+from Sequence import Sequence
+from Error import InvalidDistanceTypeError
+
+class Distance:
+    """Alignment free distances between sequences from their k-mer content.
+    """
+    _MULTIPLIER = np.uint64(0x100000001B3)
+    # The multiplier is odd, so it has an inverse modulo 2^64
+    _INVERSE = np.uint64(pow(0x100000001B3, -1, 1 << 64))
+    _EMPTY = np.iinfo(np.uint64).max
+
+    @staticmethod
+    def _mix(values: np.ndarray) -> np.ndarray:
+        """splitmix64 finalizer, spreads polynomial k-mer hashes uniformly over 64 bits.
+        """
+        values = values.copy()
+        values ^= values >> np.uint64(30)
+        values *= np.uint64(0xBF58476D1CE4E5B9)
+        values ^= values >> np.uint64(27)
+        values *= np.uint64(0x94D049BB133111EB)
+        values ^= values >> np.uint64(31)
+        return values
+
+    @staticmethod
+    def kmerHashes(sequence: Sequence, k: int) -> np.ndarray:
+        """64 bit hash of every k-mer of sequence, in order.
+
+        Rolling polynomial hash in O(n) for any k. With prefix sums P[i] of codes[j]*B^-j, the k-mer at i
+        hashes to B^(i+k-1)*(P[i+k] - P[i]), i.e. sum codes[i+j]*B^(k-1-j), all modulo 2^64.
+
+        Args:
+            sequence (Sequence): Sequence to hash.
+            k (int): k-mer length.
+
+        Returns:
+            np.ndarray: uint64 hashes, one per k-mer position.
+        """
+        codes = sequence.codes.astype(np.uint64)
+        if len(codes) < k:
+            return np.zeros(0, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            # powers[j] = B^j and inverses[j] = B^-j
+            powers, inverses = (np.cumprod(np.append(np.uint64(1), np.full(len(codes) - 1, base, dtype=np.uint64)))
+                                for base in (Distance._MULTIPLIER, Distance._INVERSE))
+            prefix = np.concatenate(([np.uint64(0)], np.cumsum(codes*inverses, dtype=np.uint64)))
+            return Distance._mix((prefix[k:] - prefix[:-k])*powers[k-1:])
+
+    @staticmethod
+    def sketch(sequence: Sequence, k: int, size: int) -> np.ndarray:
+        """Bottom-size MinHash sketch, the size smallest distinct k-mer hashes of sequence.
+
+        Args:
+            sequence (Sequence): Sequence to sketch.
+            k (int): k-mer length.
+            size (int): Sketch size.
+
+        Returns:
+            np.ndarray: Sorted uint64 hashes, at most size of them.
+        """
+        return np.unique(Distance.kmerHashes(sequence, k))[:size]
+
+    @staticmethod
+    def _mashDistance(jaccard: np.ndarray, k: int) -> np.ndarray:
+        with np.errstate(divide="ignore"):
+            distance = -np.log(2*jaccard/(1 + jaccard))/k
+        return np.minimum(distance, 1.0)
+
+    @staticmethod
+    def minhashMatrix(sequences: list[Sequence], k: int=16, size: int=1000) -> np.ndarray:
+        """Mash distance matrix estimated from bottom MinHash sketches.
+
+        A full sketch holds every hash of its sequence up to its largest one, so both sketches of a pair
+        hold every hash of the union up to the smaller of their largest hashes. The Jaccard index is
+        estimated on that sample, at least size hashes, which is exact when the sketches hold every k-mer.
+        Shared hashes are counted for all pairs at once, the union sizes come from one binary search per
+        sketch.
+
+        Args:
+            sequences (list[Sequence]): Sequences to compare.
+            k (int, optional): k-mer length. Defaults to 16.
+            size (int, optional): Sketch size. Defaults to 1000.
+
+        Returns:
+            np.ndarray: Symmetric distance matrix in [0, 1].
+        """
+        count = len(sequences)
+        sketches = [Distance.sketch(sequence, k, size) for sequence in sequences]
+        lengths = np.array([len(hashes) for hashes in sketches], dtype=np.int64)
+        hashes = np.concatenate(sketches + [np.zeros(0, dtype=np.uint64)])
+        owners = np.repeat(np.arange(count), lengths)
+        shared = Distance._sharedCounts(hashes, owners, count)
+
+        # Sketches short of size hold every hash of their sequence
+        largest = np.array([hashes[-1] if len(hashes) == size else Distance._EMPTY for hashes in sketches], dtype=np.uint64)
+        limits = np.minimum(largest[:, None], largest[None, :])
+        below = np.empty((count, count), dtype=np.int64)
+        for col, hashes in enumerate(sketches):
+            below[:, col] = np.searchsorted(hashes, limits[:, col], side="right")
+        union = below + below.T - shared
+        jaccard = np.divide(shared, union, out=np.zeros((count, count)), where=union > 0)
+        distMatrix = Distance._mashDistance(jaccard, k)
+        np.fill_diagonal(distMatrix, 0)
+        return distMatrix
+
+    @staticmethod
+    def _sharedCounts(hashes: np.ndarray, owners: np.ndarray, count: int) -> np.ndarray:
+        """Number of distinct hashes every pair of sequences shares, each sequence holding a hash at most once.
+
+        Returns:
+            np.ndarray: Symmetric matrix, the diagonal holding every sequence's own number of hashes.
+        """
+        order = np.lexsort((owners, hashes))
+        hashes, owners = hashes[order], owners[order]
+        _, columns, holders = np.unique(hashes, return_inverse=True, return_counts=True)
+        # A BLAS product over the presence matrix beats merging pairs unless few hashes are shared
+        if float(count)*len(holders) <= 1 << 26 and float(count)*count*len(holders) < 400*np.sum(holders.astype(np.float64)**2):
+            presence = np.zeros((count, len(holders)), dtype=np.float32)
+            presence[owners, columns] = 1
+            return np.rint(presence @ presence.T).astype(np.int64)
+        shared = np.zeros(count*count)
+        for block in Distance._sharedPairs(hashes, owners, count, np.ones(len(hashes))):
+            shared += block
+        shared = shared.reshape(count, count)
+        return (shared + shared.T).astype(np.int64) + np.diag(np.bincount(owners, minlength=count))
+
+    @staticmethod
+    def _sharedPairs(hashes: np.ndarray, owners: np.ndarray, count: int, weights: np.ndarray, flush: int=1 << 22):
+        """Yields, in bounded blocks, the summed weights of every pair of sequences sharing hashes.
+
+        Entries sorted by hash then owner put the sequences holding a hash next to each other, so the
+        pairs at offset d are the entries still equal to the one d places ahead. Each offset only keeps
+        the entries that matched at the previous one.
+
+        Returns:
+            Iterator of np.ndarray: Weights summed per pair, flattened as row*count + col with row < col.
+        """
+        pending, pendingWeights, size = [], [], 0
+        candidates = np.arange(len(hashes))
+        offset = 1
+        while len(candidates):
+            candidates = candidates[candidates + offset < len(hashes)]
+            candidates = candidates[hashes[candidates] == hashes[candidates + offset]]
+            pending.append(owners[candidates]*count + owners[candidates + offset])
+            pendingWeights.append(np.minimum(weights[candidates], weights[candidates + offset]))
+            size += len(candidates)
+            if size >= flush or not len(candidates):
+                yield np.bincount(np.concatenate(pending), weights=np.concatenate(pendingWeights), minlength=count*count)
+                pending, pendingWeights, size = [], [], 0
+            offset += 1
+
+    @staticmethod
+    def kmerMatrix(sequences: list[Sequence], k: int=4) -> np.ndarray:
+        """k-mer count distance matrix, one minus the shared k-mer count over the shorter k-mer total.
+
+        Every sequence keeps its distinct k-mers with their counts, sorted. Shared counts are merged from
+        the sequences holding each k-mer, so the cost follows the shared k-mers, not the k-mer space. When
+        nearly every k-mer is shared, e.g. short DNA k-mers, dense count rows are compared instead.
+
+        Args:
+            sequences (list[Sequence]): Sequences to compare.
+            k (int, optional): k-mer length. Defaults to 4.
+
+        Returns:
+            np.ndarray: Symmetric distance matrix in [0, 1].
+        """
+        count = len(sequences)
+        distinct = [np.unique(Distance.kmerHashes(sequence, k), return_counts=True) for sequence in sequences]
+        totals = np.array([kmerCounts.sum() for _, kmerCounts in distinct], dtype=np.int64)
+        hashes = np.concatenate([kmers for kmers, _ in distinct] + [np.zeros(0, dtype=np.uint64)])
+        owners = np.repeat(np.arange(count), [len(kmers) for kmers, _ in distinct])
+        counts = np.concatenate([kmerCounts for _, kmerCounts in distinct] + [np.zeros(0, dtype=np.int64)])
+        order = np.lexsort((owners, hashes))
+        hashes, owners, counts = hashes[order], owners[order], counts[order]
+        kmers, columns, holders = np.unique(hashes, return_inverse=True, return_counts=True)
+
+        # A pair merge touches every pair of holders of a k-mer, a dense row every k-mer of every pair
+        if 4*np.sum(holders.astype(np.float64)**2) < float(count)*count*len(kmers):
+            common = np.zeros(count*count)
+            for block in Distance._sharedPairs(hashes, owners, count, counts):
+                common += block
+            common = common.reshape(count, count)
+            common = common + common.T
+        else:
+            dense = np.zeros((count, len(kmers)), dtype=np.int32)
+            dense[owners, columns] = counts
+            common = np.zeros((count, count))
+            for row in range(count - 1):
+                common[row, row+1:] = np.minimum(dense[row], dense[row+1:]).sum(axis=1)
+            common = common + common.T
+        shorter = np.minimum(totals[:, None], totals[None, :])
+        distMatrix = 1 - np.divide(common, shorter, out=np.zeros((count, count)), where=shorter > 0)
+        np.fill_diagonal(distMatrix, 0)
+        return distMatrix
+
+    @staticmethod
+    def matrix(sequences: list[Sequence], method: Literal["kmer", "minhash"]="minhash", k: int=None, size: int=1000) -> np.ndarray:
+        """Alignment free distance matrix of sequences.
+
+        Args:
+            sequences (list[Sequence]): Sequences to compare.
+            method (Literal["kmer", "minhash"], optional): "kmer" compares exact k-mer counts, "minhash"
+                estimates the Mash distance from sketches. Defaults to "minhash".
+            k (int, optional): k-mer length, None uses 4 for "kmer" and 16 for "minhash". Defaults to None.
+            size (int, optional): Sketch size for "minhash". Defaults to 1000.
+
+        Returns:
+            np.ndarray: Symmetric distance matrix.
+        """
+        if method == "kmer":
+            return Distance.kmerMatrix(sequences, 4 if k is None else k)
+        elif method == "minhash":
+            return Distance.minhashMatrix(sequences, 16 if k is None else k, size)
+        else:
+            raise InvalidDistanceTypeError(f"InvalidDistanceTypeError: {method} is not a valid distance method")
@@ -58,4 +58,75 @@ class InvalidMatrixError(Error):
 
     def __str__(self):
         return f"{self.message}"
-    
\ No newline at end of file
+    
+class InvalidDistanceTypeError(Error):
+    """[summary]
+
+    Args:
+        Error ([type]): [description]
+    """
+    def __init__(self, message="Invalid Distance Type"):
+        super().__init__(message)
+
+    def __str__(self):
+        return f"{self.message}"
+
+class InvalidClusterTypeError(Error):
+    """[summary]
+
+    Args:
+        Error ([type]): [description]
+    """
+    def __init__(self, message="Invalid Cluster Type"):
+        super().__init__(message)
+
+    def __str__(self):
+        return f"{self.message}"
+
+class InvalidFastaError(Error):
+    """[summary]
+
+    Args:
+        Error ([type]): [description]
+    """
+    def __init__(self, message="Invalid Fasta"):
+        super().__init__(message)
+
+    def __str__(self):
+        return f"{self.message}"
+
+class InvalidNewickError(Error):
+    """[summary]
+
+    Args:
+        Error ([type]): [description]
+    """
+    def __init__(self, message="Invalid Newick"):
+        super().__init__(message)
+
+    def __str__(self):
+        return f"{self.message}"
+
+class InvalidHMMError(Error):
+    """[summary]
+
+    Args:
+        Error ([type]): [description]
+    """
+    def __init__(self, message="Invalid HMM"):
+        super().__init__(message)
+
+    def __str__(self):
+        return f"{self.message}"
+
+class InvalidModelError(Error):
+    """[summary]
+
+    Args:
+        Error ([type]): [description]
+    """
+    def __init__(self, message="Invalid Model"):
+        super().__init__(message)
+
+    def __str__(self):
+        return f"{self.message}"
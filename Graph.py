@@ -1,3 +1,4 @@
+import numpy as np
 from dataclasses import dataclass
 
 @dataclass
@@ -48,21 +49,249 @@ class Digraph:
             
         return printValue
 
-    def join(self, nodes: tuple[Node], tmpNodes: list[Node]) -> Node:
-        """Joins a tuple of nodes together
+    def join(self, nodes: tuple[Node], tmpNodes: list[Node]=None, taxon: str=None) -> Node:
+        """Joins a tuple of nodes together, replacing them by the joined node in tmpNodes when given.
+
+        The joined node is labelled "(k)", k the number of nodes in the graph, unless taxon is given,
+        so labels stay short however large the subtree below is.
         """
-        interName = ','.join([f"{node.taxon}:{node.distance}" for node in nodes])
-        interNode = Node(f"({interName})", leaves=sum([node.leaves for node in nodes]))
-        self.adjList[interNode] = []
-        for node in nodes:
-            self.adjList[interNode].append(node)
-            tmpNodes.remove(node)
-        tmpNodes.append(interNode)
+        interNode = Node(f"({len(self.adjList)})" if taxon is None else taxon, leaves=sum([node.leaves for node in nodes]))
+        self.adjList[interNode] = list(nodes)
+        if tmpNodes is not None:
+            joined = set(map(id, nodes))
+            tmpNodes[:] = [node for node in tmpNodes if id(node) not in joined]
+            tmpNodes.append(interNode)
         
         return interNode
     
+    def root(self) -> Node:
+        """Node that is no child of any other node, the last added one if there are several.
+        """
+        children = {id(child) for item in self.adjList.values() for child in item}
+        roots = [node for node in self.adjList if id(node) not in children]
+        return roots[-1]
+    
+    @staticmethod
+    def _newickName(taxon: str) -> str:
+        """Quotes taxon when it holds whitespace, quotes or Newick punctuation.
+        """
+        if any(ch.isspace() or ch in "(),:;'[]" for ch in taxon):
+            return "'" + taxon.replace("'", "''") + "'"
+        return taxon
+    
+    def toNewick(self) -> str:
+        """Serializes the tree below root into Newick, without the closing semicolon.
+
+        Walks the adjacency list with an explicit stack, so deep trees need no recursion. Only leaves
+        are named, internal node labels are left out.
+        """
+        parts = []
+        stack = [self.root()]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+            children = self.adjList[item]
+            if not children:
+                parts.append(f"{Digraph._newickName(item.taxon)}:{item.distance}")
+                continue
+            parts.append("(")
+            stack.append(f"):{item.distance}")
+            for i in range(len(children) - 1, -1, -1):
+                stack.append(children[i])
+                if i:
+                    stack.append(",")
+        
+        return "".join(parts)
+
+class Tree:
+    """Rooted tree held in flat arrays indexed by node, for phylogenies with many leaves.
+
+    Leaves are nodes 0 to leafCount - 1 and named by names, every join appends one internal node whose
+    children all have smaller indices. Children are linked through firstChild/nextSibling, so a join
+    costs O(number of children) and nothing is ever searched or removed.
+    """
+    def __init__(self, names: list[str]):
+        self.names = list(names)
+        self.leafCount = len(self.names)
+        self.size = self.leafCount
+        capacity = max(2*self.leafCount - 1, 1)
+        self.parent = np.full(capacity, -1, dtype=np.int64)
+        self.firstChild = np.full(capacity, -1, dtype=np.int64)
+        self.lastChild = np.full(capacity, -1, dtype=np.int64)
+        self.nextSibling = np.full(capacity, -1, dtype=np.int64)
+        self.length = np.zeros(capacity)
+        self.leaves = np.ones(capacity, dtype=np.int64) # Leaves below each node
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def _grow(self):
+        capacity = 2*len(self.parent)
+        for name, fill in (("parent", -1), ("firstChild", -1), ("lastChild", -1), ("nextSibling", -1), ("length", 0), ("leaves", 1)):
+            array = getattr(self, name)
+            grown = np.full(capacity, fill, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+    
+    def join(self, children: tuple[int], lengths: tuple[float]=None) -> int:
+        """Appends an internal node above children.
+
+        Args:
+            children (tuple[int]): Nodes to join, each still without parent.
+            lengths (tuple[float], optional): Branch length from each child to the new node. Defaults to None.
+
+        Returns:
+            int: Index of the joined node.
+        """
+        if self.size == len(self.parent):
+            self._grow()
+        node = self.size
+        self.size += 1
+        self.leaves[node] = 0
+        for i, child in enumerate(children):
+            self.parent[child] = node
+            if lengths is not None:
+                self.length[child] = lengths[i]
+            if self.firstChild[node] == -1:
+                self.firstChild[node] = child
+            else:
+                self.nextSibling[self.lastChild[node]] = child
+            self.lastChild[node] = child
+            self.leaves[node] += self.leaves[child]
+        
+        return node
+    
+    @property
+    def root(self) -> int:
+        """Last added node without parent.
+        """
+        return int(np.flatnonzero(self.parent[:self.size] == -1)[-1])
+    
+    def children(self, node: int) -> list[int]:
+        children = []
+        child = self.firstChild[node]
+        while child != -1:
+            children.append(int(child))
+            child = self.nextSibling[child]
+        return children
+    
+    def isLeaf(self, node: int) -> bool:
+        return node < self.leafCount
+    
+    def preorder(self, node: int=None) -> np.ndarray:
+        """Nodes below node, root included, every parent before its children.
+
+        Args:
+            node (int, optional): Subtree root, None for the tree root. Defaults to None.
+
+        Returns:
+            np.ndarray: Node indices in preorder, children in join order.
+        """
+        firstChild, nextSibling = self.firstChild.tolist(), self.nextSibling.tolist()
+        order = []
+        stack = [self.root if node is None else node]
+        while stack:
+            current = stack.pop()
+            order.append(current)
+            children = []
+            child = firstChild[current]
+            while child != -1:
+                children.append(child)
+                child = nextSibling[child]
+            stack.extend(reversed(children))
+        
+        return np.array(order, dtype=np.int64)
+    
+    def postorder(self, node: int=None) -> np.ndarray:
+        """Nodes below node, root included, every parent after its children.
+
+        Args:
+            node (int, optional): Subtree root, None for the tree root. Defaults to None.
+
+        Returns:
+            np.ndarray: Node indices in postorder, children in join order.
+        """
+        firstChild, nextSibling = self.firstChild.tolist(), self.nextSibling.tolist()
+        order = []
+        stack = [self.root if node is None else node]
+        while stack:
+            current = stack.pop()
+            order.append(current)
+            child = firstChild[current]
+            while child != -1:
+                stack.append(child)
+                child = nextSibling[child]
+        
+        # Reversed preorder with children pushed in join order visits the last child first
+        return np.array(order[::-1], dtype=np.int64)
+    
     def toNewick(self) -> str:
-        nodes = list(self.adjList.keys())
-        newickNode = max(nodes, key=len)
-        return f"{newickNode.taxon}:{newickNode.distance}"
-    
\ No newline at end of file
+        """Serializes the tree like Digraph.toNewick.
+        """
+        firstChild, nextSibling, length = self.firstChild.tolist(), self.nextSibling.tolist(), self.length.tolist()
+        parts = []
+        stack = [self.root]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+            elif item < self.leafCount:
+                parts.append(f"{Digraph._newickName(self.names[item])}:{length[item]}")
+            else:
+                parts.append("(")
+                stack.append(f"):{length[item]}")
+                children = []
+                child = firstChild[item]
+                while child != -1:
+                    children.append(child)
+                    child = nextSibling[child]
+                for i in range(len(children) - 1, -1, -1):
+                    stack.append(children[i])
+                    if i:
+                        stack.append(",")
+        
+        return "".join(parts)
+    
+    def toDigraph(self) -> Digraph:
+        """Converts into a Digraph, nodes joined in the same order as the tree.
+        """
+        nodes = [Node(name, distance=float(self.length[i])) for i, name in enumerate(self.names)]
+        digraph = Digraph(nodes)
+        for node in range(self.leafCount, self.size):
+            nodes.append(digraph.join(tuple(nodes[child] for child in self.children(node))))
+            nodes[node].distance = float(self.length[node])
+        
+        return digraph
+    
+    @staticmethod
+    def fromDigraph(digraph: Digraph) -> "Tree":
+        """Converts the tree below the root of a Digraph.
+
+        Leaves are numbered in Newick order and internal nodes in postorder, internal labels are dropped.
+
+        Args:
+            digraph (Digraph): Tree to convert.
+
+        Returns:
+            Tree: Array-backed copy of the tree.
+        """
+        root = digraph.root()
+        postorder = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            postorder.append(node)
+            stack.extend(digraph.adjList[node])
+        postorder.reverse()
+        
+        leaves = [node for node in postorder if not digraph.adjList[node]]
+        tree = Tree([node.taxon for node in leaves])
+        index = {id(node):i for i, node in enumerate(leaves)}
+        for node in postorder:
+            if id(node) not in index:
+                index[id(node)] = tree.join(tuple(index[id(child)] for child in digraph.adjList[node]))
+            tree.length[index[id(node)]] = node.distance
+        
+        return tree
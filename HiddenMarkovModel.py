@@ -1,7 +1,844 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable
+from Sequence import Sequence
 from SequenceAlignment import MSA
+from Error import InvalidHMMError
 
+@dataclass
 class HMMNode:
-    pass
+    """One state of an HMM, given by name with probabilities keyed by state name and monomer.
+    """
+    name: str
+    emissions: dict[str, float] = field(default_factory=dict)
+    transitions: dict[str, float] = field(default_factory=dict)
+    start: float = 0.0
 
 class HMM:
-    pass
\ No newline at end of file
+    """Hidden Markov model over a discrete alphabet with dense transition and emission matrices.
+
+    Sequences are scored on their integer codes. Positions are cut into about √T lanes that step through
+    time in lockstep, joined through per lane transfer matrices when the model has few states, in O(T·K)
+    memory, or O(√T·K) when checkpointed.
+    """
+    def __init__(self, start: np.ndarray, transitions: np.ndarray, emissions: np.ndarray, alphabet: list[str]=Sequence.NUCLEOTIDES,
+                 states: list[str]=None):
+        """
+        Args:
+            start (np.ndarray): start[k], probability of starting in state k.
+            transitions (np.ndarray): transitions[i, j], probability of moving from state i to state j.
+            emissions (np.ndarray): emissions[k, code], probability of state k emitting alphabet[code].
+            alphabet (list[str], optional): Emitted monomers. Defaults to Sequence.NUCLEOTIDES.
+            states (list[str], optional): State names, None numbers them. Defaults to None.
+
+        Raises:
+            InvalidHMMError: Shapes disagree or a distribution does not sum to one.
+        """
+        self.start = np.array(start, dtype=float)
+        self.transitions = np.array(transitions, dtype=float)
+        self.emissions = np.array(emissions, dtype=float)
+        self.alphabet = list(alphabet)
+        self.states = [str(state) for state in range(len(self.start))] if states is None else list(states)
+        self._validate()
+        self._index()
+
+    @staticmethod
+    def fromNodes(nodes: list[HMMNode], alphabet: list[str]=Sequence.NUCLEOTIDES) -> "HMM":
+        """Builds the dense matrices from per state dictionaries, missing entries being 0.
+
+        Args:
+            nodes (list[HMMNode]): States of the model.
+            alphabet (list[str], optional): Emitted monomers. Defaults to Sequence.NUCLEOTIDES.
+
+        Returns:
+            HMM: Model over nodes in the given order.
+        """
+        index = {node.name:k for k, node in enumerate(nodes)}
+        transitions = np.zeros((len(nodes), len(nodes)))
+        emissions = np.zeros((len(nodes), len(alphabet)))
+        for k, node in enumerate(nodes):
+            for name, probability in node.transitions.items():
+                transitions[k, index[name]] = probability
+            for monomer, probability in node.emissions.items():
+                emissions[k, alphabet.index(monomer)] = probability
+        return HMM([node.start for node in nodes], transitions, emissions, alphabet, [node.name for node in nodes])
+
+    def _validate(self):
+        count = len(self.start)
+        if self.transitions.shape != (count, count) or self.emissions.shape != (count, len(self.alphabet)):
+            raise InvalidHMMError("InvalidHMMError: start, transitions and emissions do not have matching shapes")
+        for name, distribution in (("start", self.start), ("transitions", self.transitions), ("emissions", self.emissions)):
+            if np.any(distribution < 0) or not np.allclose(distribution.sum(axis=-1), 1):
+                raise InvalidHMMError(f"InvalidHMMError: {name} rows are not probability distributions")
+        return
+
+    def _index(self):
+        """Log copies of the matrices, log(0) being -inf.
+        """
+        with np.errstate(divide="ignore"):
+            self.logStart = np.log(self.start)
+            self.logTransitions = np.log(self.transitions)
+            self.logEmissions = np.log(self.emissions)
+        self.lookup = HMM._lookup(self.alphabet)
+        return
+
+    def encode(self, sequence: Sequence | np.ndarray) -> np.ndarray:
+        """Codes of a sequence into the model alphabet.
+
+        Args:
+            sequence (Sequence | np.ndarray): Sequence, plain string or codes already in the model alphabet.
+
+        Raises:
+            InvalidHMMError: A monomer is not in the alphabet.
+
+        Returns:
+            np.ndarray: Indices into the emission columns.
+        """
+        return HMM._encode(sequence, self.alphabet, self.lookup)
+
+    @staticmethod
+    def _lookup(alphabet: list[str]) -> np.ndarray:
+        lookup = np.full(256, -1, dtype=np.intp)
+        for code, monomer in enumerate(alphabet):
+            lookup[ord(monomer)] = code
+        return lookup
+
+    @staticmethod
+    def _encode(sequence: Sequence | np.ndarray, alphabet: list[str], lookup: np.ndarray) -> np.ndarray:
+        if isinstance(sequence, np.ndarray):
+            codes = sequence.astype(np.intp)
+        elif isinstance(sequence, Sequence) and sequence.sequenceType == alphabet:
+            return sequence.codes.astype(np.intp)
+        elif isinstance(sequence, Sequence):
+            codes = lookup[[ord(monomer) for monomer in sequence.sequenceType]][sequence.codes]
+        else:
+            codes = lookup[np.frombuffer(str(sequence).encode("ascii"), dtype=np.uint8)]
+        if np.any((codes < 0) | (codes >= len(alphabet))):
+            raise InvalidHMMError("InvalidHMMError: sequence holds monomers outside the model alphabet")
+        return codes
+
+    # Up to this many states, lanes are crossed through K x K transfer matrices, all lanes at once. A
+    # sum-product transfer is one batched matmul per step, a max-plus one K passes over K x K arrays per lane
+    _TRANSFER_STATES = 48
+    _MAX_TRANSFER_STATES = 16
+    # Lanes recomputed together when checkpointed
+    _LANE_GROUP = 64
+
+    def _lanes(self, codes: np.ndarray, checkpoint: bool, limit: int) -> tuple:
+        """Splits positions 1 to T - 1 into equal lanes, position 1 + c*width + l being lanes[c, l]. The last lane
+        is padded with code len(alphabet), whose step is the identity.
+
+        Lanes are √T long when checkpointed or when at most limit states make transfer matrices cheap,
+        otherwise a single lane holds everything.
+
+        Returns:
+            tuple: Lanes and whether transfer matrices are used.
+        """
+        length = len(codes) - 1
+        small = len(self.start) <= limit
+        width = max(int(np.ceil(np.sqrt(length))), 1) if checkpoint or small else max(length, 1)
+        lanes = np.full(-(-length//width)*width, len(self.alphabet), dtype=np.intp)
+        lanes[:length] = codes[1:]
+        return lanes.reshape(-1, width), small and len(lanes) > width
+
+    @staticmethod
+    def _groups(count: int, transfer: bool, checkpoint: bool) -> list[np.ndarray]:
+        """Lanes recomputed together, all of them, _LANE_GROUP of them when checkpointed, or one at a time in
+        order without transfer matrices.
+        """
+        size = 1 if not transfer else HMM._LANE_GROUP if checkpoint else count
+        return [np.arange(start, min(start + size, count)) for start in range(0, count, size)]
+
+    def _steps(self) -> tuple:
+        """Step matrices of every code, steps[code, i, j] = transitions[i, j]*emissions[j, code], and their
+        logs, the padding code being the identity.
+        """
+        count = len(self.start)
+        steps = np.concatenate((self.transitions[None]*self.emissions.T[:, None, :], np.eye(count)[None]))
+        identity = np.where(np.eye(count, dtype=bool), 0.0, -np.inf)
+        logSteps = np.concatenate((self.logTransitions[None] + self.logEmissions.T[:, None, :], identity[None]))
+        return steps, logSteps
+
+    @staticmethod
+    def _transfer(lanes: np.ndarray, steps: np.ndarray) -> tuple:
+        """Product of the step matrices along every lane, advanced in lockstep and renormalized by its maximum.
+
+        Returns:
+            tuple: Normalized products and the log of the dropped norms.
+        """
+        count = steps.shape[1]
+        product = np.tile(np.eye(count), (len(lanes), 1, 1))
+        logNorm = np.zeros(len(lanes))
+        for l in range(lanes.shape[1]):
+            product = product @ steps[lanes[:, l]]
+            norm = product.max(axis=(1, 2))
+            if np.any(norm == 0):
+                raise InvalidHMMError("InvalidHMMError: sequence has probability 0")
+            product /= norm[:, None, None]
+            logNorm += np.log(norm)
+        return product, logNorm
+
+    @staticmethod
+    def _maxTransfer(lanes: np.ndarray, logSteps: np.ndarray) -> np.ndarray:
+        """Max-plus product of the log step matrices along every lane, the best log probability of crossing
+        the lane from state i to state j.
+        """
+        count = logSteps.shape[1]
+        product = np.tile(np.where(np.eye(count, dtype=bool), 0.0, -np.inf), (len(lanes), 1, 1))
+        result, term = np.empty(product.shape), np.empty(product.shape)
+        for l in range(lanes.shape[1]):
+            steps = logSteps[lanes[:, l]]
+            # Maximum over the middle state one state at a time, without a K x K x K array per lane
+            np.add(product[:, :, 0, None], steps[:, None, 0], out=result)
+            for k in range(1, count):
+                np.maximum(result, np.add(product[:, :, k, None], steps[:, None, k], out=term), out=result)
+            product, result = result, product
+        return product
+
+    @staticmethod
+    def _laneStarts(alpha: np.ndarray, lanes: np.ndarray, steps: np.ndarray, transfer: tuple) -> tuple:
+        """Normalized forward row before every lane and the sum of the log scales inside every lane, lanes
+        being crossed by their transfer matrix or, without one, one step at a time.
+        """
+        starts = np.empty((len(lanes), len(alpha)))
+        laneLog = np.empty(len(lanes))
+        for c in range(len(lanes)):
+            starts[c] = alpha
+            if transfer is not None:
+                alpha, log = alpha @ transfer[0][c], transfer[1][c]
+            else:
+                log = 0.0
+                for code in lanes[c]:
+                    alpha = alpha @ steps[code]
+                    total = alpha.sum()
+                    if total == 0:
+                        break
+                    alpha, log = alpha/total, log + np.log(total)
+            total = alpha.sum()
+            if total == 0:
+                raise InvalidHMMError("InvalidHMMError: sequence has probability 0")
+            alpha, laneLog[c] = alpha/total, log + np.log(total)
+        return starts, laneLog
+
+    @staticmethod
+    def _laneEnds(lanes: np.ndarray, steps: np.ndarray, transfer: tuple, laneLog: np.ndarray) -> tuple:
+        """Scaled backward row at the end of every lane, and at position 0.
+        """
+        beta = np.ones(steps.shape[1])
+        ends = np.empty((len(lanes), len(beta)))
+        for c in range(len(lanes) - 1, -1, -1):
+            ends[c] = beta
+            if transfer is not None:
+                beta, log = transfer[0][c] @ beta, transfer[1][c]
+            else:
+                log = 0.0
+                for code in lanes[c][::-1]:
+                    beta = steps[code] @ beta
+                    total = beta.sum()
+                    beta, log = beta/total, log + np.log(total)
+            beta = beta*np.exp(log - laneLog[c])
+        return ends, beta
+
+    @staticmethod
+    def _alphaRows(lanes: np.ndarray, starts: np.ndarray, steps: np.ndarray) -> tuple:
+        """Scaled forward rows and scales of lanes, in lockstep from their starting rows.
+        """
+        alpha = np.empty(lanes.shape + (steps.shape[1],))
+        scales = np.empty(lanes.shape)
+        row = starts
+        for l in range(lanes.shape[1]):
+            row = (row[:, None, :] @ steps[lanes[:, l]])[:, 0]
+            scales[:, l] = row.sum(axis=1)
+            row = row/scales[:, l, None]
+            alpha[:, l] = row
+        return alpha, scales
+
+    @staticmethod
+    def _betaRows(lanes: np.ndarray, ends: np.ndarray, scales: np.ndarray, steps: np.ndarray) -> np.ndarray:
+        """Scaled backward rows of lanes, in lockstep from their ending rows.
+        """
+        beta = np.empty(lanes.shape + (steps.shape[1],))
+        row = ends
+        for l in range(lanes.shape[1] - 1, -1, -1):
+            beta[:, l] = row
+            row = (steps[lanes[:, l]] @ row[:, :, None])[:, :, 0]/scales[:, l, None]
+        return beta
+
+    def _first(self, codes: np.ndarray) -> tuple:
+        alpha = self.start*self.emissions[:, codes[0]]
+        scale = alpha.sum()
+        if scale == 0:
+            raise InvalidHMMError("InvalidHMMError: sequence has probability 0")
+        return alpha/scale, scale
+
+    def viterbi(self, sequence: Sequence | np.ndarray, checkpoint: bool=False) -> tuple:
+        """Most probable state path, in log space.
+
+        Positions are cut into lanes advanced in lockstep. With few states, the max-plus transfer matrix of
+        every lane gives the best row before each lane and the state at each lane end, then all lanes are
+        recomputed at once with their backpointers. Otherwise, and when checkpointed, lanes are recomputed
+        one at a time from the last, so only one lane of backpointers is held.
+
+        Max-plus transfers cost K³ per symbol, so above _MAX_TRANSFER_STATES states every symbol is one
+        vectorized step over the states instead, about 25 s per million symbols whatever K.
+
+        Args:
+            sequence (Sequence | np.ndarray): Sequence to decode.
+            checkpoint (bool, optional): Use O(√T·K) instead of O(T·K) memory. Defaults to False.
+
+        Returns:
+            tuple: Path as state indices and its log probability.
+        """
+        codes = self.encode(sequence)
+        if len(codes) == 0:
+            return np.zeros(0, dtype=np.intp), 0.0
+        delta = self.logStart + self.logEmissions[:, codes[0]]
+        path = np.empty(len(codes), dtype=np.intp)
+        if len(codes) == 1:
+            path[0] = int(delta.argmax())
+            return path, float(delta[path[0]])
+        
+        _, logSteps = self._steps()
+        lanes, small = self._lanes(codes, checkpoint, HMM._MAX_TRANSFER_STATES)
+        transfer = HMM._maxTransfer(lanes, logSteps) if small else None
+        starts = np.empty((len(lanes), len(delta)))
+        for c in range(len(lanes)):
+            starts[c] = delta
+            if transfer is not None:
+                delta = (delta[:, None] + transfer[c]).max(axis=0)
+            else:
+                for code in lanes[c]:
+                    delta = (delta[:, None] + logSteps[code]).max(axis=0)
+        
+        ends = np.full(len(lanes), -1, dtype=np.intp)
+        ends[-1] = int(delta.argmax())
+        logProbability = float(delta[ends[-1]])
+        if transfer is not None:
+            for c in range(len(lanes) - 1, 0, -1):
+                ends[c-1] = int((starts[c] + transfer[c][:, ends[c]]).argmax())
+        
+        width = lanes.shape[1]
+        for group in reversed(HMM._groups(len(lanes), transfer is not None, checkpoint)):
+            block = lanes[group]
+            pointers = np.empty(block.shape + (len(delta),), dtype=np.min_scalar_type(len(delta)))
+            rows = starts[group]
+            if transfer is not None:
+                # Lanes after the first start from the state chosen at the previous lane end, so tied
+                # paths inside the lane cannot splice onto another state
+                later = group > 0
+                chosen = np.zeros(rows.shape, dtype=bool)
+                chosen[np.flatnonzero(later), ends[group[later] - 1]] = True
+                rows = np.where(chosen | ~later[:, None], rows, -np.inf)
+            for l in range(width):
+                scores = rows[:, :, None] + logSteps[block[:, l]]
+                pointers[:, l] = scores.argmax(axis=1)
+                rows = np.take_along_axis(scores, pointers[:, l][:, None].astype(np.intp), axis=1)[:, 0]
+            
+            state = ends[group]
+            positions = 1 + group[:, None]*width + np.arange(width)
+            inside = positions < len(codes)
+            for l in range(width - 1, -1, -1):
+                path[positions[inside[:, l], l]] = state[inside[:, l]]
+                state = pointers[np.arange(len(group)), l, state].astype(np.intp)
+            if group[0] > 0:
+                ends[group[0] - 1] = state[0]
+            else:
+                path[0] = state[0]
+        return path, logProbability
+
+    def forward(self, sequence: Sequence | np.ndarray) -> tuple:
+        """Scaled forward probabilities.
+
+        Args:
+            sequence (Sequence | np.ndarray): Observed sequence.
+
+        Returns:
+            tuple: alpha[t, k], P(state k at t | first t + 1 symbols), and the scales, P(symbol t | previous symbols).
+                The log-likelihood is the sum of the log scales.
+        """
+        codes = self.encode(sequence)
+        alpha = np.empty((len(codes), len(self.start)))
+        scales = np.empty(len(codes))
+        if len(codes) == 0:
+            return alpha, scales
+        alpha[0], scales[0] = self._first(codes)
+        if len(codes) > 1:
+            steps, _ = self._steps()
+            lanes, small = self._lanes(codes, False, HMM._TRANSFER_STATES)
+            starts, _ = HMM._laneStarts(alpha[0], lanes, steps, HMM._transfer(lanes, steps) if small else None)
+            rows, laneScales = HMM._alphaRows(lanes, starts, steps)
+            alpha[1:] = rows.reshape(-1, len(self.start))[:len(codes) - 1]
+            scales[1:] = laneScales.ravel()[:len(codes) - 1]
+        return alpha, scales
+
+    def backward(self, sequence: Sequence | np.ndarray, scales: np.ndarray) -> np.ndarray:
+        """Backward probabilities scaled by the forward scales.
+
+        Args:
+            sequence (Sequence | np.ndarray): Observed sequence.
+            scales (np.ndarray): Scales returned by forward.
+
+        Returns:
+            np.ndarray: beta[t, k], so that alpha*beta are the posterior state probabilities.
+        """
+        codes = self.encode(sequence)
+        beta = np.ones((len(codes), len(self.start)))
+        if len(codes) > 1:
+            steps, _ = self._steps()
+            lanes, small = self._lanes(codes, False, HMM._TRANSFER_STATES)
+            laneScales = np.ones(lanes.size)
+            laneScales[:len(codes) - 1] = scales[1:]
+            laneScales = laneScales.reshape(lanes.shape)
+            ends, beta[0] = HMM._laneEnds(lanes, steps, HMM._transfer(lanes, steps) if small else None,
+                                          np.log(laneScales).sum(axis=1))
+            beta[1:] = HMM._betaRows(lanes, ends, laneScales, steps).reshape(-1, len(self.start))[:len(codes) - 1]
+        return beta
+
+    def logLikelihood(self, sequence: Sequence | np.ndarray) -> float:
+        """Log probability of the sequence, from the forward scales of every lane in O(√T·K) memory.
+        """
+        codes = self.encode(sequence)
+        if len(codes) == 0:
+            return 0.0
+        alpha, scale = self._first(codes)
+        if len(codes) == 1:
+            return float(np.log(scale))
+        steps, _ = self._steps()
+        lanes, small = self._lanes(codes, True, HMM._TRANSFER_STATES)
+        _, laneLog = HMM._laneStarts(alpha, lanes, steps, HMM._transfer(lanes, steps) if small else None)
+        return float(np.log(scale) + laneLog.sum())
+
+    def _forwardBackward(self, codes: np.ndarray, checkpoint: bool):
+        """Yields (positions, previous, alpha, beta, scales) over groups of positions, previous being the
+        forward rows one position earlier, None for position 0 which comes last.
+
+        The rows before and after every lane come first, then the lanes are recomputed all at once, or one
+        at a time when checkpointed so only one lane of rows is held.
+        """
+        alpha, scale = self._first(codes)
+        beta = np.ones(len(alpha))
+        if len(codes) > 1:
+            steps, _ = self._steps()
+            lanes, small = self._lanes(codes, checkpoint, HMM._TRANSFER_STATES)
+            transfer = HMM._transfer(lanes, steps) if small else None
+            starts, laneLog = HMM._laneStarts(alpha, lanes, steps, transfer)
+            ends, beta = HMM._laneEnds(lanes, steps, transfer, laneLog)
+            
+            width = lanes.shape[1]
+            for group in HMM._groups(len(lanes), transfer is not None, checkpoint):
+                block = lanes[group]
+                rows, scales = HMM._alphaRows(block, starts[group], steps)
+                betaRows = HMM._betaRows(block, ends[group], scales, steps)
+                previous = np.concatenate((starts[group][:, None], rows[:, :-1]), axis=1)
+                positions = 1 + group[:, None]*width + np.arange(width)
+                inside = positions < len(codes)
+                yield positions[inside], previous[inside], rows[inside], betaRows[inside], scales[inside]
+        yield np.zeros(1, dtype=np.intp), None, alpha[None], beta[None], np.array([scale])
+
+    def posterior(self, sequence: Sequence | np.ndarray) -> np.ndarray:
+        """Posterior state probabilities by Forward/Backward.
+
+        Args:
+            sequence (Sequence | np.ndarray): Observed sequence.
+
+        Returns:
+            np.ndarray: posterior[t, k], P(state k at t | sequence).
+        """
+        codes = self.encode(sequence)
+        posterior = np.empty((len(codes), len(self.start)))
+        if len(codes):
+            for positions, _, alpha, beta, _ in self._forwardBackward(codes, False):
+                posterior[positions] = alpha*beta
+        return posterior
+
+    def posteriorDecode(self, sequence: Sequence | np.ndarray, checkpoint: bool=False) -> np.ndarray:
+        """Most probable state at every position.
+
+        Args:
+            sequence (Sequence | np.ndarray): Observed sequence.
+            checkpoint (bool, optional): Use O(√T·K) instead of O(T·K) memory. Defaults to False.
+
+        Returns:
+            np.ndarray: State index per position.
+        """
+        codes = self.encode(sequence)
+        path = np.empty(len(codes), dtype=np.intp)
+        if len(codes):
+            for positions, _, alpha, beta, _ in self._forwardBackward(codes, checkpoint):
+                path[positions] = (alpha*beta).argmax(axis=1)
+        return path
+
+    def _expectedCounts(self, codes: np.ndarray) -> tuple:
+        """E-step of one sequence.
+
+        Returns:
+            tuple: Expected start, transition and emission counts, and the log-likelihood.
+        """
+        starts = np.zeros(len(self.start))
+        transitions = np.zeros(self.transitions.shape)
+        emissions = np.zeros(self.emissions.shape)
+        logLikelihood = 0.0
+        if len(codes) == 0:
+            return starts, transitions, emissions, logLikelihood
+        for positions, previous, alpha, beta, scales in self._forwardBackward(codes, False):
+            symbols = codes[positions]
+            gamma = alpha*beta
+            if previous is None:
+                starts += gamma[0]
+            else:
+                transitions += self.transitions*(previous.T @ (self.emissions[:, symbols].T*beta/scales[:, None]))
+            for k in range(len(self.start)):
+                emissions[k] += np.bincount(symbols, weights=gamma[:, k], minlength=len(self.alphabet))
+            logLikelihood += np.log(scales).sum()
+        return starts, transitions, emissions, logLikelihood
+
+    # Longer sequences run on their own, cut into lanes, instead of being a lane of a batch
+    _BATCH_LENGTH = 1 << 12
+
+    def _batchCounts(self, encoded: list[np.ndarray]) -> tuple:
+        """E-step of many sequences summed. Short sequences are the lanes of one lockstep pass, padded to the
+        longest with the identity code.
+        """
+        counts = [self._expectedCounts(codes) for codes in encoded if len(codes) > HMM._BATCH_LENGTH]
+        batch = [codes for codes in encoded if 0 < len(codes) <= HMM._BATCH_LENGTH]
+        if batch:
+            steps, _ = self._steps()
+            firsts = np.array([codes[0] for codes in batch])
+            lanes = np.full((len(batch), max(len(codes) for codes in batch) - 1), len(self.alphabet), dtype=np.intp)
+            for lane, codes in zip(lanes, batch):
+                lane[:len(codes) - 1] = codes[1:]
+            inside = lanes < len(self.alphabet)
+            
+            alpha = self.start*self.emissions[:, firsts].T
+            scales = alpha.sum(axis=1)
+            rows, laneScales = HMM._alphaRows(lanes, alpha/scales[:, None], steps)
+            if np.any(scales == 0) or np.any(laneScales[inside] == 0):
+                raise InvalidHMMError("InvalidHMMError: sequence has probability 0")
+            betaRows = HMM._betaRows(lanes, np.ones(alpha.shape), laneScales, steps)
+            beta = (steps[lanes[:, 0]] @ betaRows[:, 0, :, None])[:, :, 0]/laneScales[:, 0, None] if lanes.shape[1] else np.ones(alpha.shape)
+            
+            gamma = alpha/scales[:, None]*beta
+            previous = np.concatenate(((alpha/scales[:, None])[:, None], rows[:, :-1]), axis=1)[inside]
+            symbols, rows, betaRows, laneScales = lanes[inside], rows[inside], betaRows[inside], laneScales[inside]
+            transitions = self.transitions*(previous.T @ (self.emissions[:, symbols].T*betaRows/laneScales[:, None]))
+            emissions = np.zeros(self.emissions.shape)
+            for k in range(len(self.start)):
+                emissions[k] = np.bincount(firsts, weights=gamma[:, k], minlength=len(self.alphabet))
+                emissions[k] += np.bincount(symbols, weights=rows[:, k]*betaRows[:, k], minlength=len(self.alphabet))
+            counts.append((gamma.sum(axis=0), transitions, emissions, np.log(scales).sum() + np.log(laneScales).sum()))
+        return HMM._sumCounts(counts) if counts else self._expectedCounts(np.zeros(0, dtype=np.intp))
+
+    _worker = {}
+
+    @staticmethod
+    def _trainInit(name: str, offsets: np.ndarray, alphabet: list[str]):
+        shared = SharedMemory(name=name)
+        HMM._worker.update(shared=shared, codes=np.ndarray((offsets[-1],), dtype=np.uint8, buffer=shared.buf),
+                           offsets=offsets, alphabet=alphabet)
+
+    @staticmethod
+    def _trainChunk(start: np.ndarray, transitions: np.ndarray, emissions: np.ndarray, first: int, last: int) -> tuple:
+        """Summed expected counts of sequences first to last - 1 under the given parameters.
+        """
+        worker = HMM._worker
+        codes, offsets = worker["codes"], worker["offsets"]
+        hmm = HMM(start, transitions, emissions, worker["alphabet"])
+        return hmm._batchCounts([codes[offsets[k]:offsets[k+1]].astype(np.intp) for k in range(first, last)])
+
+    @staticmethod
+    def _sumCounts(counts) -> tuple:
+        total = None
+        for count in counts:
+            total = count if total is None else tuple(a + b for a, b in zip(total, count))
+        return total
+
+    def _maximize(self, starts: np.ndarray, transitions: np.ndarray, emissions: np.ndarray, pseudocount: float):
+        """M-step, rows without any expected count keep their current probabilities.
+        """
+        for current, counts in ((self.start, starts), (self.transitions, transitions), (self.emissions, emissions)):
+            counts = counts + pseudocount
+            totals = counts.sum(axis=-1, keepdims=True)
+            current[...] = np.where(totals > 0, counts/np.where(totals > 0, totals, 1), current)
+        self._index()
+        return
+
+    def baumWelch(self, sequences: list[Sequence | np.ndarray], iterations: int=100, tolerance: float=1e-6, pseudocount: float=0.0,
+                  workers: int=None, chunkSize: int=64, progress: Callable[[int, float], None]=None) -> list[float]:
+        """Trains the model in place by Baum-Welch.
+
+        Every iteration spreads the E-step over a process pool in chunks of chunkSize sequences, sums the
+        expected counts of the chunks and runs one M-step. Sequences are sorted by length so the short ones
+        of a chunk run as the lanes of one batch. The encoded sequences are shared with the workers once
+        through shared memory, only the parameters travel with each chunk.
+
+        Args:
+            sequences (list[Sequence | np.ndarray]): Training sequences, e.g. from Parser.Fasta.
+            iterations (int, optional): Maximum number of iterations. Defaults to 100.
+            tolerance (float, optional): Stop once the log-likelihood gains less than this. Defaults to 1e-6.
+            pseudocount (float, optional): Added to every expected count. Defaults to 0.0.
+            workers (int, optional): Number of processes, None for every core, 1 runs serially. Defaults to None.
+            chunkSize (int, optional): Sequences per work unit. Defaults to 64.
+            progress (Callable[[int, float], None], optional): Called with (iteration, log-likelihood). Defaults to None.
+
+        Returns:
+            list[float]: Total log-likelihood of the sequences before every M-step, non decreasing.
+        """
+        encoded = sorted((self.encode(sequence) for sequence in sequences), key=len)
+        lengths = np.array([len(codes) for codes in encoded], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        chunks = [(first, min(first + chunkSize, len(encoded))) for first in range(0, len(encoded), chunkSize)]
+        workers = os.cpu_count() if workers is None else workers
+        
+        def train(eStep: Callable[[], tuple]) -> list[float]:
+            logLikelihoods = []
+            for iteration in range(iterations):
+                starts, transitions, emissions, logLikelihood = eStep()
+                logLikelihoods.append(float(logLikelihood))
+                if progress is not None:
+                    progress(iteration + 1, logLikelihoods[-1])
+                if len(logLikelihoods) > 1 and logLikelihoods[-1] - logLikelihoods[-2] < tolerance:
+                    break
+                self._maximize(starts, transitions, emissions, pseudocount)
+            return logLikelihoods
+        
+        if not encoded:
+            return []
+        if workers <= 1 or len(chunks) <= 1:
+            return train(lambda: HMM._sumCounts(self._batchCounts(encoded[first:last]) for first, last in chunks))
+        
+        shared = SharedMemory(create=True, size=max(int(offsets[-1]), 1))
+        try:
+            codes = np.ndarray((offsets[-1],), dtype=np.uint8, buffer=shared.buf)
+            for sequenceCodes, start in zip(encoded, offsets):
+                codes[start:start + len(sequenceCodes)] = sequenceCodes
+            with ProcessPoolExecutor(max_workers=workers, initializer=HMM._trainInit,
+                                     initargs=(shared.name, offsets, self.alphabet)) as executor:
+                def eStep() -> tuple:
+                    futures = [executor.submit(HMM._trainChunk, self.start, self.transitions, self.emissions, *chunk)
+                               for chunk in chunks]
+                    return HMM._sumCounts(future.result() for future in futures)
+                logLikelihoods = train(eStep)
+            del codes
+        finally:
+            shared.close()
+            shared.unlink()
+        return logLikelihoods
+
+class ProfileHMM:
+    """Profile HMM of an alignment, a match, insert and delete state per consensus column.
+
+    Node k holds M_k, I_k and D_k, node 0 being the begin state with its insert. transitions[k, a, b] moves
+    from kind a of node k, 0 match, 1 insert and 2 delete, to M_k+1, I_k or D_k+1, the match of node
+    length standing for the end. Targets are scored in bits against the background in local mode, an
+    alignment may start and end at any match state.
+    """
+    _MATCH = 0
+    _INSERT = 1
+    _DELETE = 2
+
+    def __init__(self, match: np.ndarray, insert: np.ndarray, transitions: np.ndarray, background: np.ndarray,
+                 alphabet: list[str]=Sequence.AMINO_ACIDS):
+        """
+        Args:
+            match (np.ndarray): match[k - 1, code], emission probabilities of M_k.
+            insert (np.ndarray): insert[k, code], emission probabilities of I_k.
+            transitions (np.ndarray): transitions[k, a, b], see the class docstring.
+            background (np.ndarray): Null model monomer probabilities.
+            alphabet (list[str], optional): Emitted monomers. Defaults to Sequence.AMINO_ACIDS.
+        """
+        self.match = np.asarray(match, dtype=float)
+        self.insert = np.asarray(insert, dtype=float)
+        self.transitions = np.asarray(transitions, dtype=float)
+        self.background = np.asarray(background, dtype=float)
+        self.alphabet = list(alphabet)
+        self.lookup = HMM._lookup(self.alphabet)
+        self._index()
+
+    def __len__(self) -> int:
+        return len(self.match)
+
+    @staticmethod
+    def fromMSA(msa: MSA.MSAData, alphabet: list[str]=Sequence.AMINO_ACIDS, symfrac: float=0.5, pseudocount: float=1.0) -> "ProfileHMM":
+        """Builds the profile of an alignment from its state path counts.
+
+        Columns where at least symfrac of the rows hold a monomer are match columns, the others are
+        insertions. Every row is walked through the columns in lockstep with the others, counting its
+        transitions and emissions. Inserts emit the background, the monomer frequencies of the alignment.
+
+        Args:
+            msa (MSA.MSAData): Alignment, e.g. from MSA.clustalw. '-' and '.' are gaps.
+            alphabet (list[str], optional): Monomers of the alignment. Defaults to Sequence.AMINO_ACIDS.
+            symfrac (float, optional): Smallest monomer fraction of a match column. Defaults to 0.5.
+            pseudocount (float, optional): Prior weight of every row, spread over the monomers by background and
+                evenly over the allowed moves, must be positive. Defaults to 1.0.
+
+        Raises:
+            InvalidHMMError: Rows differ in length, hold monomers outside alphabet, no column is a match
+                column or pseudocount is not positive.
+
+        Returns:
+            ProfileHMM: Profile of the alignment.
+        """
+        if pseudocount <= 0:
+            raise InvalidHMMError("InvalidHMMError: pseudocount must be positive")
+        if len(set(map(len, msa.alignments))) != 1:
+            raise InvalidHMMError("InvalidHMMError: alignment rows differ in length")
+        symbols = len(alphabet)
+        lookup = HMM._lookup(alphabet)
+        lookup[[ord('-'), ord('.')]] = symbols
+        text = np.frombuffer("".join(msa.alignments).upper().encode("ascii"), dtype=np.uint8)
+        codes = lookup[text].reshape(len(msa.alignments), -1)
+        if np.any(codes < 0):
+            raise InvalidHMMError("InvalidHMMError: alignment holds monomers outside the alphabet")
+        residue = codes < symbols
+        isMatch = residue.mean(axis=0) >= symfrac
+        length = int(isMatch.sum())
+        if length == 0:
+            raise InvalidHMMError("InvalidHMMError: alignment has no match column")
+
+        counts = np.zeros((length + 1, 3, 3))
+        match = np.zeros((length + 1, symbols))
+        state = np.full(len(codes), ProfileHMM._MATCH)
+        node = 0
+        for column, present, consensus in zip(codes.T, residue.T, isMatch):
+            if consensus:
+                moved = np.where(present, ProfileHMM._MATCH, ProfileHMM._DELETE)
+                counts[node] += np.bincount(state*3 + moved, minlength=9).reshape(3, 3)
+                node += 1
+                match[node] += np.bincount(column[present], minlength=symbols)
+                state = moved
+            else:
+                counts[node] += np.bincount(state[present]*3 + ProfileHMM._INSERT, minlength=9).reshape(3, 3)
+                state[present] = ProfileHMM._INSERT
+        counts[length] += np.bincount(state*3 + ProfileHMM._MATCH, minlength=9).reshape(3, 3)
+
+        # D_0 does not exist and D_length + 1 neither
+        allowed = np.ones(counts.shape, dtype=bool)
+        allowed[0, ProfileHMM._DELETE] = False
+        allowed[length, :, ProfileHMM._DELETE] = False
+        moves = allowed.sum(axis=2, keepdims=True)
+        counts = np.where(allowed, counts + pseudocount/np.maximum(moves, 1), 0)
+        totals = counts.sum(axis=2, keepdims=True)
+        transitions = counts/np.where(totals > 0, totals, 1)
+        
+        background = np.bincount(codes[residue], minlength=symbols) + pseudocount/symbols
+        background = background/background.sum()
+        match = match[1:] + pseudocount*background
+        match = match/match.sum(axis=1, keepdims=True)
+        return ProfileHMM(match, np.tile(background, (length + 1, 1)), transitions, background, alphabet)
+
+    def _index(self):
+        """Log-odds in bits. Rows of matchScore and insertScore are codes, the last one padding, columns are
+        nodes. Local mode leaves out I_0 and I_length, which would only pad the ends.
+        """
+        length, symbols = self.match.shape
+        with np.errstate(divide="ignore"):
+            self.matchScore = np.full((symbols + 1, length + 1), -np.inf)
+            self.matchScore[:symbols, 1:] = np.log2(self.match/self.background).T
+            self.insertScore = np.full((symbols + 1, length + 1), -np.inf)
+            self.insertScore[:symbols, 1:length] = np.log2(self.insert[1:length]/self.background).T
+            self.logTransitions = np.log2(self.transitions)
+        # Delete to delete moves summed from D_2, the first delete reachable locally, so chains are prefix maxima
+        self.deleteChain = np.concatenate(([0.0], np.cumsum(self.logTransitions[2:length, ProfileHMM._DELETE, ProfileHMM._DELETE])))
+        return
+
+    def encode(self, sequence: Sequence | np.ndarray) -> np.ndarray:
+        """Codes of a sequence into the profile alphabet, see HMM.encode.
+        """
+        return HMM._encode(sequence, self.alphabet, self.lookup)
+
+    def _batches(self, targets: list[Sequence | np.ndarray], batchSize: int):
+        """Yields target indices and their codes padded into lanes, targets of similar length together.
+        """
+        encoded = [self.encode(target) for target in targets]
+        order = np.argsort([len(codes) for codes in encoded], kind="stable")
+        for first in range(0, len(order), batchSize):
+            batch = order[first:first + batchSize]
+            lanes = np.full((len(batch), max([len(encoded[k]) for k in batch] + [0])), len(self.alphabet), dtype=np.intp)
+            for lane, k in zip(lanes, batch):
+                lane[:len(encoded[k])] = encoded[k]
+            yield batch, lanes
+
+    def msv(self, targets: list[Sequence | np.ndarray], batchSize: int=256) -> np.ndarray:
+        """Best ungapped local alignment score of every target, match states only.
+
+        The path is a valid Viterbi path, so the score never exceeds ProfileHMM.viterbi, at a fraction of
+        its cost.
+
+        Args:
+            targets (list[Sequence | np.ndarray]): Sequences to score.
+            batchSize (int, optional): Targets advanced in lockstep. Defaults to 256.
+
+        Returns:
+            np.ndarray: Bit scores in target order.
+        """
+        scores = np.full(len(targets), -np.inf)
+        step = self.logTransitions[:-1, ProfileHMM._MATCH, ProfileHMM._MATCH]
+        for batch, lanes in self._batches(targets, batchSize):
+            rows = np.full((len(lanes), len(self) + 1), -np.inf)
+            best = np.full(len(lanes), -np.inf)
+            for codes in lanes.T:
+                rows[:, 1:] = self.matchScore[codes, 1:] + np.maximum(rows[:, :-1] + step, 0)
+                best = np.maximum(best, rows.max(axis=1))
+            scores[batch] = best
+        return scores
+
+    def viterbi(self, targets: list[Sequence | np.ndarray], batchSize: int=256) -> np.ndarray:
+        """Best local Viterbi score of every target against the profile.
+
+        Targets are sorted by length and cut into batches that go through their positions in lockstep,
+        every step updating all nodes of all targets at once. Match and insert rows only need the previous
+        position, the delete chain along the nodes is one prefix maximum.
+
+        Args:
+            targets (list[Sequence | np.ndarray]): Sequences to score.
+            batchSize (int, optional): Targets advanced in lockstep. Defaults to 256.
+
+        Returns:
+            np.ndarray: Bit scores in target order.
+        """
+        length = len(self)
+        logTransitions = [[self.logTransitions[:, a, b] for b in range(3)] for a in range(3)]
+        (mm, mi, md), (im, ii, id), (dm, di, dd) = logTransitions
+        scores = np.full(len(targets), -np.inf)
+        for batch, lanes in self._batches(targets, batchSize):
+            match = np.full((len(lanes), length + 1), -np.inf)
+            insert = np.full(match.shape, -np.inf)
+            delete = np.full(match.shape, -np.inf)
+            best = np.full(len(lanes), -np.inf)
+            for codes in lanes.T:
+                entered = np.maximum(np.maximum(match[:, :-1] + mm[:-1], insert[:, :-1] + im[:-1]), delete[:, :-1] + dm[:-1])
+                insert = self.insertScore[codes] + np.maximum(np.maximum(match + mi, insert + ii), delete + di)
+                match[:, 1:] = self.matchScore[codes, 1:] + np.maximum(entered, 0)
+                opened = np.maximum(match[:, 1:-1] + md[1:-1], insert[:, 1:-1] + id[1:-1]) - self.deleteChain
+                delete[:, 2:] = np.maximum.accumulate(opened, axis=1) + self.deleteChain
+                best = np.maximum(best, match.max(axis=1))
+            scores[batch] = best
+        return scores
+
+    def search(self, targets: list[Sequence | np.ndarray], pValue: float=1e-3, msvPValue: float=0.02,
+               batchSize: int=256) -> list[tuple[int, float]]:
+        """Homology search of many targets, MSV prefilter first and full Viterbi on the survivors.
+
+        P-values are the rough Karlin-Altschul estimate len(profile)*len(target)*2^-score.
+
+        Args:
+            targets (list[Sequence | np.ndarray]): Database to scan.
+            pValue (float, optional): Largest Viterbi P-value reported. Defaults to 1e-3.
+            msvPValue (float, optional): Largest MSV P-value passed to Viterbi. Defaults to 0.02.
+            batchSize (int, optional): Targets advanced in lockstep. Defaults to 256.
+
+        Returns:
+            list[tuple[int, float]]: (target index, Viterbi bit score) of the hits, best first.
+        """
+        lengths = np.array([len(self.encode(target)) for target in targets], dtype=float)
+        def pValues(scores, lengths):
+            return np.minimum(len(self)*lengths*np.exp2(-scores), 1.0)
+        survivors = np.flatnonzero(pValues(self.msv(targets, batchSize), lengths) <= msvPValue)
+        scores = self.viterbi([targets[k] for k in survivors], batchSize)
+        hits = np.flatnonzero(pValues(scores, lengths[survivors]) <= pValue)
+        order = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(survivors[k]), float(scores[k])) for k in order]
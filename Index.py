@@ -0,0 +1,182 @@
+import json
+import os
+import numpy as np
+from Sequence import Sequence
+from Error import InvalidSequenceError
+
+class FMIndex:
+    """FM-index of a sequence for repeated count and locate queries.
+
+    Holds the BWT, occurrence counts sampled every occRate rows and suffix array values sampled every
+    saRate text positions. Saved indexes are a directory of .npy files loaded back memory mapped.
+    """
+    FILES = ("bwt", "less", "occ", "marked", "markedRank", "samples")
+
+    def __init__(self, bwt: np.ndarray, less: np.ndarray, occ: np.ndarray, marked: np.ndarray,
+                 markedRank: np.ndarray, samples: np.ndarray, occRate: int, saRate: int, sequenceType: list):
+        self.bwt = bwt
+        self.less = less
+        self.occ = occ
+        self.marked = marked
+        self.markedRank = markedRank
+        self.samples = samples
+        self.occRate = occRate
+        self.saRate = saRate
+        self.sequenceType = sequenceType
+
+    def __len__(self) -> int:
+        return len(self.bwt) - 1
+
+    @staticmethod
+    def suffixArray(codes: np.ndarray) -> np.ndarray:
+        """Suffix array of codes followed by a sentinel, by prefix doubling over NumPy sorts.
+
+        Args:
+            codes (np.ndarray): Text as integer codes.
+
+        Returns:
+            np.ndarray: Start of every suffix in sorted order, the sentinel suffix first.
+        """
+        length = len(codes) + 1
+        rank = np.append(np.asarray(codes, dtype=np.int64) + 1, 0)
+        order = np.argsort(rank, kind="stable")
+        step = 1
+        while step < length:
+            second = np.full(length, -1, dtype=np.int64)
+            second[:length-step] = rank[step:]
+            order = np.lexsort((second, rank))
+            changed = (rank[order][1:] != rank[order][:-1]) | (second[order][1:] != second[order][:-1])
+            rank = np.empty(length, dtype=np.int64)
+            rank[order] = np.concatenate(([0], np.cumsum(changed)))
+            if rank[order[-1]] == length - 1:
+                break
+            step *= 2
+        return order
+
+    @staticmethod
+    def build(sequence: Sequence, occRate: int=64, saRate: int=32) -> "FMIndex":
+        """Builds the index of a sequence.
+
+        Args:
+            sequence (Sequence): Reference to index.
+            occRate (int, optional): Rows between occurrence checkpoints. Defaults to 64.
+            saRate (int, optional): Text positions between suffix array samples. Defaults to 32.
+
+        Returns:
+            FMIndex: Index of sequence.
+        """
+        codes = sequence.codes
+        suffixes = FMIndex.suffixArray(codes)
+        # BWT over codes shifted by one, the sentinel is 0
+        text = np.append(codes.astype(np.uint8) + 1, np.uint8(0))
+        bwt = text[suffixes - 1]
+        sigma = len(sequence.sequenceType) + 1
+
+        counts = np.bincount(bwt, minlength=sigma)
+        less = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+        # Checkpoint b counts every symbol in bwt[:b*occRate]
+        checkpoints = np.zeros((len(bwt)//occRate + 1, sigma), dtype=np.int64)
+        for symbol in range(sigma):
+            checkpoints[1:, symbol] = np.cumsum(bwt == symbol)[occRate-1::occRate]
+
+        marked = suffixes % saRate == 0
+        markedRank = np.concatenate(([0], np.cumsum(marked)[occRate-1::occRate])).astype(np.int64)
+        samples = suffixes[marked].astype(np.int64)
+        return FMIndex(bwt, less, checkpoints, marked, markedRank, samples, occRate, saRate, sequence.sequenceType)
+
+    def _occ(self, symbols: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Occurrences of symbols in bwt[:rows], from the checkpoint plus at most occRate BWT symbols.
+        """
+        blocks = rows//self.occRate
+        window = blocks[:, None]*self.occRate + np.arange(self.occRate)
+        inside = window < rows[:, None]
+        window = np.minimum(window, len(self.bwt) - 1)
+        partial = ((self.bwt[window] == symbols[:, None]) & inside).sum(axis=1)
+        return self.occ[blocks, symbols] + partial
+
+    def _range(self, pattern: str) -> tuple:
+        """Backward search, BWT rows [low, high) of the suffixes starting with pattern.
+        """
+        lookup = {monomer:code + 1 for code, monomer in enumerate(self.sequenceType)}
+        low, high = 0, len(self.bwt)
+        for monomer in reversed(pattern.upper()):
+            if monomer not in lookup:
+                raise InvalidSequenceError(f"InvalidSequenceError: {monomer} is not valid")
+            symbol = np.array([lookup[monomer]]*2)
+            low, high = self.less[symbol[0]] + self._occ(symbol, np.array([low, high]))
+            if low >= high:
+                return 0, 0
+        return int(low), int(high)
+
+    def count(self, pattern: str) -> int:
+        """Number of occurrences of pattern, in O(len(pattern)).
+
+        Args:
+            pattern (str): Pattern to count.
+
+        Returns:
+            int: Number of, possibly overlapping, occurrences.
+        """
+        low, high = self._range(pattern)
+        return high - low
+
+    def locate(self, pattern: str) -> np.ndarray:
+        """Start positions of pattern, walking LF from every matching row to a sampled suffix.
+
+        Args:
+            pattern (str): Pattern to find.
+
+        Returns:
+            np.ndarray: Sorted start positions of the, possibly overlapping, occurrences.
+        """
+        low, high = self._range(pattern)
+        rows = np.arange(low, high)
+        steps = np.zeros(len(rows), dtype=np.int64)
+        positions = np.empty(len(rows), dtype=np.int64)
+        pending = np.arange(len(rows))
+        while len(pending):
+            current = rows[pending]
+            found = self.marked[current]
+            hits, current = pending[found], current[found]
+            ranks = self.markedRank[current//self.occRate] + self._countMarked(current)
+            positions[hits] = self.samples[ranks] + steps[hits]
+            pending = pending[~found]
+            symbols = self.bwt[rows[pending]].astype(np.int64)
+            rows[pending] = self.less[symbols] + self._occ(symbols, rows[pending])
+            steps[pending] += 1
+        return np.sort(positions)
+
+    def _countMarked(self, rows: np.ndarray) -> np.ndarray:
+        window = (rows//self.occRate)[:, None]*self.occRate + np.arange(self.occRate)
+        inside = window < rows[:, None]
+        return (self.marked[np.minimum(window, len(self.marked) - 1)] & inside).sum(axis=1)
+
+    def save(self, path: str):
+        """Saves the index as a directory of .npy files and a JSON header.
+
+        Args:
+            path (str): Directory to write, created when missing.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in FMIndex.FILES:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "index.json"), 'w') as file:
+            json.dump({"occRate": self.occRate, "saRate": self.saRate, "sequenceType": self.sequenceType}, file)
+
+    @staticmethod
+    def load(path: str, mmap: bool=True) -> "FMIndex":
+        """Loads an index saved by FMIndex.save.
+
+        Args:
+            path (str): Directory of the index.
+            mmap (bool, optional): Memory map the arrays so processes share the page cache instead of
+                reading them in. Defaults to True.
+
+        Returns:
+            FMIndex: The loaded index.
+        """
+        with open(os.path.join(path, "index.json"), 'r') as file:
+            header = json.load(file)
+        sequenceType = Sequence.NUCLEOTIDES if header["sequenceType"] == Sequence.NUCLEOTIDES else Sequence.AMINO_ACIDS
+        arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None) for name in FMIndex.FILES]
+        return FMIndex(*arrays, header["occRate"], header["saRate"], sequenceType)
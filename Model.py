@@ -1,7 +1,11 @@
+import os
 import numpy as np
 import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
 from scipy.integrate import odeint
 from typing import Callable
+from Error import InvalidModelError
 
 class Model:
     """
@@ -36,19 +40,120 @@ class Model:
         return
     
     def Behavior(self, model: Callable, x0: list,
-                 start: float, end: float, step: float):
-        
+                 start: float, end: float, step: float, plot: bool=True) -> np.ndarray:
+        """Simulates one run of model, see Model.Sweep for many.
+
+        Args:
+            model (Callable): Derivative model(x, t) in the odeint convention.
+            x0 (list): Initial concentrations.
+            start (float): First time point.
+            end (float): End of the time points, excluded.
+            step (float): Time step.
+            plot (bool, optional): Plot the run with Model.PlotBehavior. Defaults to True.
+
+        Returns:
+            np.ndarray: simulation[time, species].
+        """
         time = np.arange(start, end, step)
         simulation = odeint(model, x0, time)
+        if plot:
+            Model.PlotBehavior(time, simulation)
+        return simulation
+    
+    @staticmethod
+    def PlotBehavior(time: np.ndarray, simulation: np.ndarray, runs: list[int]=None):
+        """Plots concentrations over time, of one run or of runs of a sweep.
+
+        Args:
+            time (np.ndarray): Time points.
+            simulation (np.ndarray): simulation[time, species] or simulation[run, time, species].
+            runs (list[int], optional): Runs of a sweep to plot, None for all. Defaults to None.
+        """
+        simulation = np.asarray(simulation)
+        sweep = simulation.ndim == 3
+        simulation = simulation if sweep else simulation[None]
+        runs = range(len(simulation)) if runs is None else runs
         
         plt.figure()
         plt.xlabel("Time")
         plt.ylabel("Concentration")
         plt.title("System Behavior")
-        for i in range(len(simulation[:,])):
-            plt.plot(time, simulation[:, i], linewidth=1.5, label=f"S{i+1}")
+        for run in runs:
+            for i in range(simulation.shape[2]):
+                label = f"S{i+1} run {run}" if sweep else f"S{i+1}"
+                plt.plot(time, simulation[run, :, i], linewidth=1.5, label=label)
         return
     
+    @staticmethod
+    def Grid(initials: list, rates: list) -> tuple:
+        """Every combination of initial conditions and rate parameters.
+
+        Args:
+            initials (list): Initial concentration vectors.
+            rates (list): Rate parameter vectors, passed to the model after x and t.
+
+        Returns:
+            tuple: initials[run] and rates[run], runs ordered by initial condition then rates.
+        """
+        pairs = list(product(range(len(initials)), range(len(rates))))
+        initials, rates = np.asarray(initials, dtype=float), np.asarray(rates, dtype=float)
+        return initials[[i for i, _ in pairs]].reshape(len(pairs), -1), rates[[j for _, j in pairs]].reshape(len(pairs), -1)
+    
+    @staticmethod
+    def _simulate(model: Callable, x0: np.ndarray, time: np.ndarray, rates: np.ndarray) -> np.ndarray:
+        return odeint(model, x0, time, args=tuple(rates))
+    
+    @staticmethod
+    def Sweep(model: Callable, initials: np.ndarray, rates: np.ndarray,
+              start: float, end: float, step: float,
+              vectorized: bool=False, workers: int=None, chunkSize: int=16) -> np.ndarray:
+        """Simulates model over many initial conditions and rate parameters without plotting.
+
+        Runs either spread over a process pool, model being picklable like a module level function,
+        or integrate as one stacked system when vectorized. A vectorized model takes x as
+        x[species, run] and every rate as an array over the runs, and returns dx in the shape of x.
+        The stacked system takes the steps its stiffest run needs.
+
+        Args:
+            model (Callable): Derivative model(x, t, *rates) in the odeint convention.
+            initials (np.ndarray): initials[run, species], a single row being shared by every run.
+            rates (np.ndarray): rates[run, parameter], a single row being shared by every run.
+            start (float): First time point.
+            end (float): End of the time points, excluded.
+            step (float): Time step.
+            vectorized (bool, optional): Integrate one stacked system. Defaults to False.
+            workers (int, optional): Number of processes, None for every core, 1 runs serially. Defaults to None.
+            chunkSize (int, optional): Runs per work unit. Defaults to 16.
+
+        Raises:
+            InvalidModelError: initials and rates disagree on the number of runs.
+
+        Returns:
+            np.ndarray: simulation[run, time, species].
+        """
+        initials = np.atleast_2d(np.asarray(initials, dtype=float))
+        rates = np.asarray(rates, dtype=float)
+        rates = rates.reshape(1, -1) if rates.ndim < 2 else rates
+        runs = max(len(initials), len(rates))
+        if {len(initials), len(rates)} - {1, runs}:
+            raise InvalidModelError("InvalidModelError: initials and rates hold different numbers of runs")
+        initials = np.broadcast_to(initials, (runs, initials.shape[1]))
+        rates = np.broadcast_to(rates, (runs, rates.shape[1]))
+        time = np.arange(start, end, step)
+        species = initials.shape[1]
+        
+        if vectorized:
+            def stacked(x, t):
+                return np.asarray(model(x.reshape(runs, species).T, t, *rates.T)).T.ravel()
+            return odeint(stacked, initials.ravel(), time).reshape(len(time), runs, species).transpose(1, 0, 2)
+        
+        workers = os.cpu_count() if workers is None else workers
+        if workers <= 1 or runs <= 1:
+            return np.stack([Model._simulate(model, x0, time, parameters) for x0, parameters in zip(initials, rates)])
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            simulations = executor.map(Model._simulate, [model]*runs, initials, [time]*runs, rates, chunksize=chunkSize)
+            return np.stack(list(simulations))
+    
     def Nullcline(self):
         pass
     
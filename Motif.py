@@ -0,0 +1,132 @@
+import numpy as np
+from itertools import product
+from Sequence import Sequence, NTSequence
+from Error import InvalidSequenceError
+
+class MotifSearch:
+    """Aho-Corasick automaton over nucleotide motifs, compiled once and reusable across sequences.
+
+    Degenerate IUPAC bases are expanded into concrete motifs and the reverse complement of every motif
+    is added, so one scan of the forward strand finds matches on both strands.
+    """
+    IUPAC = {
+        'A': "A", 'C': "C", 'G': "G", 'T': "T", 'U': "T",
+        'R': "AG", 'Y': "CT", 'S': "CG", 'W': "AT", 'K': "GT", 'M': "AC",
+        'B': "CGT", 'D': "AGT", 'H': "ACT", 'V': "ACG", 'N': "ACGT"
+    }
+
+    def __init__(self, patterns: list[str]):
+        """Compiles patterns into a dense transition table.
+
+        Args:
+            patterns (list[str]): Motifs, possibly with IUPAC degenerate bases.
+
+        Raises:
+            InvalidSequenceError: A motif is empty or holds a character outside the IUPAC alphabet.
+        """
+        self.patterns = list(dict.fromkeys(pattern.upper() for pattern in patterns))
+        # Concrete motifs as (pattern index, strand, length), strand 0 forward and 1 reverse
+        motifs, keywords = [], []
+        for index, pattern in enumerate(self.patterns):
+            if not pattern or any(base not in MotifSearch.IUPAC for base in pattern):
+                raise InvalidSequenceError(f"InvalidSequenceError: {pattern} is not a valid motif")
+            for bases in product(*(MotifSearch.IUPAC[base] for base in pattern)):
+                codes = [Sequence.NUCLEOTIDES.index(base) for base in bases]
+                motifs.append((index, 0, len(codes)))
+                keywords.append(codes)
+                motifs.append((index, 1, len(codes)))
+                keywords.append([3 - code for code in reversed(codes)])
+        self._motifs = np.array(motifs, dtype=np.int64).reshape(-1, 3)
+        self.maxLength = max(len(keyword) for keyword in keywords)
+        self._build(keywords)
+
+    def _build(self, keywords: list[list[int]]):
+        """Builds the trie, then resolves failure links breadth first into a full DFA.
+        """
+        goto = [[-1]*4]
+        outputs = [[]]
+        for motif, keyword in enumerate(keywords):
+            state = 0
+            for code in keyword:
+                if goto[state][code] == -1:
+                    goto[state][code] = len(goto)
+                    goto.append([-1]*4)
+                    outputs.append([])
+                state = goto[state][code]
+            outputs[state].append(motif)
+
+        fail = [0]*len(goto)
+        queue = []
+        for code in range(4):
+            if goto[0][code] == -1:
+                goto[0][code] = 0
+            else:
+                queue.append(goto[0][code])
+        for state in queue:
+            for code in range(4):
+                child = goto[state][code]
+                if child == -1:
+                    goto[state][code] = goto[fail[state]][code]
+                else:
+                    fail[child] = goto[fail[state]][code]
+                    outputs[child] = outputs[child] + outputs[fail[child]]
+                    queue.append(child)
+
+        self._goto = np.array(goto, dtype=np.int32)
+        self._outputStart = np.concatenate(([0], np.cumsum([len(output) for output in outputs]))).astype(np.int64)
+        self._outputs = np.array([motif for output in outputs for motif in output], dtype=np.int64)
+        self._hasOutput = np.diff(self._outputStart) > 0
+
+    def search(self, sequence: NTSequence, lanes: int=1024) -> dict[str, dict[str, np.ndarray]]:
+        """Finds every, possibly overlapping, occurrence of the motifs on both strands.
+
+        The sequence is cut into lanes overlapping by maxLength - 1 bases that run through the
+        automaton in lockstep, one NumPy gather per base position.
+
+        Args:
+            sequence (NTSequence): Sequence to scan.
+            lanes (int, optional): Maximum number of chunks scanned together. Defaults to 1024.
+
+        Returns:
+            dict[str, dict[str, np.ndarray]]: pattern -> "forward" and "reverse" sorted start positions.
+                Reverse positions index the reverse complement, like findFRSubsequence.
+        """
+        codes = sequence.codes
+        length = len(codes)
+        overlap = self.maxLength - 1
+        step = max(-(-length//lanes), 1)
+        starts = np.arange(0, length, step)
+        begins = np.maximum(starts - overlap, 0)
+        ends = np.minimum(starts + step, length)
+        width = int((ends - begins).max()) if len(starts) else 0
+        # Lanes padded past the end of the sequence stay in state 0 through a sentinel column
+        goto = np.hstack((self._goto, np.zeros((len(self._goto), 1), dtype=np.int32)))
+        padded = np.append(codes, np.uint8(4))
+
+        state = np.zeros(len(starts), dtype=np.int32)
+        hitLanes, hitEnds, hitStates = [], [], []
+        for offset in range(width):
+            position = begins + offset
+            state = goto[state, padded[np.where(position < ends, position, length)]]
+            hits = np.flatnonzero(self._hasOutput[state] & (position >= starts) & (position < ends))
+            if len(hits):
+                hitEnds.append(position[hits])
+                hitStates.append(state[hits])
+
+        matchEnds = np.concatenate(hitEnds) if hitEnds else np.zeros(0, dtype=np.int64)
+        matchStates = np.concatenate(hitStates) if hitStates else np.zeros(0, dtype=np.int32)
+        counts = self._outputStart[matchStates + 1] - self._outputStart[matchStates]
+        firsts = np.repeat(self._outputStart[matchStates] - np.cumsum(counts) + counts, counts)
+        motifs = self._outputs[firsts + np.arange(counts.sum())]
+        matchEnds = np.repeat(matchEnds, counts)
+        patterns, strands, lengths = self._motifs[motifs].T
+        positions = np.where(strands == 0, matchEnds - lengths + 1, length - matchEnds - 1)
+
+        results = {}
+        for index, pattern in enumerate(self.patterns):
+            selected = patterns == index
+            results[pattern] = {
+                "forward": np.unique(positions[selected & (strands == 0)]),
+                "reverse": np.unique(positions[selected & (strands == 1)])
+            }
+        return results
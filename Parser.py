@@ -1,44 +1,295 @@
+import gzip
+import mmap
+import os
+import re
+from typing import Iterator
 from Sequence import Sequence
-from Graph import Digraph
+from Graph import Node, Digraph
+from Error import InvalidFastaError, InvalidNewickError
 
 class Parser:
     
     @staticmethod
-    def Fasta(filename: str):
-        with open(filename, 'r') as file:
-            lines = [line.strip() for line in file]
+    def _open(filename: str):
+        """Opens a file for binary reading, through gzip when it starts with the gzip magic bytes.
+        """
+        with open(filename, 'rb') as file:
+            magic = file.read(2)
+        return gzip.open(filename, 'rb') if magic == b"\x1f\x8b" else open(filename, 'rb')
+    
+    @staticmethod
+    def iterFasta(filename: str, chunkSize: int=1 << 20) -> Iterator[Sequence]:
+        """Lazily yields the records of a plain or gzipped FASTA file.
+
+        The file is read in chunks of chunkSize bytes and a record's lines are collected as fragments
+        joined once with b"".join, so memory stays bounded by the chunk and the current record.
+
+        Args:
+            filename (str): Path of the FASTA file.
+            chunkSize (int, optional): Bytes read at a time. Defaults to 1 << 20.
+
+        Yields:
+            Sequence: One record at a time.
+        """
+        taxa = None
+        fragments = []
+        buffer = b""
+        position = 0
+        with Parser._open(filename) as file:
+            while True:
+                chunk = file.read(chunkSize)
+                buffer = buffer[position:] + chunk
+                position = 0
+                while True:
+                    if taxa is None:
+                        # Header line must be complete before the record can start
+                        start = buffer.find(b">", position)
+                        end = buffer.find(b"\n", start)
+                        if start == -1 or end == -1:
+                            break
+                        taxa = buffer[start+1:end].strip()
+                        position = end
+                    # Records are separated by a newline followed by '>'
+                    end = buffer.find(b"\n>", position)
+                    if end == -1:
+                        # Only a final newline can start a separator with the next chunk, so everything else
+                        # is taken now and long lines are never carried over and copied again
+                        last = len(buffer) - 1 if buffer.endswith(b"\n") else len(buffer)
+                        fragments.append(buffer[position:last].translate(None, b"\r\n"))
+                        position = last
+                        break
+                    fragments.append(buffer[position:end].translate(None, b"\r\n"))
+                    yield Sequence(b"".join(fragments).decode(), taxa.decode())
+                    taxa, fragments, position = None, [], end + 1
+                if not chunk:
+                    break
         
-        sequence = ""
-        taxa = ""
-        sequenceCollection = []
-        for line in lines:
-            if line[0] == '>':
-                if len(sequence):
-                    sequenceCollection.append(Sequence(sequence, taxa))
-                    sequence = ""
-                taxa = line[1:]
-            else:
-                sequence += line
-        sequenceCollection.append(Sequence(sequence, taxa))
+        if taxa is not None:
+            fragments.append(buffer[position:].translate(None, b"\r\n"))
+            yield Sequence(b"".join(fragments).decode(), taxa.decode())
+        elif buffer.find(b">", position) != -1:
+            start = buffer.find(b">", position)
+            yield Sequence("", buffer[start+1:].strip().decode())
+    
+    @staticmethod
+    def Fasta(filename: str) -> list[Sequence]:
+        return list(Parser.iterFasta(filename))
+    
+    @staticmethod
+    def indexFasta(filename: str) -> dict[str, tuple]:
+        """Builds a samtools compatible .fai index next to a FASTA file in one streaming pass.
+
+        Args:
+            filename (str): Path of the uncompressed FASTA file.
+
+        Raises:
+            InvalidFastaError: The file is gzipped, or a record's lines are not all of the same width.
+
+        Returns:
+            dict[str, tuple]: name -> (length, offset, line bases, line width), in file order.
+        """
+        with Parser._open(filename) as file:
+            if isinstance(file, gzip.GzipFile):
+                raise InvalidFastaError(f"InvalidFastaError: {filename} is gzipped and cannot be indexed")
         
-        return sequenceCollection
+        index = {}
+        name = None
+        offset = 0
+        with open(filename, 'rb') as file:
+            for line in file:
+                offset += len(line)
+                if line[:1] == b">":
+                    if name is not None:
+                        index[name] = (length, start, lineBases, lineWidth)
+                    name = line[1:].split(maxsplit=1)[0].decode() if line[1:].strip() else ""
+                    start = offset
+                    length, lineBases, lineWidth, short = 0, 0, 0, False
+                elif name is not None:
+                    # Every line but the last of a record has the same width
+                    bases = len(line.rstrip(b"\r\n"))
+                    if lineWidth == 0:
+                        lineBases, lineWidth = bases, len(line)
+                    elif (short and bases) or bases > lineBases or (bases == lineBases and line.endswith(b"\n") and len(line) != lineWidth):
+                        raise InvalidFastaError(f"InvalidFastaError: {name} has lines of different widths")
+                    short = short or bases < lineBases
+                    length += bases
+        if name is not None:
+            index[name] = (length, start, lineBases, lineWidth)
+        
+        with open(f"{filename}.fai", 'w') as file:
+            for name, (length, start, lineBases, lineWidth) in index.items():
+                file.write(f"{name}\t{length}\t{start}\t{lineBases}\t{lineWidth}\n")
+        return index
+    
+    @staticmethod
+    def readFastaIndex(filename: str) -> dict[str, tuple]:
+        """Reads the .fai index of a FASTA file, building it first when missing.
+
+        Args:
+            filename (str): Path of the FASTA file, not of the index.
+
+        Returns:
+            dict[str, tuple]: name -> (length, offset, line bases, line width), in file order.
+        """
+        if not os.path.exists(f"{filename}.fai"):
+            return Parser.indexFasta(filename)
+        index = {}
+        with open(f"{filename}.fai", 'r') as file:
+            for line in file:
+                name, *fields = line.rstrip("\n").split("\t")
+                index[name] = tuple(int(field) for field in fields[:4])
+        return index
+    
+    @staticmethod
+    def fetchFasta(filename: str, name: str, start: int=0, end: int=None) -> Sequence:
+        """Fetches record[start:end] of an indexed FASTA file without reading the rest of it.
+
+        Args:
+            filename (str): Path of the FASTA file, its .fai index is built when missing.
+            name (str): Record name, the first word of its header.
+            start (int, optional): 0-based start. Defaults to 0.
+            end (int, optional): 0-based exclusive end, None for the end of the record. Defaults to None.
+
+        Returns:
+            Sequence: The subsequence, named name:start+1-end when it is not the whole record.
+        """
+        with IndexedFasta(filename) as fasta:
+            return fasta.fetch(name, start, end)
     
+    _NEWICK_TOKENS = re.compile(r"\s*('(?:[^']|'')*'|[(),:;]|[^\s(),:;']+)")
+    _NEWICK_PUNCTUATION = {'(', ')', ',', ':', ';'}
+
     @staticmethod
     def Newick(newick: str) -> Digraph:
         """Converts newick string into rooted tree.
+
+        Tokenizes the string in one pass and builds the tree with an explicit stack of open
+        subtrees, so arbitrarily deep trees parse without recursion. Unnamed internal nodes get
+        the short labels of Digraph.join, unnamed leaves are named "", missing branch lengths are 0.
+
+        Args:
+            newick (str): Newick tree, the closing semicolon is optional.
+
+        Raises:
+            InvalidNewickError: Unbalanced brackets, misplaced tokens or a branch length that is no number.
+
+        Returns:
+            Digraph: Tree whose root is the outermost subtree.
         """
-        def findComma(newick: str) -> list:
-            """Finds all comma indices between first and last bracket appended with -1.
+        tokens = []
+        position = 0
+        for match in Parser._NEWICK_TOKENS.finditer(newick.rstrip()):
+            if match.start() != position:
+                break
+            tokens.append(match.group(1))
+            position = match.end()
+        if position != len(newick.rstrip()):
+            raise InvalidNewickError(f"InvalidNewickError: unexpected character at {position}")
+        if tokens and tokens[-1] == ';':
+            tokens.pop()
+
+        def label(i: int) -> tuple:
+            """Name starting at tokens[i], unquoted, and the index after it.
             """
-            bracketCount = 0
-            commaList = []
-            for i, ch in enumerate(newick):
-                if ch == '(':
-                    bracketCount += 1
-                if ch == ')':
-                    bracketCount -= 1
-                if ch == ',' and bracketCount == 1:
-                    commaList.append(i)
-            commaList.append(-1)
-            return commaList
-    
\ No newline at end of file
+            if i < len(tokens) and tokens[i] not in Parser._NEWICK_PUNCTUATION:
+                name = tokens[i]
+                return (name[1:-1].replace("''", "'") if name.startswith("'") else name), i + 1
+            return None, i
+
+        digraph = Digraph([])
+        subtrees = [[]] # Children of every subtree still open, the outermost level first
+        i = 0
+        expectNode = True
+        while i < len(tokens):
+            token = tokens[i]
+            if token == '(' and expectNode:
+                subtrees.append([])
+                i += 1
+                continue
+            if token == ',' and not expectNode and len(subtrees) > 1:
+                expectNode = True
+                i += 1
+                continue
+            leaf = expectNode
+            if token == ')' and not expectNode and len(subtrees) > 1:
+                children = subtrees.pop()
+                name, i = label(i + 1)
+                node = digraph.join(children, taxon=name)
+            elif expectNode and token != ';':
+                # A leaf without name, as in (,); or (:1,:2)r;, when punctuation comes where a node is due
+                name, i = label(i)
+                node = Node("" if name is None else name)
+            else:
+                raise InvalidNewickError(f"InvalidNewickError: unexpected {token}")
+            if i < len(tokens) and tokens[i] == ':':
+                try:
+                    node.distance = float(tokens[i + 1])
+                except (IndexError, ValueError):
+                    raise InvalidNewickError("InvalidNewickError: branch length is not a number") from None
+                i += 2
+            if leaf:
+                # Nodes compare on their branch length too, so leaves are keyed once it is set
+                digraph.adjList[node] = []
+            subtrees[-1].append(node)
+            expectNode = False
+
+        if len(subtrees) != 1 or len(subtrees[0]) != 1:
+            raise InvalidNewickError("InvalidNewickError: newick is not a single tree")
+        return digraph
+    
+
+class IndexedFasta:
+    """Random access to the records of a .fai indexed FASTA file through a memory map.
+    """
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.index = Parser.readFastaIndex(filename)
+        self._file = open(filename, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(filename) else b""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+    
+    def __len__(self) -> int:
+        return len(self.index)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+    
+    def __getitem__(self, name: str) -> Sequence:
+        return self.fetch(name)
+    
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+    
+    def _byte(self, name: str, position: int) -> int:
+        _, offset, lineBases, lineWidth = self.index[name]
+        return offset + (position//lineBases)*lineWidth + position % lineBases if lineBases else offset
+    
+    def fetch(self, name: str, start: int=0, end: int=None) -> Sequence:
+        """Slices record[start:end] straight out of the memory map.
+
+        Args:
+            name (str): Record name, the first word of its header.
+            start (int, optional): 0-based start. Defaults to 0.
+            end (int, optional): 0-based exclusive end, None for the end of the record. Defaults to None.
+
+        Raises:
+            InvalidFastaError: name is not in the index.
+
+        Returns:
+            Sequence: The subsequence, named name:start+1-end when it is not the whole record.
+        """
+        if name not in self.index:
+            raise InvalidFastaError(f"InvalidFastaError: {name} is not in {self.filename}.fai")
+        length = self.index[name][0]
+        start, end, _ = slice(start, end).indices(length)
+        end = max(start, end)
+        sequence = self._map[self._byte(name, start):self._byte(name, end)].translate(None, b"\r\n")
+        taxa = name if (start, end) == (0, length) else f"{name}:{start+1}-{end}"
+        return Sequence(sequence.decode(), taxa)
@@ -1,3 +1,4 @@
+import numpy as np
 from Error import InvalidMatrixError
 from Sequence import Sequence
 
@@ -31,27 +32,162 @@ class Score:
         "*":{"A": -4, "R": -4, "N": -4, "D": -4, "C": -4, "Q": -4, "E": -4, "G": -4, "H": -4, "I": -4, "L": -4, "K": -4, "M": -4, "F": -4, "P": -4, "S": -4, "T": -4, "W": -4, "Y": -4, "V": -4, "B": -4, "Z": -4, "X": -4, "*":  1} 
     }
     
-    def __init__(self, match: int, mismatch: int, existence: int, extension: int):
+    BLOSUM45 = {
+        "A":{"A":  5, "R": -2, "N": -1, "D": -2, "C": -1, "Q": -1, "E": -1, "G":  0, "H": -2, "I": -1, "L": -1, "K": -1, "M": -1, "F": -2, "P": -1, "S":  1, "T":  0, "W": -2, "Y": -2, "V":  0, "B": -1, "Z": -1, "X":  0, "*": -5}, 
+        "R":{"A": -2, "R":  7, "N":  0, "D": -1, "C": -3, "Q":  1, "E":  0, "G": -2, "H":  0, "I": -3, "L": -2, "K":  3, "M": -1, "F": -2, "P": -2, "S": -1, "T": -1, "W": -2, "Y": -1, "V": -2, "B": -1, "Z":  0, "X": -1, "*": -5}, 
+        "N":{"A": -1, "R":  0, "N":  6, "D":  2, "C": -2, "Q":  0, "E":  0, "G":  0, "H":  1, "I": -2, "L": -3, "K":  0, "M": -2, "F": -2, "P": -2, "S":  1, "T":  0, "W": -4, "Y": -2, "V": -3, "B":  4, "Z":  0, "X": -1, "*": -5}, 
+        "D":{"A": -2, "R": -1, "N":  2, "D":  7, "C": -3, "Q":  0, "E":  2, "G": -1, "H":  0, "I": -4, "L": -3, "K":  0, "M": -3, "F": -4, "P": -1, "S":  0, "T": -1, "W": -4, "Y": -2, "V": -3, "B":  5, "Z":  1, "X": -1, "*": -5}, 
+        "C":{"A": -1, "R": -3, "N": -2, "D": -3, "C": 12, "Q": -3, "E": -3, "G": -3, "H": -3, "I": -3, "L": -2, "K": -3, "M": -2, "F": -2, "P": -4, "S": -1, "T": -1, "W": -5, "Y": -3, "V": -1, "B": -2, "Z": -3, "X": -2, "*": -5}, 
+        "Q":{"A": -1, "R":  1, "N":  0, "D":  0, "C": -3, "Q":  6, "E":  2, "G": -2, "H":  1, "I": -2, "L": -2, "K":  1, "M":  0, "F": -4, "P": -1, "S":  0, "T": -1, "W": -2, "Y": -1, "V": -3, "B":  0, "Z":  4, "X": -1, "*": -5}, 
+        "E":{"A": -1, "R":  0, "N":  0, "D":  2, "C": -3, "Q":  2, "E":  6, "G": -2, "H":  0, "I": -3, "L": -2, "K":  1, "M": -2, "F": -3, "P":  0, "S":  0, "T": -1, "W": -3, "Y": -2, "V": -3, "B":  1, "Z":  4, "X": -1, "*": -5}, 
+        "G":{"A":  0, "R": -2, "N":  0, "D": -1, "C": -3, "Q": -2, "E": -2, "G":  7, "H": -2, "I": -4, "L": -3, "K": -2, "M": -2, "F": -3, "P": -2, "S":  0, "T": -2, "W": -2, "Y": -3, "V": -3, "B": -1, "Z": -2, "X": -1, "*": -5}, 
+        "H":{"A": -2, "R":  0, "N":  1, "D":  0, "C": -3, "Q":  1, "E":  0, "G": -2, "H": 10, "I": -3, "L": -2, "K": -1, "M":  0, "F": -2, "P": -2, "S": -1, "T": -2, "W": -3, "Y":  2, "V": -3, "B":  0, "Z":  0, "X": -1, "*": -5}, 
+        "I":{"A": -1, "R": -3, "N": -2, "D": -4, "C": -3, "Q": -2, "E": -3, "G": -4, "H": -3, "I":  5, "L":  2, "K": -3, "M":  2, "F":  0, "P": -2, "S": -2, "T": -1, "W": -2, "Y":  0, "V":  3, "B": -3, "Z": -3, "X": -1, "*": -5}, 
+        "L":{"A": -1, "R": -2, "N": -3, "D": -3, "C": -2, "Q": -2, "E": -2, "G": -3, "H": -2, "I":  2, "L":  5, "K": -3, "M":  2, "F":  1, "P": -3, "S": -3, "T": -1, "W": -2, "Y":  0, "V":  1, "B": -3, "Z": -2, "X": -1, "*": -5}, 
+        "K":{"A": -1, "R":  3, "N":  0, "D":  0, "C": -3, "Q":  1, "E":  1, "G": -2, "H": -1, "I": -3, "L": -3, "K":  5, "M": -1, "F": -3, "P": -1, "S": -1, "T": -1, "W": -2, "Y": -1, "V": -2, "B":  0, "Z":  1, "X": -1, "*": -5}, 
+        "M":{"A": -1, "R": -1, "N": -2, "D": -3, "C": -2, "Q":  0, "E": -2, "G": -2, "H":  0, "I":  2, "L":  2, "K": -1, "M":  6, "F":  0, "P": -2, "S": -2, "T": -1, "W": -2, "Y":  0, "V":  1, "B": -2, "Z": -1, "X": -1, "*": -5}, 
+        "F":{"A": -2, "R": -2, "N": -2, "D": -4, "C": -2, "Q": -4, "E": -3, "G": -3, "H": -2, "I":  0, "L":  1, "K": -3, "M":  0, "F":  8, "P": -3, "S": -2, "T": -1, "W":  1, "Y":  3, "V":  0, "B": -3, "Z": -3, "X": -1, "*": -5}, 
+        "P":{"A": -1, "R": -2, "N": -2, "D": -1, "C": -4, "Q": -1, "E":  0, "G": -2, "H": -2, "I": -2, "L": -3, "K": -1, "M": -2, "F": -3, "P":  9, "S": -1, "T": -1, "W": -3, "Y": -3, "V": -3, "B": -2, "Z": -1, "X": -1, "*": -5}, 
+        "S":{"A":  1, "R": -1, "N":  1, "D":  0, "C": -1, "Q":  0, "E":  0, "G":  0, "H": -1, "I": -2, "L": -3, "K": -1, "M": -2, "F": -2, "P": -1, "S":  4, "T":  2, "W": -4, "Y": -2, "V": -1, "B":  0, "Z":  0, "X":  0, "*": -5}, 
+        "T":{"A":  0, "R": -1, "N":  0, "D": -1, "C": -1, "Q": -1, "E": -1, "G": -2, "H": -2, "I": -1, "L": -1, "K": -1, "M": -1, "F": -1, "P": -1, "S":  2, "T":  5, "W": -3, "Y": -1, "V":  0, "B":  0, "Z": -1, "X":  0, "*": -5}, 
+        "W":{"A": -2, "R": -2, "N": -4, "D": -4, "C": -5, "Q": -2, "E": -3, "G": -2, "H": -3, "I": -2, "L": -2, "K": -2, "M": -2, "F":  1, "P": -3, "S": -4, "T": -3, "W": 15, "Y":  3, "V": -3, "B": -4, "Z": -2, "X": -2, "*": -5}, 
+        "Y":{"A": -2, "R": -1, "N": -2, "D": -2, "C": -3, "Q": -1, "E": -2, "G": -3, "H":  2, "I":  0, "L":  0, "K": -1, "M":  0, "F":  3, "P": -3, "S": -2, "T": -1, "W":  3, "Y":  8, "V": -1, "B": -2, "Z": -2, "X": -1, "*": -5}, 
+        "V":{"A":  0, "R": -2, "N": -3, "D": -3, "C": -1, "Q": -3, "E": -3, "G": -3, "H": -3, "I":  3, "L":  1, "K": -2, "M":  1, "F":  0, "P": -3, "S": -1, "T":  0, "W": -3, "Y": -1, "V":  5, "B": -3, "Z": -3, "X": -1, "*": -5}, 
+        "B":{"A": -1, "R": -1, "N":  4, "D":  5, "C": -2, "Q":  0, "E":  1, "G": -1, "H":  0, "I": -3, "L": -3, "K":  0, "M": -2, "F": -3, "P": -2, "S":  0, "T":  0, "W": -4, "Y": -2, "V": -3, "B":  4, "Z":  2, "X": -1, "*": -5}, 
+        "Z":{"A": -1, "R":  0, "N":  0, "D":  1, "C": -3, "Q":  4, "E":  4, "G": -2, "H":  0, "I": -3, "L": -2, "K":  1, "M": -1, "F": -3, "P": -1, "S":  0, "T": -1, "W": -2, "Y": -2, "V": -3, "B":  2, "Z":  4, "X": -1, "*": -5}, 
+        "X":{"A":  0, "R": -1, "N": -1, "D": -1, "C": -2, "Q": -1, "E": -1, "G": -1, "H": -1, "I": -1, "L": -1, "K": -1, "M": -1, "F": -1, "P": -1, "S":  0, "T":  0, "W": -2, "Y": -1, "V": -1, "B": -1, "Z": -1, "X": -1, "*": -5}, 
+        "*":{"A": -5, "R": -5, "N": -5, "D": -5, "C": -5, "Q": -5, "E": -5, "G": -5, "H": -5, "I": -5, "L": -5, "K": -5, "M": -5, "F": -5, "P": -5, "S": -5, "T": -5, "W": -5, "Y": -5, "V": -5, "B": -5, "Z": -5, "X": -5, "*":  1}
+    }
+    
+    BLOSUM80 = {
+        "A":{"A":  7, "R": -3, "N": -3, "D": -3, "C": -1, "Q": -2, "E": -2, "G":  0, "H": -3, "I": -3, "L": -3, "K": -1, "M": -2, "F": -4, "P": -1, "S":  2, "T":  0, "W": -5, "Y": -4, "V": -1, "B": -3, "Z": -2, "X": -1, "*": -8}, 
+        "R":{"A": -3, "R":  9, "N": -1, "D": -3, "C": -6, "Q":  1, "E": -1, "G": -4, "H":  0, "I": -5, "L": -4, "K":  3, "M": -3, "F": -5, "P": -3, "S": -2, "T": -2, "W": -5, "Y": -4, "V": -4, "B": -2, "Z":  0, "X": -2, "*": -8}, 
+        "N":{"A": -3, "R": -1, "N":  9, "D":  2, "C": -5, "Q":  0, "E": -1, "G": -1, "H":  1, "I": -6, "L": -6, "K":  0, "M": -4, "F": -6, "P": -4, "S":  1, "T":  0, "W": -7, "Y": -4, "V": -5, "B":  5, "Z": -1, "X": -2, "*": -8}, 
+        "D":{"A": -3, "R": -3, "N":  2, "D": 10, "C": -7, "Q": -1, "E":  2, "G": -3, "H": -2, "I": -7, "L": -7, "K": -2, "M": -6, "F": -6, "P": -3, "S": -1, "T": -2, "W": -8, "Y": -6, "V": -6, "B":  6, "Z":  1, "X": -3, "*": -8}, 
+        "C":{"A": -1, "R": -6, "N": -5, "D": -7, "C": 13, "Q": -5, "E": -7, "G": -6, "H": -7, "I": -2, "L": -3, "K": -6, "M": -3, "F": -4, "P": -6, "S": -2, "T": -2, "W": -5, "Y": -5, "V": -2, "B": -6, "Z": -7, "X": -4, "*": -8}, 
+        "Q":{"A": -2, "R":  1, "N":  0, "D": -1, "C": -5, "Q":  9, "E":  3, "G": -4, "H":  1, "I": -5, "L": -4, "K":  2, "M": -1, "F": -5, "P": -3, "S": -1, "T": -1, "W": -4, "Y": -3, "V": -4, "B": -1, "Z":  5, "X": -2, "*": -8}, 
+        "E":{"A": -2, "R": -1, "N": -1, "D":  2, "C": -7, "Q":  3, "E":  8, "G": -4, "H":  0, "I": -6, "L": -6, "K":  1, "M": -4, "F": -6, "P": -2, "S": -1, "T": -2, "W": -6, "Y": -5, "V": -4, "B":  1, "Z":  6, "X": -2, "*": -8}, 
+        "G":{"A":  0, "R": -4, "N": -1, "D": -3, "C": -6, "Q": -4, "E": -4, "G":  9, "H": -4, "I": -7, "L": -7, "K": -3, "M": -5, "F": -6, "P": -5, "S": -1, "T": -3, "W": -6, "Y": -6, "V": -6, "B": -2, "Z": -4, "X": -3, "*": -8}, 
+        "H":{"A": -3, "R":  0, "N":  1, "D": -2, "C": -7, "Q":  1, "E":  0, "G": -4, "H": 12, "I": -6, "L": -5, "K": -1, "M": -4, "F": -2, "P": -4, "S": -2, "T": -3, "W": -4, "Y":  3, "V": -5, "B": -1, "Z":  0, "X": -2, "*": -8}, 
+        "I":{"A": -3, "R": -5, "N": -6, "D": -7, "C": -2, "Q": -5, "E": -6, "G": -7, "H": -6, "I":  7, "L":  2, "K": -5, "M":  2, "F": -1, "P": -5, "S": -4, "T": -2, "W": -5, "Y": -3, "V":  4, "B": -6, "Z": -6, "X": -2, "*": -8}, 
+        "L":{"A": -3, "R": -4, "N": -6, "D": -7, "C": -3, "Q": -4, "E": -6, "G": -7, "H": -5, "I":  2, "L":  6, "K": -4, "M":  3, "F":  0, "P": -5, "S": -4, "T": -3, "W": -4, "Y": -2, "V":  1, "B": -7, "Z": -5, "X": -2, "*": -8}, 
+        "K":{"A": -1, "R":  3, "N":  0, "D": -2, "C": -6, "Q":  2, "E":  1, "G": -3, "H": -1, "I": -5, "L": -4, "K":  8, "M": -3, "F": -5, "P": -2, "S": -1, "T": -1, "W": -6, "Y": -4, "V": -4, "B": -1, "Z":  1, "X": -2, "*": -8}, 
+        "M":{"A": -2, "R": -3, "N": -4, "D": -6, "C": -3, "Q": -1, "E": -4, "G": -5, "H": -4, "I":  2, "L":  3, "K": -3, "M":  9, "F":  0, "P": -4, "S": -3, "T": -1, "W": -3, "Y": -3, "V":  1, "B": -5, "Z": -3, "X": -2, "*": -8}, 
+        "F":{"A": -4, "R": -5, "N": -6, "D": -6, "C": -4, "Q": -5, "E": -6, "G": -6, "H": -2, "I": -1, "L":  0, "K": -5, "M":  0, "F": 10, "P": -6, "S": -4, "T": -4, "W":  0, "Y":  4, "V": -2, "B": -6, "Z": -6, "X": -3, "*": -8}, 
+        "P":{"A": -1, "R": -3, "N": -4, "D": -3, "C": -6, "Q": -3, "E": -2, "G": -5, "H": -4, "I": -5, "L": -5, "K": -2, "M": -4, "F": -6, "P": 12, "S": -2, "T": -3, "W": -7, "Y": -6, "V": -4, "B": -4, "Z": -2, "X": -3, "*": -8}, 
+        "S":{"A":  2, "R": -2, "N":  1, "D": -1, "C": -2, "Q": -1, "E": -1, "G": -1, "H": -2, "I": -4, "L": -4, "K": -1, "M": -3, "F": -4, "P": -2, "S":  7, "T":  2, "W": -6, "Y": -3, "V": -3, "B":  0, "Z": -1, "X": -1, "*": -8}, 
+        "T":{"A":  0, "R": -2, "N":  0, "D": -2, "C": -2, "Q": -1, "E": -2, "G": -3, "H": -3, "I": -2, "L": -3, "K": -1, "M": -1, "F": -4, "P": -3, "S":  2, "T":  8, "W": -5, "Y": -3, "V":  0, "B": -1, "Z": -2, "X": -1, "*": -8}, 
+        "W":{"A": -5, "R": -5, "N": -7, "D": -8, "C": -5, "Q": -4, "E": -6, "G": -6, "H": -4, "I": -5, "L": -4, "K": -6, "M": -3, "F":  0, "P": -7, "S": -6, "T": -5, "W": 16, "Y":  3, "V": -5, "B": -8, "Z": -5, "X": -5, "*": -8}, 
+        "Y":{"A": -4, "R": -4, "N": -4, "D": -6, "C": -5, "Q": -3, "E": -5, "G": -6, "H":  3, "I": -3, "L": -2, "K": -4, "M": -3, "F":  4, "P": -6, "S": -3, "T": -3, "W":  3, "Y": 11, "V": -3, "B": -5, "Z": -4, "X": -3, "*": -8}, 
+        "V":{"A": -1, "R": -4, "N": -5, "D": -6, "C": -2, "Q": -4, "E": -4, "G": -6, "H": -5, "I":  4, "L":  1, "K": -4, "M":  1, "F": -2, "P": -4, "S": -3, "T":  0, "W": -5, "Y": -3, "V":  7, "B": -6, "Z": -4, "X": -2, "*": -8}, 
+        "B":{"A": -3, "R": -2, "N":  5, "D":  6, "C": -6, "Q": -1, "E":  1, "G": -2, "H": -1, "I": -6, "L": -7, "K": -1, "M": -5, "F": -6, "P": -4, "S":  0, "T": -1, "W": -8, "Y": -5, "V": -6, "B":  6, "Z":  0, "X": -3, "*": -8}, 
+        "Z":{"A": -2, "R":  0, "N": -1, "D":  1, "C": -7, "Q":  5, "E":  6, "G": -4, "H":  0, "I": -6, "L": -5, "K":  1, "M": -3, "F": -6, "P": -2, "S": -1, "T": -2, "W": -5, "Y": -4, "V": -4, "B":  0, "Z":  6, "X": -1, "*": -8}, 
+        "X":{"A": -1, "R": -2, "N": -2, "D": -3, "C": -4, "Q": -2, "E": -2, "G": -3, "H": -2, "I": -2, "L": -2, "K": -2, "M": -2, "F": -3, "P": -3, "S": -1, "T": -1, "W": -5, "Y": -3, "V": -2, "B": -3, "Z": -1, "X": -2, "*": -8}, 
+        "*":{"A": -8, "R": -8, "N": -8, "D": -8, "C": -8, "Q": -8, "E": -8, "G": -8, "H": -8, "I": -8, "L": -8, "K": -8, "M": -8, "F": -8, "P": -8, "S": -8, "T": -8, "W": -8, "Y": -8, "V": -8, "B": -8, "Z": -8, "X": -8, "*":  1}
+    }
+    
+    PAM250 = {
+        "A":{"A":  2, "R": -2, "N":  0, "D":  0, "C": -2, "Q":  0, "E":  0, "G":  1, "H": -1, "I": -1, "L": -2, "K": -1, "M": -1, "F": -3, "P":  1, "S":  1, "T":  1, "W": -6, "Y": -3, "V":  0, "B":  0, "Z":  0, "X":  0, "*": -8}, 
+        "R":{"A": -2, "R":  6, "N":  0, "D": -1, "C": -4, "Q":  1, "E": -1, "G": -3, "H":  2, "I": -2, "L": -3, "K":  3, "M":  0, "F": -4, "P":  0, "S":  0, "T": -1, "W":  2, "Y": -4, "V": -2, "B": -1, "Z":  0, "X": -1, "*": -8}, 
+        "N":{"A":  0, "R":  0, "N":  2, "D":  2, "C": -4, "Q":  1, "E":  1, "G":  0, "H":  2, "I": -2, "L": -3, "K":  1, "M": -2, "F": -3, "P":  0, "S":  1, "T":  0, "W": -4, "Y": -2, "V": -2, "B":  2, "Z":  1, "X":  0, "*": -8}, 
+        "D":{"A":  0, "R": -1, "N":  2, "D":  4, "C": -5, "Q":  2, "E":  3, "G":  1, "H":  1, "I": -2, "L": -4, "K":  0, "M": -3, "F": -6, "P": -1, "S":  0, "T":  0, "W": -7, "Y": -4, "V": -2, "B":  3, "Z":  3, "X": -1, "*": -8}, 
+        "C":{"A": -2, "R": -4, "N": -4, "D": -5, "C": 12, "Q": -5, "E": -5, "G": -3, "H": -3, "I": -2, "L": -6, "K": -5, "M": -5, "F": -4, "P": -3, "S":  0, "T": -2, "W": -8, "Y":  0, "V": -2, "B": -4, "Z": -5, "X": -3, "*": -8}, 
+        "Q":{"A":  0, "R":  1, "N":  1, "D":  2, "C": -5, "Q":  4, "E":  2, "G": -1, "H":  3, "I": -2, "L": -2, "K":  1, "M": -1, "F": -5, "P":  0, "S": -1, "T": -1, "W": -5, "Y": -4, "V": -2, "B":  1, "Z":  3, "X": -1, "*": -8}, 
+        "E":{"A":  0, "R": -1, "N":  1, "D":  3, "C": -5, "Q":  2, "E":  4, "G":  0, "H":  1, "I": -2, "L": -3, "K":  0, "M": -2, "F": -5, "P": -1, "S":  0, "T":  0, "W": -7, "Y": -4, "V": -2, "B":  3, "Z":  3, "X": -1, "*": -8}, 
+        "G":{"A":  1, "R": -3, "N":  0, "D":  1, "C": -3, "Q": -1, "E":  0, "G":  5, "H": -2, "I": -3, "L": -4, "K": -2, "M": -3, "F": -5, "P":  0, "S":  1, "T":  0, "W": -7, "Y": -5, "V": -1, "B":  0, "Z":  0, "X": -1, "*": -8}, 
+        "H":{"A": -1, "R":  2, "N":  2, "D":  1, "C": -3, "Q":  3, "E":  1, "G": -2, "H":  6, "I": -2, "L": -2, "K":  0, "M": -2, "F": -2, "P":  0, "S": -1, "T": -1, "W": -3, "Y":  0, "V": -2, "B":  1, "Z":  2, "X": -1, "*": -8}, 
+        "I":{"A": -1, "R": -2, "N": -2, "D": -2, "C": -2, "Q": -2, "E": -2, "G": -3, "H": -2, "I":  5, "L":  2, "K": -2, "M":  2, "F":  1, "P": -2, "S": -1, "T":  0, "W": -5, "Y": -1, "V":  4, "B": -2, "Z": -2, "X": -1, "*": -8}, 
+        "L":{"A": -2, "R": -3, "N": -3, "D": -4, "C": -6, "Q": -2, "E": -3, "G": -4, "H": -2, "I":  2, "L":  6, "K": -3, "M":  4, "F":  2, "P": -3, "S": -3, "T": -2, "W": -2, "Y": -1, "V":  2, "B": -3, "Z": -3, "X": -1, "*": -8}, 
+        "K":{"A": -1, "R":  3, "N":  1, "D":  0, "C": -5, "Q":  1, "E":  0, "G": -2, "H":  0, "I": -2, "L": -3, "K":  5, "M":  0, "F": -5, "P": -1, "S":  0, "T":  0, "W": -3, "Y": -4, "V": -2, "B":  1, "Z":  0, "X": -1, "*": -8}, 
+        "M":{"A": -1, "R":  0, "N": -2, "D": -3, "C": -5, "Q": -1, "E": -2, "G": -3, "H": -2, "I":  2, "L":  4, "K":  0, "M":  6, "F":  0, "P": -2, "S": -2, "T": -1, "W": -4, "Y": -2, "V":  2, "B": -2, "Z": -2, "X": -1, "*": -8}, 
+        "F":{"A": -3, "R": -4, "N": -3, "D": -6, "C": -4, "Q": -5, "E": -5, "G": -5, "H": -2, "I":  1, "L":  2, "K": -5, "M":  0, "F":  9, "P": -5, "S": -3, "T": -3, "W":  0, "Y":  7, "V": -1, "B": -4, "Z": -5, "X": -2, "*": -8}, 
+        "P":{"A":  1, "R":  0, "N":  0, "D": -1, "C": -3, "Q":  0, "E": -1, "G":  0, "H":  0, "I": -2, "L": -3, "K": -1, "M": -2, "F": -5, "P":  6, "S":  1, "T":  0, "W": -6, "Y": -5, "V": -1, "B": -1, "Z":  0, "X": -1, "*": -8}, 
+        "S":{"A":  1, "R":  0, "N":  1, "D":  0, "C":  0, "Q": -1, "E":  0, "G":  1, "H": -1, "I": -1, "L": -3, "K":  0, "M": -2, "F": -3, "P":  1, "S":  2, "T":  1, "W": -2, "Y": -3, "V": -1, "B":  0, "Z":  0, "X":  0, "*": -8}, 
+        "T":{"A":  1, "R": -1, "N":  0, "D":  0, "C": -2, "Q": -1, "E":  0, "G":  0, "H": -1, "I":  0, "L": -2, "K":  0, "M": -1, "F": -3, "P":  0, "S":  1, "T":  3, "W": -5, "Y": -3, "V":  0, "B":  0, "Z": -1, "X":  0, "*": -8}, 
+        "W":{"A": -6, "R":  2, "N": -4, "D": -7, "C": -8, "Q": -5, "E": -7, "G": -7, "H": -3, "I": -5, "L": -2, "K": -3, "M": -4, "F":  0, "P": -6, "S": -2, "T": -5, "W": 17, "Y":  0, "V": -6, "B": -5, "Z": -6, "X": -4, "*": -8}, 
+        "Y":{"A": -3, "R": -4, "N": -2, "D": -4, "C":  0, "Q": -4, "E": -4, "G": -5, "H":  0, "I": -1, "L": -1, "K": -4, "M": -2, "F":  7, "P": -5, "S": -3, "T": -3, "W":  0, "Y": 10, "V": -2, "B": -3, "Z": -4, "X": -2, "*": -8}, 
+        "V":{"A":  0, "R": -2, "N": -2, "D": -2, "C": -2, "Q": -2, "E": -2, "G": -1, "H": -2, "I":  4, "L":  2, "K": -2, "M":  2, "F": -1, "P": -1, "S": -1, "T":  0, "W": -6, "Y": -2, "V":  4, "B": -2, "Z": -2, "X": -1, "*": -8}, 
+        "B":{"A":  0, "R": -1, "N":  2, "D":  3, "C": -4, "Q":  1, "E":  3, "G":  0, "H":  1, "I": -2, "L": -3, "K":  1, "M": -2, "F": -4, "P": -1, "S":  0, "T":  0, "W": -5, "Y": -3, "V": -2, "B":  3, "Z":  2, "X": -1, "*": -8}, 
+        "Z":{"A":  0, "R":  0, "N":  1, "D":  3, "C": -5, "Q":  3, "E":  3, "G":  0, "H":  2, "I": -2, "L": -3, "K":  0, "M": -2, "F": -5, "P":  0, "S":  0, "T": -1, "W": -6, "Y": -4, "V": -2, "B":  2, "Z":  3, "X": -1, "*": -8}, 
+        "X":{"A":  0, "R": -1, "N":  0, "D": -1, "C": -3, "Q": -1, "E": -1, "G": -1, "H": -1, "I": -1, "L": -1, "K": -1, "M": -1, "F": -2, "P": -1, "S":  0, "T":  0, "W": -4, "Y": -2, "V": -1, "B": -1, "Z": -1, "X": -1, "*": -8}, 
+        "*":{"A": -8, "R": -8, "N": -8, "D": -8, "C": -8, "Q": -8, "E": -8, "G": -8, "H": -8, "I": -8, "L": -8, "K": -8, "M": -8, "F": -8, "P": -8, "S": -8, "T": -8, "W": -8, "Y": -8, "V": -8, "B": -8, "Z": -8, "X": -8, "*":  1}
+    }
+    
+    NUC44 = {
+        "A":{"A":  5, "T": -4, "G": -4, "C": -4, "S": -4, "W":  1, "R":  1, "Y": -4, "K": -4, "M":  1, "B": -4, "V": -1, "H": -1, "D": -1, "N": -2}, 
+        "T":{"A": -4, "T":  5, "G": -4, "C": -4, "S": -4, "W":  1, "R": -4, "Y":  1, "K":  1, "M": -4, "B": -1, "V": -4, "H": -1, "D": -1, "N": -2}, 
+        "G":{"A": -4, "T": -4, "G":  5, "C": -4, "S":  1, "W": -4, "R":  1, "Y": -4, "K":  1, "M": -4, "B": -1, "V": -1, "H": -4, "D": -1, "N": -2}, 
+        "C":{"A": -4, "T": -4, "G": -4, "C":  5, "S":  1, "W": -4, "R": -4, "Y":  1, "K": -4, "M":  1, "B": -1, "V": -1, "H": -1, "D": -4, "N": -2}, 
+        "S":{"A": -4, "T": -4, "G":  1, "C":  1, "S": -1, "W": -4, "R": -2, "Y": -2, "K": -2, "M": -2, "B": -1, "V": -1, "H": -3, "D": -3, "N": -1}, 
+        "W":{"A":  1, "T":  1, "G": -4, "C": -4, "S": -4, "W": -1, "R": -2, "Y": -2, "K": -2, "M": -2, "B": -3, "V": -3, "H": -1, "D": -1, "N": -1}, 
+        "R":{"A":  1, "T": -4, "G":  1, "C": -4, "S": -2, "W": -2, "R": -1, "Y": -4, "K": -2, "M": -2, "B": -3, "V": -1, "H": -3, "D": -1, "N": -1}, 
+        "Y":{"A": -4, "T":  1, "G": -4, "C":  1, "S": -2, "W": -2, "R": -4, "Y": -1, "K": -2, "M": -2, "B": -1, "V": -3, "H": -1, "D": -3, "N": -1}, 
+        "K":{"A": -4, "T":  1, "G":  1, "C": -4, "S": -2, "W": -2, "R": -2, "Y": -2, "K": -1, "M": -4, "B": -1, "V": -3, "H": -3, "D": -1, "N": -1}, 
+        "M":{"A":  1, "T": -4, "G": -4, "C":  1, "S": -2, "W": -2, "R": -2, "Y": -2, "K": -4, "M": -1, "B": -3, "V": -1, "H": -1, "D": -3, "N": -1}, 
+        "B":{"A": -4, "T": -1, "G": -1, "C": -1, "S": -1, "W": -3, "R": -3, "Y": -1, "K": -1, "M": -3, "B": -1, "V": -2, "H": -2, "D": -2, "N": -1}, 
+        "V":{"A": -1, "T": -4, "G": -1, "C": -1, "S": -1, "W": -3, "R": -1, "Y": -3, "K": -3, "M": -1, "B": -2, "V": -1, "H": -2, "D": -2, "N": -1}, 
+        "H":{"A": -1, "T": -1, "G": -4, "C": -1, "S": -3, "W": -1, "R": -3, "Y": -1, "K": -3, "M": -1, "B": -2, "V": -2, "H": -1, "D": -2, "N": -1}, 
+        "D":{"A": -1, "T": -1, "G": -1, "C": -4, "S": -3, "W": -1, "R": -1, "Y": -3, "K": -1, "M": -3, "B": -2, "V": -2, "H": -2, "D": -1, "N": -1}, 
+        "N":{"A": -2, "T": -2, "G": -2, "C": -2, "S": -1, "W": -1, "R": -1, "Y": -1, "K": -1, "M": -1, "B": -1, "V": -1, "H": -1, "D": -1, "N": -1}
+    }
+    
+    PRESETS = {"BLOSUM45": BLOSUM45, "BLOSUM62": BLOSUM62, "BLOSUM80": BLOSUM80, "PAM250": PAM250, "DNA": NUC44}
+    
+    def __init__(self, match: int, mismatch: int, existence: int, extension: int, alphabet: list[str]=Sequence.AMINO_ACIDS):
         self.matrix = None
         self.match = match
         self.mismatch = mismatch
         self.existence = existence
         self.extension = extension
+        self.alphabet = list(alphabet)
         self._construct()
         return
+    
+    @staticmethod
+    def preset(name: str, existence: int, extension: int) -> "Score":
+        """Score with a built-in substitution matrix.
+
+        Args:
+            name (str): "BLOSUM45", "BLOSUM62", "BLOSUM80", "PAM250" or "DNA" (NUC.4.4, with IUPAC codes).
+            existence (int): Gap existence penalty.
+            extension (int): Gap extension penalty.
+
+        Raises:
+            InvalidMatrixError: name is not a preset.
+
+        Returns:
+            Score: Score using the preset matrix.
+        """
+        if name not in Score.PRESETS:
+            raise InvalidMatrixError(f"InvalidMatrixError: {name} is not a preset matrix")
+        score = Score(0, 0, existence, extension)
+        score.setMatrix(Score.PRESETS[name])
+        return score
 
     def _validateMatrix(self):
-        for key in self.matrix.keys():
-            if key not in Sequence.AMINO_ACIDS:
-                raise InvalidMatrixError(f"InvalidMatrixError: {key} is not a valid amino acid")
+        for key, row in self.matrix.items():
+            if len(key) != 1:
+                raise InvalidMatrixError(f"InvalidMatrixError: {key} is not a single monomer")
+            if row.keys() != self.matrix.keys():
+                raise InvalidMatrixError(f"InvalidMatrixError: row {key} does not cover the matrix alphabet")
 
         return
     
+    def _index(self):
+        """Dense copy of matrix, array[vCode, hCode], with a byte -> code lookup over its alphabet.
+        """
+        self.alphabet = list(self.matrix.keys())
+        self.array = np.array([[self.matrix[vmonomer][hmonomer] for hmonomer in self.alphabet] for vmonomer in self.alphabet], dtype=float)
+        self.lookup = np.full(256, -1, dtype=np.intp)
+        for code, monomer in enumerate(self.alphabet):
+            self.lookup[ord(monomer)] = code
+        return
+    
     def _construct(self):
         self.matrix = {}
-        for vmonomer in Sequence.AMINO_ACIDS:
+        for vmonomer in self.alphabet:
             self.matrix[vmonomer] = {}
-            for hmonomer in Sequence.AMINO_ACIDS:
+            for hmonomer in self.alphabet:
                 if vmonomer == hmonomer:
                     self.matrix[vmonomer][hmonomer] = self.match
                 else:
@@ -59,9 +195,45 @@ class Score:
                     
         self.existence = -abs(self.existence)
         self.extension = -abs(self.extension)
+        self._index()
         return
     
     def setMatrix(self, matrix: dict):
         self.matrix = matrix
         self._validateMatrix()
+        self._index()
         return
+    
+    def encode(self, sequence: Sequence) -> np.ndarray:
+        """Codes of a sequence into the matrix alphabet.
+
+        Args:
+            sequence (Sequence): Sequence, or plain string, to encode.
+
+        Raises:
+            InvalidMatrixError: A monomer is not in the matrix.
+
+        Returns:
+            np.ndarray: Row/column indices into array.
+        """
+        if isinstance(sequence, Sequence):
+            # Reuse the sequence's own codes, only remapping its alphabet onto the matrix's
+            codes = self.lookup[[ord(monomer) for monomer in sequence.sequenceType]][sequence.codes]
+        else:
+            codes = self.lookup[np.frombuffer(str(sequence).encode("ascii"), dtype=np.uint8)]
+        if np.any(codes < 0):
+            monomer = str(sequence)[int(np.argmax(codes < 0))]
+            raise InvalidMatrixError(f"InvalidMatrixError: {monomer} is not in the scoring matrix")
+        return codes
+    
+    def profile(self, query: Sequence) -> np.ndarray:
+        """Query profile, the score of every matrix monomer against every query position, with the
+        query as the vertical sequence.
+
+        Args:
+            query (Sequence): Query sequence.
+
+        Returns:
+            np.ndarray: profile[code, position] = array[query code at position, code].
+        """
+        return self.array[self.encode(query)].T
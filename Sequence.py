@@ -1,3 +1,4 @@
+import numpy as np
 from Error import InvalidSequenceError, InvalidSequenceTypeError
 from typing import Literal
 from dataclasses import dataclass
@@ -40,32 +41,104 @@ class Sequence:
         "TAA": "_", "TAG": "_", "TGA": "_"
     }
     
+    __slots__ = ("_data", "_length", "taxa", "sequenceType")
+    
     def __init__(self, sequence: str, taxa: str, sequenceType: Literal=None):
-        self.sequence = sequence
         self.taxa = taxa
         self.sequenceType = sequenceType
-        self.summary = {}
         
-        self._clean()
+        raw = self._clean(sequence)
         if self.sequenceType is None:
-            self._autoDetectSequenceType()
+            self._autoDetectSequenceType(raw)
         self._validate()
+        self._store(Sequence._encodeRaw(raw, self.sequenceType))
         if type(self) is Sequence:
             self._transform()
         return
+    
+    @classmethod
+    def fromCodes(cls, codes: np.ndarray, taxa: str, sequenceType: Literal=None):
+        """Builds a sequence straight from monomer codes, skipping text parsing.
+
+        Args:
+            codes (np.ndarray): Indices into sequenceType.
+            taxa (str): Name of the sequence.
+            sequenceType (Literal, optional): Sequence.NUCLEOTIDES or Sequence.AMINO_ACIDS, None infers
+                it from the class. Defaults to None.
+
+        Returns:
+            Sequence: NTSequence or AASequence holding codes.
+        """
+        if sequenceType is None:
+            sequenceType = Sequence.NUCLEOTIDES if issubclass(cls, NTSequence) else Sequence.AMINO_ACIDS
+        sequence = object.__new__(NTSequence if sequenceType == Sequence.NUCLEOTIDES else AASequence)
+        sequence.taxa = taxa
+        sequence.sequenceType = sequenceType
+        sequence._store(np.asarray(codes, dtype=np.uint8))
+        return sequence
 
     def __str__(self):
         return self.sequence
     
+    def __eq__(self, other) -> bool:
+        return (type(self) is type(other) and self.taxa == other.taxa and self._length == other._length
+                and np.array_equal(self._data, other._data))
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.sequence!r}, {self.taxa!r})"
+    
     def __getitem__(self, i):
-        return self.sequence[i]
+        if isinstance(i, slice):
+            return Sequence._decode(self.codes[i], self.sequenceType)
+        if self.sequenceType == Sequence.NUCLEOTIDES:
+            i = range(self._length)[i]
+            return self.sequenceType[self._data[i//4] >> Sequence._SHIFTS[i % 4] & 3]
+        return self.sequenceType[self._data[i]]
     
     def __len__(self):
-        return len(self.sequence)
+        return self._length
     
-    def _clean(self):
-        self.sequence = self.sequence.strip().upper()
-        return
+    @property
+    def sequence(self) -> str:
+        """Sequence text, decoded from the codes on every access.
+        """
+        return Sequence._decode(self.codes, self.sequenceType)
+    
+    @property
+    def codes(self) -> np.ndarray:
+        """Monomer codes as uint8 indices into sequenceType, unpacked from 2 bits for nucleotides.
+        """
+        if self.sequenceType == Sequence.NUCLEOTIDES:
+            return (self._data[:, None] >> Sequence._SHIFTS & 3).ravel()[:self._length]
+        return self._data
+    
+    def _store(self, codes: np.ndarray):
+        """Keeps codes, packing nucleotides four to a byte.
+        """
+        self._length = len(codes)
+        if self.sequenceType == Sequence.NUCLEOTIDES:
+            padded = np.zeros(-(-len(codes)//4)*4, dtype=np.uint8)
+            padded[:len(codes)] = codes
+            self._data = (padded.reshape(-1, 4) << Sequence._SHIFTS).sum(axis=1, dtype=np.uint8)
+        else:
+            self._data = codes
+    
+    @staticmethod
+    def _encodeRaw(raw: np.ndarray, sequenceType: list) -> np.ndarray:
+        codes = Sequence._LOOKUP["".join(sequenceType)][raw]
+        if np.any(codes == 255):
+            monomer = chr(raw[np.argmax(codes == 255)])
+            raise InvalidSequenceError(f"InvalidSequenceError: {monomer} is not valid")
+        return codes
+    
+    @staticmethod
+    def _decode(codes: np.ndarray, sequenceType: list) -> str:
+        return Sequence._ALPHABET["".join(sequenceType)][codes].tobytes().decode("ascii")
+    
+    def _clean(self, sequence: str) -> np.ndarray:
+        return np.frombuffer(sequence.strip().upper().encode("ascii"), dtype=np.uint8)
     
     def _validate(self):
         if self.sequenceType not in [Sequence.NUCLEOTIDES, Sequence.AMINO_ACIDS]:
@@ -80,12 +153,11 @@ class Sequence:
             return
         return
     
-    def _autoDetectSequenceType(self):
-        monomers = set(self.sequence)
-        if monomers.issubset(set(Sequence.NUCLEOTIDES)):
+    def _autoDetectSequenceType(self, raw: np.ndarray):
+        if np.all(Sequence._LOOKUP["".join(Sequence.NUCLEOTIDES)][raw] != 255):
             self.sequenceType = Sequence.NUCLEOTIDES
             return
-        if monomers.issubset(set(Sequence.AMINO_ACIDS)):
+        if np.all(Sequence._LOOKUP["".join(Sequence.AMINO_ACIDS)][raw] != 255):
             self.sequenceType = Sequence.AMINO_ACIDS
             return
         raise InvalidSequenceError("Sequence is neither a protein nor DNA.")
@@ -104,23 +176,34 @@ class Sequence:
             if monomer not in self.sequenceType:
                 raise InvalidSequenceError(f"InvalidSequenceError: {monomer} is not valid")
     
+        sequence = self.sequence
         indices = []
-        index = self.sequence.find(subsequence)
+        index = sequence.find(subsequence)
         while index != -1:
             indices.append(index)
-            index = self.sequence.find(subsequence,
-                                       index + (1 if overlapping else len(subsequence)))
+            index = sequence.find(subsequence,
+                                  index + (1 if overlapping else len(subsequence)))
         return indices
     
-    def summary(self):
-        self.summary["length"] = len(self.sequence)
-        
-        self.summary["frequency"] = {monomer:0 for monomer in self.sequenceType}
-        for monomer in self.sequence:
-            self.summary["frequency"][monomer] += 1
-        return
+    def summary(self) -> dict:
+        """Length and monomer frequencies of the sequence.
+        """
+        counts = np.bincount(self.codes, minlength=len(self.sequenceType))
+        return {
+            "length": len(self),
+            "frequency": {monomer:int(count) for monomer, count in zip(self.sequenceType, counts)}
+        }
+
+# Byte <-> code tables per alphabet, keyed by the alphabet's letters
+Sequence._SHIFTS = np.array([6, 4, 2, 0], dtype=np.uint8)
+Sequence._LOOKUP, Sequence._ALPHABET = {}, {}
+for _alphabet in ("".join(Sequence.NUCLEOTIDES), "".join(Sequence.AMINO_ACIDS)):
+    Sequence._LOOKUP[_alphabet] = np.full(256, 255, dtype=np.uint8)
+    Sequence._LOOKUP[_alphabet][np.frombuffer(_alphabet.encode("ascii"), dtype=np.uint8)] = np.arange(len(_alphabet))
+    Sequence._ALPHABET[_alphabet] = np.frombuffer(_alphabet.encode("ascii"), dtype=np.uint8)
         
 class AASequence(Sequence):
+    __slots__ = ()
     
     def __init__(self, sequence: str, taxa: str, sequenceType: Literal=Sequence.AMINO_ACIDS):
         super().__init__(sequence, taxa, sequenceType)
@@ -129,6 +212,7 @@ class AASequence(Sequence):
         return
         
 class NTSequence(Sequence):
+    __slots__ = ()
     
     def __init__(self, sequence: str, taxa: str, sequenceType=Sequence.NUCLEOTIDES):
         super().__init__(sequence, taxa, sequenceType)
@@ -139,11 +223,8 @@ class NTSequence(Sequence):
         Returns:
             string: Reverse complement of a sequence from 5' to 3' direction.
         """
-        complement = ""
-        for monomer in self.sequence:
-            complement += Sequence.COMPLEMENT[monomer]
-            
-        return NTSequence(complement[::-1], f"{self.taxa}_complement")
+        # ACGT codes complement as 3 - code
+        return NTSequence.fromCodes(3 - self.codes[::-1], f"{self.taxa}_complement")
     
     def findFRSubsequence(self, subsequence: str, overlapping=True):
         """Finds all occurrences of subsequence in forward and reverse strand
@@ -155,91 +236,126 @@ class NTSequence(Sequence):
         Returns:
             _type_: _description_
         """
+        if not overlapping:
+            return {
+                "forward": self.findSubsequence(subsequence, overlapping), 
+                "reverse": self.complement().findSubsequence(subsequence, overlapping)
+            }
+        
+        # Overlapping matches on both strands come from one automaton pass, without a complement copy
+        from Motif import MotifSearch
+        for monomer in subsequence:
+            if monomer not in self.sequenceType:
+                raise InvalidSequenceError(f"InvalidSequenceError: {monomer} is not valid")
+        matches = MotifSearch([subsequence]).search(self)[subsequence]
         indices = {
-            "forward": self.findSubsequence(subsequence, overlapping), 
-            "reverse": self.complement().findSubsequence(subsequence, overlapping)
+            "forward": matches["forward"].tolist(), 
+            "reverse": matches["reverse"].tolist()
         }
         
         return indices
     
-    def to3AASequences(self):
+    def to3AACodes(self) -> list[np.ndarray]:
+        """Translates the three forward frames as amino acid codes through a 64 entry codon table.
+
+        Codons are read from a strided view of the nucleotide codes and indexed as 16*a + 4*b + c.
+
+        Returns:
+            list[np.ndarray]: uint8 codes into Sequence.AMINO_ACIDS per frame, stop codons as NTSequence.STOP.
+        """
+        codes = self.codes
+        frames = []
+        for frame in range(3):
+            count = max(len(codes) - frame, 0)//3
+            codons = codes[frame:frame + 3*count].reshape(count, 3)
+            frames.append(NTSequence.CODON_TABLE[codons @ NTSequence._CODON_WEIGHTS])
+        return frames
+    
+    def toFR3AACodes(self) -> dict[str, list[np.ndarray]]:
+        """Translates all six frames, see to3AACodes.
+
+        Returns:
+            dict[str, list[np.ndarray]]: "forward" and "reverse" frames as amino acid codes.
+        """
+        return {
+            "forward": self.to3AACodes(),
+            "reverse": self.complement().to3AACodes()
+        }
+    
+    def _toAASequences(self, frames: list[np.ndarray], taxa: str) -> list:
         AASequences = []
-        for i in range(3):
-            translatedSequence = ""
-            for j in range(i, len(self.sequence), 3):
-                codon = self.sequence[j:j+3]
-                if codon not in Sequence.CODON_DICT.keys():
-                    break
-                if Sequence.CODON_DICT[codon] == "_":
-                    break
-                translatedSequence += Sequence.CODON_DICT[codon]
-            AASequences.append(AASequence(translatedSequence, f"{self.taxa}_translated{i+1}"))
+        for i, frame in enumerate(frames):
+            stops = np.flatnonzero(frame == NTSequence.STOP)
+            end = stops[0] if len(stops) else len(frame)
+            AASequences.append(AASequence.fromCodes(frame[:end], f"{taxa}_translated{i+1}"))
         return AASequences
     
+    def to3AASequences(self):
+        """Translates the three forward frames, each up to its first stop codon.
+        """
+        return self._toAASequences(self.to3AACodes(), self.taxa)
+    
     def toFR3AASequences(self):
-        """_summary_
+        """Translates the three forward and three reverse frames, each up to its first stop codon.
         """
-        reverseSequence = self.complement()
+        frames = self.toFR3AACodes()
         AASequences = {
-            "forward": self.toAASequence(),
-            "reverse": reverseSequence.toAASequence()
+            "forward": self._toAASequences(frames["forward"], self.taxa),
+            "reverse": self._toAASequences(frames["reverse"], f"{self.taxa}_complement")
         }
         
         return AASequences
     
-    def tRNAScan(self):
-        """Performs tRNA decision tree
+    def tRNAScan(self, minScore: int=4) -> tuple[np.ndarray, np.ndarray]:
+        """Performs tRNA decision tree on every 76 nt window at once.
+
+        The checks run in order on strided views of the codes, T-psi-C invariant bases (3 of 4),
+        T-psi-C arm pairing (5 of 5), D invariant bases (3 of 3), D arm pairing (3 of 3). A window's
+        score is the number of checks it passes before the first failure.
+
+        Args:
+            minScore (int, optional): Smallest score reported. Defaults to 4, windows passing every check.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Window start positions and their scores.
         """
         windowSize = 76
-        score = 0
-        for i in range(0, len(self.sequence) - windowSize + 1):
-            window = self.sequence[i:i+windowSize]
-            # Count T-phi-C signal invariant bases
-            # count = 0
-            # invariantBases = {52: 'G', 54: 'T', 55: 'C', 60: 'C'}
-            # for key in invariantBases.keys():
-            #     if window[key] == invariantBases[key]:
-            #         count += 1
-            # if count > 2:
-            #     score += 1
-            # else:
-            #     break
-            # # Check T-phi-C arm base pairing
-            # count = 0
-            # basepairing = {52: 60, 51: 61, 50: 62, 49: 63, 48: 64}
-            # for key in basepairing.keys():
-            #     if COMPLEMENT[window[key]] == window[basepairing[key]]:
-            #         count += 1
-            # if count > 4:
-            #     score += 1
-            # else:
-            #     break
-            # # Count D signal invariant bases
-            # count = 0
-            # invariantBases = {7: 'T', 9: 'G', 13: 'A'}
-            # for key in invariantBases.keys():
-            #     if window[key] == invariantBases[key]:
-            #         count += 1
-            # if count > 2:
-            #     score += 1
-            # else:
-            #     break
-            # # Check D arm base pairing
-            # count = 0
-            # basepairing = {9: 24, 10: 23, 11: 22}
-            # for key in basepairing.keys():
-            #     if COMPLEMENT[window[key]] == window[basepairing[key]]:
-            #         count += 1
-            # if count > 2:
-            #     score += 1
-            # else:
-            #     break
-        return
+        codes = self.codes.astype(np.int8)
+        if len(codes) < windowSize:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        windows = np.lib.stride_tricks.sliding_window_view(codes, windowSize)
+        
+        def invariant(bases: dict) -> np.ndarray:
+            return sum(windows[:, key] == Sequence.NUCLEOTIDES.index(base) for key, base in bases.items())
+        
+        def basepairing(pairs: dict) -> np.ndarray:
+            # Watson-Crick partners have codes summing to 3
+            return sum(windows[:, key] + windows[:, pair] == 3 for key, pair in pairs.items())
+        
+        checks = (
+            invariant({52: 'G', 54: 'T', 55: 'C', 60: 'C'}) > 2,
+            basepairing({52: 60, 51: 61, 50: 62, 49: 63, 48: 64}) > 4,
+            invariant({7: 'T', 9: 'G', 13: 'A'}) > 2,
+            basepairing({9: 24, 10: 23, 11: 22}) > 2
+        )
+        passed = np.ones(len(windows), dtype=bool)
+        score = np.zeros(len(windows), dtype=np.int64)
+        for check in checks:
+            passed &= check
+            score += passed
+        positions = np.flatnonzero(score >= minScore)
+        return positions, score[positions]
     
     def TM(self):
         pass
     
 # Constants
+NTSequence.STOP = len(Sequence.AMINO_ACIDS)
+NTSequence._CODON_WEIGHTS = np.array([16, 4, 1])
+NTSequence.CODON_TABLE = np.array([
+    NTSequence.STOP if Sequence.CODON_DICT[a + b + c] == "_" else Sequence.AMINO_ACIDS.index(Sequence.CODON_DICT[a + b + c])
+    for a in Sequence.NUCLEOTIDES for b in Sequence.NUCLEOTIDES for c in Sequence.NUCLEOTIDES
+], dtype=np.uint8)
     
 
 
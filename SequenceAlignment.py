@@ -1,9 +1,16 @@
+import os
 import numpy as np
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
 from dataclasses import dataclass
-from typing import Literal
+from itertools import islice
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Literal
 from Sequence import Sequence
 from Score import Score
 from Cluster import Cluster
+from Graph import Tree
+from Distance import Distance
+from Error import InvalidAlignmentTypeError
 
 class PWA:
     """Represents a Global/Local Pairwise Alignment
@@ -26,74 +33,43 @@ class PWA:
             
             return minDistance
                 
-    _GLOBAL = 0
-    _LOCAL = 1
-    _DIR_DICT = {
-        "L": [-1, 0], # Left
-        "U": [0, -1], # Up
-        "D": [-1, -1] # Diagonal
-    }
-    
-    def _path(hSeq: Sequence, vSeq: Sequence, temp_path: str, dpArray: np.ndarray, dirArray: list[list[str]], col: int, row: int, data: PWAData, alignType: Literal=_GLOBAL) -> None:
-        if alignType == PWA._GLOBAL:
-            comparison = col > 0 or row > 0
-        if alignType == PWA._LOCAL:
-            comparison = dpArray[row, col] != 0
-            
-        alignments = []
-            
-        if comparison:
-            curr = dirArray[row][col]
-            for direction in curr:
-                PWA._path(hSeq, vSeq, temp_path + direction,
-                           dpArray, dirArray,
-                           col + PWA._DIR_DICT[direction][0],
-                           row + PWA._DIR_DICT[direction][1],
-                           data, alignType)
-        else:
-            temp_path = temp_path[::-1]
-            hMatch, vMatch = "", ""
-            hCounter, vCounter = 0, 0
-            for direction in temp_path:
-                if direction == "D":
-                    hMatch += hSeq[hCounter]
-                    vMatch += vSeq[vCounter]
-                    hCounter += 1
-                    vCounter += 1
-                if direction == "L":
-                    hMatch += hSeq[hCounter]
-                    vMatch += "-"
-                    hCounter += 1
-                if direction == "U":
-                    hMatch += "-"
-                    vMatch += vSeq[vCounter]
-                    vCounter += 1
-            match = (hMatch, vMatch)
-            data.alignments.append(match)
-        return
-        
-    @staticmethod
-    def Global(hSeq: Sequence, vSeq: Sequence, score: Score) -> PWAData:
+    # States of a cell, the cell ended with a match, a horizontal gap or a vertical gap
+    _MATCH = 0
+    _HGAP = 1
+    _VGAP = 2
+    # Traceback flags of a cell, bits 0-2 hold the states reaching the best score of the cell,
+    # then two bits per gap state tell whether it extends the same gap or opens from the others
+    _H_EXTEND = 8
+    _H_OPEN = 16
+    _V_EXTEND = 32
+    _V_OPEN = 64
+    
+    @staticmethod
+    def _encode(hSeq: Sequence, vSeq: Sequence, score: Score) -> tuple:
+        """Encodes both sequences as integer arrays indexing the dense score.array.
+        """
+        return score.encode(hSeq), score.encode(vSeq), score.array
+
+    @staticmethod
+    def _globalPython(hSeq: Sequence, vSeq: Sequence, score: Score) -> tuple:
         hLen, vLen = len(hSeq) + 1, len(vSeq) + 1
         exist, extend = score.existence, score.extension
-        matrix = score.matrix
+        hCodes, vCodes, scoreArray = PWA._encode(hSeq, vSeq, score)
         
         # Define recurrence matrices
         dpArray = np.zeros((vLen, hLen))
-        direction = [["" for i in range(hLen)] for j in range(vLen)]
         vGap = np.full((vLen, hLen + 1), -np.inf)
         hGap = np.full((vLen, hLen + 1), -np.inf)
         match = np.full((vLen, hLen + 1), -np.inf)
+        match[0, 0] = 0
         
         for col in range(1, hLen):
             vGap[0, col] = exist + col*extend
             dpArray[0, col] = exist + col*extend
-            direction[0][col] += "L"
 
         for row in range(1, vLen):
             hGap[row, 0] = exist + row*extend
             dpArray[row, 0] = exist + row*extend
-            direction[row][0] += "U"
 
         # Affine gap penalty recurrence relation
         for row in range(1, vLen):
@@ -104,27 +80,755 @@ class PWA:
                 vGap[row, col] = max(vGap[row-1, col] + extend,
                                      dpArray[row-1, col] + exist + extend)
                 
-                match[row, col] = dpArray[row-1, col-1] + matrix[vSeq[row-1]][hSeq[col-1]]
+                match[row, col] = dpArray[row-1, col-1] + scoreArray[vCodes[row-1], hCodes[col-1]]
                 
                 dpArray[row, col] = max(hGap[row, col], vGap[row, col], match[row, col])
+
+        flags = np.zeros((vLen, hLen), dtype=np.uint8)
+        states = np.stack((match[:, :hLen], hGap[:, :hLen], vGap[:, :hLen]), axis=1)
+        for row in range(vLen):
+            flags[row] = PWA._rowFlags(states[row-1] if row else None, states[row], exist, extend, (0, 0))
+        return dpArray[vLen-1, hLen-1], flags
+
+    @staticmethod
+    def _globalNumpy(hSeq: Sequence, vSeq: Sequence, score: Score) -> tuple:
+        hCodes, vCodes, scoreArray = PWA._encode(hSeq, vSeq, score)
+        exist, extend = score.existence, score.extension
+        
+        # Only the previous row of scores is kept, the traceback works on the flags alone
+        flags = np.zeros((len(vCodes) + 1, len(hCodes) + 1), dtype=np.uint8)
+        prev = None
+        for row, states in enumerate(PWA._forwardRows(hCodes, vCodes, scoreArray, exist, extend, (0, 0), PWA._MATCH)):
+            flags[row] = PWA._rowFlags(prev, states, exist, extend, (0, 0))
+            prev = states
+        return prev[:, -1].max(), flags
+    
+    @staticmethod
+    def _forwardRows(hCodes: np.ndarray, vCodes: np.ndarray, scoreArray: np.ndarray, exist: float, extend: float,
+                     origin: tuple, start: int):
+        """Yields the (match, hGap, vGap) scores of every row of the subproblem whose top left
+        cell is origin and holds state start. Only the current row is kept in memory.
+        """
+        row0, col0 = origin
+        width = len(hCodes) + 1
+        cols = np.arange(width)
+        offset = exist - cols[:-1]*extend
+        
+        # The first global row is filled as a vertical gap, the first global column as a horizontal gap
+        states = np.full((3, width), -np.inf)
+        states[start, 0] = 0
+        gap = PWA._VGAP if row0 == 0 else PWA._HGAP
+        states[gap, 1:] = max(states[gap, 0], states[:, 0].max() + exist) + cols[1:]*extend
+        yield states
+        
+        for vCode in vCodes:
+            dpRow = states.max(axis=0)
+            newStates = np.full((3, width), -np.inf)
+            newStates[PWA._VGAP] = np.maximum(states[PWA._VGAP] + extend, dpRow + exist + extend)
+            newStates[PWA._MATCH, 1:] = dpRow[:-1] + scoreArray[vCode, hCodes]
+            if col0 == 0:
+                newStates[PWA._HGAP, 0] = max(states[PWA._HGAP, 0] + extend, dpRow[0] + exist + extend)
+                newStates[PWA._VGAP, 0] = -np.inf
+            
+            if width > 1:
+                best = np.maximum(newStates[PWA._MATCH, :-1], newStates[PWA._VGAP, :-1])
+                best[0] = newStates[:, 0].max()
+                running = np.maximum.accumulate(best + offset)
+                newStates[PWA._HGAP, 1:] = np.maximum(running, newStates[PWA._HGAP, 0]) + cols[1:]*extend
+            states = newStates
+            yield states
+    
+    @staticmethod
+    def _backwardRows(hCodes: np.ndarray, vCodes: np.ndarray, scoreArray: np.ndarray, exist: float, extend: float,
+                      origin: tuple, end: int=None):
+        """Yields, from the last row up to the second row of the subproblem, the best score
+        that completes the alignment from each (state, column) and finishes the bottom right
+        cell in state end (any state if None).
+        """
+        row0, col0 = origin
+        width = len(hCodes) + 1
+        cols = np.arange(width)
+        
+        leave = np.full((3, width), -np.inf)
+        if end is None:
+            leave[:, -1] = 0
+        else:
+            leave[end, -1] = 0
+        
+        for row in range(len(vCodes), 0, -1):
+            # leave holds the best continuation leaving a cell downwards, diagonally or ending there
+            states = leave.copy()
+            states[PWA._HGAP] = np.maximum.accumulate((leave[PWA._HGAP] + cols*extend)[::-1])[::-1] - cols*extend
+            states[PWA._MATCH, :-1] = np.maximum(leave[PWA._MATCH, :-1], states[PWA._HGAP, 1:] + exist + extend)
+            states[PWA._VGAP, :-1] = np.maximum(leave[PWA._VGAP, :-1], states[PWA._HGAP, 1:] + exist + extend)
+            yield states
+            
+            if row == 1:
+                return
+            diagonal = np.full(width, -np.inf)
+            diagonal[:-1] = states[PWA._MATCH, 1:] + scoreArray[vCodes[row-1], hCodes]
+            leave = np.tile(diagonal, (3, 1))
+            down = PWA._HGAP if col0 == 0 else PWA._VGAP
+            for state in (PWA._MATCH, PWA._HGAP, PWA._VGAP):
+                openGap = np.maximum(leave[state], states[PWA._VGAP] + (extend if state == PWA._VGAP else exist + extend))
+                leave[state, 1:] = openGap[1:]
+                leave[state, 0] = max(diagonal[0], states[down, 0] + (extend if state == down else exist + extend))
+    
+    @staticmethod
+    def _traceRows(rows: list, origin: tuple, exist: float, extend: float, end: int=None) -> tuple:
+        """Traces one optimal path through the rows of a small subproblem.
+
+        Returns:
+            tuple: Moves of the path from top left to bottom right and its score.
+        """
+        row0, col0 = origin
+        row, col = len(rows) - 1, rows[0].shape[1] - 1
+        state = int(np.argmax(rows[row][:, col])) if end is None else end
+        optimal = rows[row][state, col]
+        
+        moves = []
+        while row > 0 or col > 0:
+            if state == PWA._MATCH:
+                row, col = row - 1, col - 1
+                moves.append("D")
+                state = int(np.argmax(rows[row][:, col]))
+                continue
+            
+            # A gap either extends the same state or opens from the best of the others
+            if (state == PWA._HGAP and not (col0 == 0 and col == 0)) or (state == PWA._VGAP and row0 == 0 and row == 0):
+                col -= 1
+                moves.append("L")
+            else:
+                row -= 1
+                moves.append("U")
+            candidates = rows[row][:, col] + exist + extend
+            candidates[state] = rows[row][state, col] + extend
+            state = int(np.argmax(candidates))
+        
+        return moves[::-1], optimal
+    
+    @staticmethod
+    def _linear(hCodes: np.ndarray, vCodes: np.ndarray, scoreArray: np.ndarray, exist: float, extend: float,
+                origin: tuple, start: int, end: int, moves: list) -> float:
+        """Myers-Miller divide and conquer on the middle row. The middle row is split on the
+        (state, column) maximizing forward + backward score, so gaps crossing it are charged once.
+        Appends the moves of one optimal path to moves and returns its score.
+        """
+        if len(vCodes) <= 1:
+            rows = list(PWA._forwardRows(hCodes, vCodes, scoreArray, exist, extend, origin, start))
+            path, optimal = PWA._traceRows(rows, origin, exist, extend, end)
+            moves.extend(path)
+            return optimal
+        
+        mid = len(vCodes)//2
+        for top in PWA._forwardRows(hCodes, vCodes[:mid], scoreArray, exist, extend, origin, start):
+            pass
+        for bottom in islice(PWA._backwardRows(hCodes, vCodes, scoreArray, exist, extend, origin, end), len(vCodes) - mid + 1):
+            pass
+        
+        total = top + bottom
+        state, col = np.unravel_index(np.argmax(total), total.shape)
+        state, col = int(state), int(col)
+        
+        row0, col0 = origin
+        PWA._linear(hCodes[:col], vCodes[:mid], scoreArray, exist, extend, origin, start, state, moves)
+        PWA._linear(hCodes[col:], vCodes[mid:], scoreArray, exist, extend, (row0 + mid, col0 + col), state, end, moves)
+        return total[state, col]
+    
+    @staticmethod
+    def _movesToAlignment(hSeq: Sequence, vSeq: Sequence, moves: list) -> tuple:
+        path = np.frombuffer("".join(moves).encode("ascii"), dtype=np.uint8)
+        alignment = []
+        for seq, gap in ((hSeq, ord("U")), (vSeq, ord("L"))):
+            match = np.full(len(path), ord("-"), dtype=np.uint8)
+            match[path != gap] = np.frombuffer(str(seq).encode("ascii"), dtype=np.uint8)
+            alignment.append(match.tobytes().decode("ascii"))
+        return tuple(alignment)
+
+    @staticmethod
+    def _rowFlags(prev: np.ndarray, states: np.ndarray, exist: float, extend: float, origin: tuple) -> np.ndarray:
+        """Traceback flags of one row from its (match, hGap, vGap) scores and those of the previous row,
+        prev being aligned on the same columns. origin is the global (row, col) of the first cell.
+        """
+        row0, col0 = origin
+        zero = -col0 if 0 <= -col0 < states.shape[1] else states.shape[1]
+        finite = np.isfinite(states)
+        dpRow = states.max(axis=0)
+        flags = ((states == dpRow) & finite).astype(np.uint8)
+        flags = flags[PWA._MATCH] | flags[PWA._HGAP] << 1 | flags[PWA._VGAP] << 2
+        
+        # Horizontal moves come from the left, the first global row holds them as vertical gaps
+        gap, extendFlag, openFlag = ((PWA._VGAP, PWA._V_EXTEND, PWA._V_OPEN) if prev is None and row0 == 0
+                                     else (PWA._HGAP, PWA._H_EXTEND, PWA._H_OPEN))
+        others = np.delete(states[:, :-1], gap, axis=0).max(axis=0)
+        flags[1:] |= np.where(finite[gap, 1:] & (states[gap, 1:] == states[gap, :-1] + extend), extendFlag, 0).astype(np.uint8)
+        flags[1:] |= np.where(finite[gap, 1:] & (states[gap, 1:] == others + exist + extend), openFlag, 0).astype(np.uint8)
+        if prev is None:
+            return flags
+        
+        # Vertical moves come from above, the first global column holds them as horizontal gaps
+        for col, gap, extendFlag, openFlag in ((slice(None), PWA._VGAP, PWA._V_EXTEND, PWA._V_OPEN),
+                                               (slice(zero, zero + 1), PWA._HGAP, PWA._H_EXTEND, PWA._H_OPEN)):
+            others = np.delete(prev[:, col], gap, axis=0).max(axis=0)
+            valid = finite[gap, col]
+            flags[col] |= np.where(valid & (states[gap, col] == prev[gap, col] + extend), extendFlag, 0).astype(np.uint8)
+            flags[col] |= np.where(valid & (states[gap, col] == others + exist + extend), openFlag, 0).astype(np.uint8)
+        return flags
+    
+    @staticmethod
+    def _traceback(hSeq: Sequence, vSeq: Sequence, flags: np.ndarray, lower: int=None):
+        """Lazily yields every optimal alignment ending at the bottom right cell. Paths are enumerated
+        depth first over (row, col, state) with an explicit stack, sharing one buffer of moves.
+
+        Args:
+            lower (int, optional): Lowest diagonal (col - row) of banded flags, None if flags are dense.
+        """
+        def cellFlags(row, col):
+            return int(flags[row, col if lower is None else col - row - lower])
+        
+        def reaching(cell, exclude=None):
+            # Prefer horizontal, then vertical gaps, then matches
+            return [state for state in (PWA._HGAP, PWA._VGAP, PWA._MATCH) if cell & 1 << state and state != exclude]
+        
+        row, col = len(vSeq), len(hSeq)
+        stack = [(row, col, state, 0) for state in reversed(reaching(cellFlags(row, col)))]
+        moves = []
+        while stack:
+            row, col, state, depth = stack.pop()
+            del moves[depth:]
+            if row == 0 and col == 0:
+                yield PWA._movesToAlignment(hSeq, vSeq, moves[::-1])
+                continue
+            
+            cell = cellFlags(row, col)
+            if state == PWA._MATCH:
+                moves.append("D")
+                row, col = row - 1, col - 1
+                previous = reaching(cellFlags(row, col))
+            else:
+                extendFlag, openFlag = (PWA._H_EXTEND, PWA._H_OPEN) if state == PWA._HGAP else (PWA._V_EXTEND, PWA._V_OPEN)
+                if (state == PWA._HGAP and col > 0) or (state == PWA._VGAP and row == 0):
+                    moves.append("L")
+                    col -= 1
+                else:
+                    moves.append("U")
+                    row -= 1
+                previous = reaching(cellFlags(row, col), state) if cell & openFlag else []
+                if cell & extendFlag:
+                    previous.append(state)
+            stack.extend((row, col, state, depth + 1) for state in reversed(previous))
+    
+    @staticmethod
+    def _globalBanded(hSeq: Sequence, vSeq: Sequence, score: Score, band: int) -> tuple:
+        """Fills only the diagonals within band of the main ones, stored as flags[row, col - row - lower].
+        The band grows until its optimum beats every path that could leave it, and the full matrix is
+        filled instead once the band would span a quarter of the columns.
+
+        Paths are bounded by the best score each remaining monomer could get against the monomers of
+        the other sequence. A path leaving the band also pays gaps to reach beyond it and back to the
+        last diagonal, which gives the band proving the optimum in one more fill.
+
+        Returns:
+            tuple: Optimal score, flags and the lowest diagonal of the band, None if flags are dense.
+        """
+        hCodes, vCodes, scoreArray = PWA._encode(hSeq, vSeq, score)
+        exist, extend = score.existence, score.extension
+        hLen, vLen = len(hCodes), len(vCodes)
+        # Upper bounds on the pair scores of the suffixes starting at each row and column
+        vGain = scoreArray[:, np.unique(hCodes)].max(axis=1, initial=0)[vCodes]
+        hGain = scoreArray[np.unique(vCodes)].max(axis=0, initial=0)[hCodes]
+        vSuffix = np.append(np.cumsum(vGain[::-1])[::-1], 0)
+        hSuffix = np.append(np.cumsum(hGain[::-1])[::-1], 0)
+        shift = abs(hLen - vLen)
+        
+        band = max(int(band), 1)
+        while True:
+            lower, upper = min(0, hLen - vLen) - band, max(0, hLen - vLen) + band
+            width = upper - lower + 1
+            if 4*width > hLen + 1:
+                optimal, flags = PWA._globalNumpy(hSeq, vSeq, score)
+                return optimal, flags, None
+            offsets = np.arange(width)
+            flags = np.zeros((vLen + 1, width), dtype=np.uint8)
+            
+            prev, leaving = None, -np.inf
+            for row in range(vLen + 1):
+                cols = row + lower + offsets
+                inside = (cols >= 0) & (cols <= hLen)
+                states = np.full((3, width), -np.inf)
+                if row == 0:
+                    states[PWA._MATCH, -lower] = 0
+                    first = inside & (cols > 0)
+                    states[PWA._VGAP, first] = exist + cols[first]*extend
+                    aligned = None
+                else:
+                    # prev[:, i] lies diagonally up-left of states[:, i], aligned shifts it straight up
+                    aligned = np.concatenate((prev[:, 1:], np.full((3, 1), -np.inf)), axis=1)
+                    dpAligned = aligned.max(axis=0)
+                    states[PWA._VGAP] = np.maximum(aligned[PWA._VGAP] + extend, dpAligned + exist + extend)
+                    diagonal = inside & (cols > 0)
+                    states[PWA._MATCH, diagonal] = prev.max(axis=0)[diagonal] + scoreArray[vCodes[row-1], hCodes[cols[diagonal]-1]]
+                    
+                    # The first global column holds vertical moves as horizontal gaps
+                    seed = np.full(width, -np.inf)
+                    first = inside & (cols == 0)
+                    if first.any():
+                        states[PWA._VGAP, first] = -np.inf
+                        states[PWA._HGAP, first] = np.maximum(aligned[PWA._HGAP, first] + extend, dpAligned[first] + exist + extend)
+                        seed[first] = states[PWA._HGAP, first]
+                    seed = np.maximum(np.maximum(states[PWA._MATCH], states[PWA._VGAP]) + exist, seed) - offsets*extend
+                    states[PWA._HGAP, 1:] = np.maximum(states[PWA._HGAP, 1:], np.maximum.accumulate(seed)[:-1] + offsets[1:]*extend)
+                states[:, ~inside] = -np.inf
+                flags[row] = PWA._rowFlags(aligned, states, exist, extend, (row, row + lower))
                 
-                if dpArray[row, col] == hGap[row, col]:
-                    direction[row][col] += "L"
-                if dpArray[row, col] == vGap[row, col]:
-                    direction[row][col] += "U"
-                if dpArray[row, col] == match[row, col]:
-                    direction[row][col] += "D"
-
-        optimal = dpArray[vLen-1][hLen-1]
-        data = PWA.PWAData(optimal, [])
-        PWA._path(hSeq, vSeq, "", dpArray, direction, hLen-1, vLen-1, data, PWA._GLOBAL)
-        return data
+                # Best score any path could reach after leaving the band right of the upper or below the lower edge
+                dpRow = states.max(axis=0)
+                for index, exitRow, exitCol in ((width - 1, row, cols[-1] + 1), (0, row + 1, cols[0])):
+                    if inside[index] and 0 <= exitCol <= hLen and exitRow <= vLen:
+                        rowsLeft, colsLeft = vLen - exitRow, hLen - exitCol
+                        leaving = max(leaving, dpRow[index] + extend + min(vSuffix[exitRow], hSuffix[exitCol])
+                                      + abs(rowsLeft - colsLeft)*extend)
+                prev = states
+            
+            # Leaving band b takes at least 2b + 2 + shift gap columns over two gaps
+            optimal = prev[:, hLen - vLen - lower].max()
+            budget = min(vSuffix[0], hSuffix[0]) + 2*exist + (2 + shift)*extend - optimal
+            needed = int(budget//(-2*extend)) + 1 if extend < 0 else np.inf
+            if optimal > leaving or band >= needed or (lower <= -vLen and upper >= hLen):
+                return optimal, flags, lower
+            band = max(2*band, needed)
+    
+    @staticmethod
+    def iterGlobal(hSeq: Sequence, vSeq: Sequence, score: Score, engine: Literal["python", "numpy"]="numpy"):
+        """Lazily yields the optimal global alignments of hSeq and vSeq one at a time.
+        """
+        if engine == "python":
+            _, flags = PWA._globalPython(hSeq, vSeq, score)
+        elif engine == "numpy":
+            _, flags = PWA._globalNumpy(hSeq, vSeq, score)
+        else:
+            raise InvalidAlignmentTypeError(f"InvalidAlignmentTypeError: {engine} is not a valid engine")
+        return PWA._traceback(hSeq, vSeq, flags)
+    
+    @staticmethod
+    def Global(hSeq: Sequence, vSeq: Sequence, score: Score, engine: Literal["python", "numpy"]="numpy",
+               memory: Literal["quadratic", "linear"]="quadratic", maxAlignments: int=1, band: int=None) -> PWAData:
+        """Global alignment with affine gap penalty.
+
+        Args:
+            hSeq (Sequence): Horizontal sequence.
+            vSeq (Sequence): Vertical sequence.
+            score (Score): Scoring matrix and gap penalties.
+            engine (Literal["python", "numpy"], optional): "python" fills the recurrence one cell at a time,
+                "numpy" fills it one row at a time on integer encoded sequences. Defaults to "numpy".
+            memory (Literal["quadratic", "linear"], optional): "quadratic" keeps the traceback flags and returns
+                the optimal alignments, "linear" runs Myers-Miller on numpy rows in O(n+m) memory and returns
+                one optimal alignment, whatever the engine. Defaults to "quadratic".
+            maxAlignments (int, optional): Most optimal alignments returned in quadratic memory, None for all.
+                Co-optimal alignments can grow exponentially with length, iterGlobal yields them lazily.
+                Defaults to 1.
+            band (int, optional): Initial band width around the main diagonals for near identical sequences,
+                widened until the optimum provably lies inside, None for the full matrix. A band spanning a
+                quarter of the columns fills the full matrix instead. Only applies to quadratic memory and
+                does not depend on engine. Defaults to None.
+
+        Returns:
+            PWAData: Optimal score and optimal alignment(s).
+        """
+        if engine not in ("python", "numpy"):
+            raise InvalidAlignmentTypeError(f"InvalidAlignmentTypeError: {engine} is not a valid engine")
+        if memory == "linear":
+            hCodes, vCodes, scoreArray = PWA._encode(hSeq, vSeq, score)
+            moves = []
+            optimal = PWA._linear(hCodes, vCodes, scoreArray, score.existence, score.extension,
+                                  (0, 0), PWA._MATCH, None, moves)
+            return PWA.PWAData(optimal, [PWA._movesToAlignment(hSeq, vSeq, moves)])
+        if memory != "quadratic":
+            raise InvalidAlignmentTypeError(f"InvalidAlignmentTypeError: {memory} is not a valid memory mode")
+        
+        if band is not None:
+            optimal, flags, lower = PWA._globalBanded(hSeq, vSeq, score, band)
+            return PWA.PWAData(optimal, list(islice(PWA._traceback(hSeq, vSeq, flags, lower), maxAlignments)))
+        if engine == "python":
+            optimal, flags = PWA._globalPython(hSeq, vSeq, score)
+        else:
+            optimal, flags = PWA._globalNumpy(hSeq, vSeq, score)
+        return PWA.PWAData(optimal, list(islice(PWA._traceback(hSeq, vSeq, flags), maxAlignments)))
+
+    @staticmethod
+    def _batchScores(vCodes: np.ndarray, batch: np.ndarray, lengths: np.ndarray, scoreArray: np.ndarray,
+                     exist: float, extend: float, local: bool, buffers: tuple) -> np.ndarray:
+        """Optimal scores of vCodes against every row of a padded target batch, keeping two rows.
 
+        Targets run along the columns and are right padded with code len(scoreArray), which scores
+        -inf. Padding never reaches a target's own cells and, gaps being penalties, never holds a better
+        local score either. buffers are two preallocated (3, targets, width) state arrays reused for
+        every row.
+        """
+        count, width = len(batch), batch.shape[1] + 1
+        cols = np.arange(width)
+        offset = exist - cols[:-1]*extend
+        states, newStates = buffers[0][:, :count, :width], buffers[1][:, :count, :width]
+        states.fill(-np.inf)
+        if not local:
+            states[PWA._MATCH, :, 0] = 0
+            states[PWA._VGAP, :, 1:] = exist + cols[1:]*extend
+        scoreArray = np.hstack((scoreArray, np.full((len(scoreArray), 1), -np.inf)))
+        best = np.zeros(count)
+        
+        for vCode in vCodes:
+            dpRow = states.max(axis=0)
+            if local:
+                np.maximum(best, dpRow.max(axis=1), out=best)
+                np.maximum(dpRow, 0, out=dpRow)
+            np.maximum(states[PWA._VGAP] + extend, dpRow + exist + extend, out=newStates[PWA._VGAP])
+            newStates[PWA._MATCH, :, 1:] = dpRow[:, :-1] + scoreArray[vCode, batch]
+            newStates[PWA._MATCH, :, 0] = -np.inf
+            newStates[PWA._VGAP, :, 0] = -np.inf
+            newStates[PWA._HGAP, :, 0] = -np.inf if local else np.maximum(states[PWA._HGAP, :, 0] + extend, dpRow[:, 0] + exist + extend)
+            if width > 1:
+                opened = np.maximum(newStates[PWA._MATCH, :, :-1], newStates[PWA._VGAP, :, :-1])
+                opened[:, 0] = 0 if local else newStates[PWA._HGAP, :, 0]
+                if local:
+                    np.maximum(opened, 0, out=opened)
+                running = np.maximum.accumulate(opened + offset, axis=1)
+                newStates[PWA._HGAP, :, 1:] = np.maximum(running, newStates[PWA._HGAP, :, :1]) + cols[1:]*extend
+            states, newStates = newStates, states
+        
+        if local:
+            return np.maximum(best, states.max(axis=(0, 2)))
+        return states[:, np.arange(count), lengths].max(axis=0)
+    
+    @staticmethod
+    def scoreMany(query: Sequence, targets: list[Sequence], score: Score, mode: Literal["global", "local"]="global",
+                  batchCells: int=1 << 14) -> np.ndarray:
+        """Optimal alignment scores of one query against many targets, without any traceback.
+
+        Targets are sorted by length and aligned in padded batches of about batchCells cells per
+        row, the query running down the rows. Only two rows of states are kept, in buffers allocated
+        once and reused by every batch.
+
+        Args:
+            query (Sequence): Query, the vertical sequence.
+            targets (list[Sequence]): Targets, the horizontal sequences.
+            score (Score): Scoring matrix and gap penalties.
+            mode (Literal["global", "local"], optional): Global (same score as PWA.Global) or local
+                (same score as PWA.Local) alignment. Defaults to "global".
+            batchCells (int, optional): Cells per row of a batch, small enough to stay in cache. Defaults to 1 << 14.
+
+        Returns:
+            np.ndarray: Score of every target, in the order of targets.
+        """
+        if mode not in ("global", "local"):
+            raise InvalidAlignmentTypeError(f"InvalidAlignmentTypeError: {mode} is not a valid mode")
+        vCodes = score.encode(query)
+        encoded = [score.encode(target) for target in targets]
+        lengths = np.array([len(codes) for codes in encoded], dtype=np.int64)
+        scores = np.empty(len(targets))
+        if not len(targets):
+            return scores
+        
+        order = np.argsort(lengths, kind="stable")
+        width = int(lengths.max()) + 1
+        batchSize = max(1, min(len(targets), batchCells//width))
+        buffers = (np.empty((3, batchSize, width)), np.empty((3, batchSize, width)))
+        for first in range(0, len(targets), batchSize):
+            members = order[first:first + batchSize]
+            batchLengths = lengths[members]
+            batch = np.full((len(members), int(batchLengths.max())), len(score.array), dtype=np.intp)
+            for row, member in enumerate(members):
+                batch[row, :lengths[member]] = encoded[member]
+            scores[members] = PWA._batchScores(vCodes, batch, batchLengths, score.array, score.existence,
+                                               score.extension, mode == "local", buffers)
+        return scores
+    
     @staticmethod
-    def Local(hSeq: Sequence, vSeq: Sequence, score: Score) -> PWAData:
+    def score(hSeq: Sequence, vSeq: Sequence, score: Score, mode: Literal["global", "local"]="global") -> float:
+        """Optimal alignment score only, in linear memory and without traceback.
+
+        Args:
+            hSeq (Sequence): Horizontal sequence.
+            vSeq (Sequence): Vertical sequence.
+            score (Score): Scoring matrix and gap penalties.
+            mode (Literal["global", "local"], optional): Global or local alignment. Defaults to "global".
+
+        Returns:
+            float: Same score as PWA.Global or PWA.Local.
+        """
+        return float(PWA.scoreMany(vSeq, [hSeq], score, mode)[0])
+    
+    @staticmethod
+    def _scoreDistance(hCodes: np.ndarray, vCodes: np.ndarray, scoreArray: np.ndarray, exist: float, extend: float) -> tuple:
+        """Optimal global score and the smallest PWAData.distance among optimal alignments, in two rows.
+        Both are packed into the exact integer key score*scale - 4*distance, so the usual recurrence
+        breaks score ties on distance. Scores must be integral.
+        """
+        scale = 4*(len(hCodes) + len(vCodes)) + 1
+        keyArray = scoreArray*scale - 4*(1 - np.eye(len(scoreArray)))
+        for states in PWA._forwardRows(hCodes, vCodes, keyArray, exist*scale, extend*scale - 3, (0, 0), PWA._MATCH):
+            pass
+        key = states[:, -1].max()
+        optimal = -(-key//scale)
+        return optimal, (optimal*scale - key)/4
+    
+    _worker = {}
+    
+    @staticmethod
+    def _distanceInit(name: str, offsets: np.ndarray, scoreArray: np.ndarray, exist: float, extend: float):
+        shared = SharedMemory(name=name)
+        PWA._worker.update(shared=shared, codes=np.ndarray((offsets[-1],), dtype=np.uint8, buffer=shared.buf),
+                           offsets=offsets, scoreArray=scoreArray, exist=exist, extend=extend)
+    
+    @staticmethod
+    def _distanceChunk(rows: np.ndarray, cols: np.ndarray) -> tuple:
+        worker = PWA._worker
+        codes, offsets = worker["codes"], worker["offsets"]
+        distances = np.empty(len(rows))
+        for k, (row, col) in enumerate(zip(rows, cols)):
+            _, distances[k] = PWA._scoreDistance(codes[offsets[col]:offsets[col+1]], codes[offsets[row]:offsets[row+1]],
+                                                 worker["scoreArray"], worker["exist"], worker["extend"])
+        return rows, cols, distances
+    
+    @staticmethod
+    def distanceMatrix(sequences: list[Sequence], score: Score, workers: int=None, chunkSize: int=256,
+                       progress: Callable[[int, int], None]=None) -> np.ndarray:
+        """All-vs-all PWAData.distance matrix of the global alignments of sequences.
+
+        Upper triangle pairs are split into chunks of chunkSize and spread over a process pool. The
+        integer encoded sequences are shared with the workers through shared memory and every pair runs
+        the score-only kernel, which gives the same distance as PWA.Global(...).distance() without a
+        traceback. Non integral scores fall back to PWA.Global serially.
+
+        Args:
+            sequences (list[Sequence]): Sequences to compare.
+            score (Score): Scoring matrix and gap penalties.
+            workers (int, optional): Number of processes, None for every core, 1 runs serially. Defaults to None.
+            chunkSize (int, optional): Pairs per work unit. Defaults to 256.
+            progress (Callable[[int, int], None], optional): Called with (pairs done, total pairs). Defaults to None.
+
+        Returns:
+            np.ndarray: Symmetric distance matrix.
+        """
+        count = len(sequences)
+        distMatrix = np.zeros((count, count))
+        rows, cols = np.triu_indices(count, k=1)
+        total = len(rows)
+        
+        encoded = [score.encode(sequence) for sequence in sequences]
+        scoreArray = score.array
+        exist, extend = score.existence, score.extension
+        values = np.append(scoreArray.ravel(), [exist, extend])
+        chunks = [(rows[k:k+chunkSize], cols[k:k+chunkSize]) for k in range(0, total, chunkSize)]
+        
+        def store(chunkRows, chunkCols, distances, done):
+            distMatrix[chunkRows, chunkCols] = distances
+            distMatrix[chunkCols, chunkRows] = distances
+            if progress is not None:
+                progress(done, total)
+        
+        if not np.all(values == np.round(values)):
+            for done, (row, col) in enumerate(zip(rows, cols), 1):
+                store(row, col, PWA.Global(sequences[col], sequences[row], score, maxAlignments=None).distance(), done)
+            return distMatrix
+        
+        lengths = np.array([len(codes) for codes in encoded], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        workers = os.cpu_count() if workers is None else workers
+        if workers <= 1 or len(chunks) <= 1:
+            codes = np.concatenate(encoded + [np.zeros(0, dtype=np.intp)]).astype(np.uint8)
+            done = 0
+            for chunkRows, chunkCols in chunks:
+                for row, col in zip(chunkRows, chunkCols):
+                    _, distance = PWA._scoreDistance(codes[offsets[col]:offsets[col+1]], codes[offsets[row]:offsets[row+1]],
+                                                     scoreArray, exist, extend)
+                    done += 1
+                    store(row, col, distance, done)
+            return distMatrix
+        
+        shared = SharedMemory(create=True, size=max(int(offsets[-1]), 1))
+        try:
+            codes = np.ndarray((offsets[-1],), dtype=np.uint8, buffer=shared.buf)
+            for sequenceCodes, start in zip(encoded, offsets):
+                codes[start:start + len(sequenceCodes)] = sequenceCodes
+            with ProcessPoolExecutor(max_workers=workers, initializer=PWA._distanceInit,
+                                     initargs=(shared.name, offsets, scoreArray, exist, extend)) as executor:
+                done = 0
+                for future in as_completed([executor.submit(PWA._distanceChunk, *chunk) for chunk in chunks]):
+                    chunkRows, chunkCols, distances = future.result()
+                    done += len(distances)
+                    store(chunkRows, chunkCols, distances, done)
+            del codes
+        finally:
+            shared.close()
+            shared.unlink()
+        return distMatrix
+    
+    @staticmethod
+    def _stripedProfile(queryProfile: np.ndarray, exist: float, extend: float, lanes: int=None) -> np.ndarray:
+        """Stripes a Score.profile for Farrar's kernel, profile[monomer, segment, lane] is the score of
+        monomer against query position lane*segLen + segment. Lanes are int16 when every
+        score fits, int32 when they do not, and float64 for non integral scores.
+        """
+        length = queryProfile.shape[1]
+        if lanes is None:
+            lanes = max(16, int(np.ceil(np.sqrt(length))))
+        segLen = max(1, -(-length//lanes))
+        padded = np.full(segLen*lanes, -1)
+        padded[:length] = np.arange(length)
+        striped = padded.reshape(lanes, segLen).T
+        
+        values = np.append(queryProfile.ravel(), [exist, extend])
+        if np.all(values == np.round(values)):
+            bound = length*max(queryProfile.max(initial=0), 0) + np.abs(values).sum()
+            dtype = np.int16 if bound < np.iinfo(np.int16).max else np.int32
+        else:
+            dtype = np.float64
+        
+        profile = np.full((len(queryProfile), segLen, lanes), queryProfile.min(initial=0), dtype=dtype)
+        valid = striped >= 0
+        profile[:, valid] = queryProfile[:, striped[valid]]
+        return profile
+    
+    # Lazy F passes over the segments before a column's vertical gaps are resolved all at once
+    _LAZY_F_PASSES = 8
+    
+    @staticmethod
+    def _stripedGaps(hStore: np.ndarray, eStore: np.ndarray, gapOpen: float, gapExtend: float):
+        """Resolves every vertical gap of a striped column in place, as one running maximum over the
+        query positions in order. A gap opened at k reaches q with H[k] - gapOpen - (q-k-1)*gapExtend,
+        so the running maximum of H[k] - gapOpen + k*gapExtend gives F. Gaps opened from F itself never
+        win, gapOpen being at least gapExtend.
+        """
+        segLen, lanes = hStore.shape
+        wide = np.float64 if hStore.dtype == np.float64 else np.int64
+        column = hStore.T.ravel().astype(wide)
+        steps = np.arange(len(column), dtype=wide)*gapExtend
+        running = np.maximum.accumulate(column - gapOpen + steps)
+        column[1:] = np.maximum(column[1:], running[:-1] - steps[:-1])
+        hStore[:] = column.reshape(lanes, segLen).T
+        np.maximum(eStore, hStore - gapOpen, out=eStore)
+    
+    @staticmethod
+    def _stripedLocal(profile: np.ndarray, tCodes: np.ndarray, length: int, gapOpen: float, gapExtend: float) -> tuple:
+        """Farrar striped Smith-Waterman score pass of the profiled query against tCodes. Only the
+        current column is kept, F is resolved by the lazy F loop or, when gaps keep crossing
+        segments, by _stripedGaps.
+
+        Returns:
+            tuple: Optimal score and list of (query, target) end cells reaching it.
+        """
+        _, segLen, lanes = profile.shape
+        dtype = profile.dtype
+        gapOpen, gapExtend = dtype.type(gapOpen), dtype.type(gapExtend)
+        positions = np.arange(segLen*lanes).reshape(lanes, segLen).T
+        valid = positions < length
+        maxPasses = min(segLen, PWA._LAZY_F_PASSES)
+        
+        hStore = np.zeros((segLen, lanes), dtype=dtype)
+        hLoad = np.zeros((segLen, lanes), dtype=dtype)
+        eStore = np.zeros((segLen, lanes), dtype=dtype)
+        zero = np.zeros(lanes, dtype=dtype)
+        # Shifted into lane 0 by the lazy F loop, low enough that it never opens a gap
+        sentinel = np.full(1, -np.inf if dtype == np.float64 else np.iinfo(dtype).min//2, dtype=dtype)
+        
+        optimal, ends = 0, []
+        for col, tCode in enumerate(tCodes):
+            tProfile = profile[tCode]
+            vF = zero.copy()
+            vH = np.concatenate((zero[:1], hStore[-1, :-1]))
+            hLoad, hStore = hStore, hLoad
+            for seg in range(segLen):
+                vH = np.maximum(np.maximum(vH + tProfile[seg], eStore[seg]), np.maximum(vF, zero))
+                hStore[seg] = vH
+                vH = vH - gapOpen
+                eStore[seg] = np.maximum(eStore[seg] - gapExtend, vH)
+                vF = np.maximum(vF - gapExtend, vH)
+                vH = hLoad[seg]
+            
+            # Lazy F loop, carry vertical gaps across segment boundaries until they stop mattering. Gaps
+            # still open after a few segments are resolved over the whole column at once
+            vF = np.concatenate((sentinel, vF[:-1]))
+            seg, passes = 0, 0
+            while (vF > hStore[seg] - gapOpen).any():
+                if passes == maxPasses:
+                    PWA._stripedGaps(hStore, eStore, gapOpen, gapExtend)
+                    break
+                passes += 1
+                hStore[seg] = np.maximum(hStore[seg], vF)
+                eStore[seg] = np.maximum(eStore[seg], hStore[seg] - gapOpen)
+                vF = np.maximum(vF - gapExtend, sentinel)
+                seg += 1
+                if seg == segLen:
+                    seg = 0
+                    vF = np.concatenate((sentinel, vF[:-1]))
+            
+            colMax = np.max(hStore, where=valid, initial=0)
+            if colMax > optimal:
+                optimal, ends = colMax, []
+            if colMax == optimal and optimal > 0:
+                ends.extend((int(row) + 1, col + 1) for row in np.sort(positions[(hStore == optimal) & valid]))
+        
+        return optimal, ends
+    
+    @staticmethod
+    def _localAlignment(hSeq: Sequence, vSeq: Sequence, hCodes: np.ndarray, vCodes: np.ndarray, scoreArray: np.ndarray,
+                        exist: float, extend: float, row: int, col: int, optimal: float) -> tuple:
+        """Recomputes one optimal local alignment ending at (row, col). An anchored pass over the reversed
+        prefixes finds where it starts, then the enclosed block is aligned globally in linear memory.
+        """
+        # Local alignments never touch the first global row or column rules, so an interior origin is used
+        interior = (1, 1)
+        for back, states in enumerate(PWA._forwardRows(hCodes[:col][::-1], vCodes[:row][::-1], scoreArray,
+                                                       exist, extend, interior, PWA._MATCH)):
+            reached = np.flatnonzero(np.isclose(states.max(axis=0), optimal))
+            if len(reached):
+                left = int(reached[0])
+                break
+        else:
+            raise InvalidAlignmentTypeError(f"InvalidAlignmentTypeError: no alignment of score {optimal} ends at ({row}, {col})")
+        
+        moves = []
+        PWA._linear(hCodes[col-left:col], vCodes[row-back:row], scoreArray, exist, extend, interior, PWA._MATCH, None, moves)
+        return PWA._movesToAlignment(str(hSeq)[col-left:col], str(vSeq)[row-back:row], moves)
+    
+    @staticmethod
+    def Local(hSeq: Sequence, vSeq: Sequence, score: Score, engine: Literal["python", "striped"]="striped") -> PWAData:
+        """Smith-Waterman local alignment with affine gap penalty.
+
+        Args:
+            hSeq (Sequence): Horizontal (target) sequence.
+            vSeq (Sequence): Vertical (query) sequence.
+            score (Score): Scoring matrix and gap penalties.
+            engine (Literal["python", "striped"], optional): "python" fills the recurrence one cell at a time,
+                "striped" runs a Farrar striped score pass that only keeps one column. Defaults to "striped".
+
+        Returns:
+            PWAData: Optimal score and one optimal alignment per optimal end cell.
+        """
+        hCodes, vCodes, scoreArray = PWA._encode(hSeq, vSeq, score)
+        exist, extend = score.existence, score.extension
+        
+        if engine == "python":
+            optimal, ends = PWA._localPython(hSeq, vSeq, score)
+        elif engine == "striped":
+            profile = PWA._stripedProfile(score.profile(vSeq), exist, extend)
+            optimal, ends = PWA._stripedLocal(profile, hCodes, len(vCodes), -(exist + extend), -extend)
+        else:
+            raise InvalidAlignmentTypeError(f"InvalidAlignmentTypeError: {engine} is not a valid engine")
+        
+        # Traceback is only recomputed around the optimal end cells, equal alignments are kept once
+        data = PWA.PWAData(float(optimal), [])
+        for row, col in ends:
+            alignment = PWA._localAlignment(hSeq, vSeq, hCodes, vCodes, scoreArray, exist, extend, row, col, optimal)
+            if alignment not in data.alignments:
+                data.alignments.append(alignment)
+        return data
+    
+    @staticmethod
+    def _localPython(hSeq: Sequence, vSeq: Sequence, score: Score) -> tuple:
         hLen, vLen = len(hSeq) + 1, len(vSeq) + 1
         exist, extend = score.existence, score.extension
-        matrix = score.matrix
+        hCodes, vCodes, scoreArray = PWA._encode(hSeq, vSeq, score)
         
         # Define recurrence matrices
         dpArray = np.zeros((vLen, hLen))
@@ -141,42 +845,148 @@ class PWA:
                 vGap[row, col] = max(0, vGap[row-1, col] + extend,
                                      dpArray[row-1, col] + exist + extend)
                 
-                match[row, col] = dpArray[row-1, col-1] + matrix[vSeq[row-1]][hSeq[col-1]]
+                match[row, col] = dpArray[row-1, col-1] + scoreArray[vCodes[row-1], hCodes[col-1]]
                 
                 dpArray[row, col] = max(0, hGap[row, col], vGap[row, col], match[row, col])
-                
-        # Create alignment(s)
-        alignments = []
-        paths = []
+        
         optimal = np.max(dpArray)
-        for row in range(vLen):
-            for col in range(hLen):
-                if dpArray[row, col] == optimal:
-                    PWA._path("", col, row, PWA._LOCAL)
-            
-        return
+        if optimal == 0:
+            return optimal, []
+        rows, cols = np.nonzero(dpArray == optimal)
+        order = np.lexsort((rows, cols))
+        return optimal, list(zip(rows[order].tolist(), cols[order].tolist()))
 
 class MSA:
     """Represents a multiple sequence alignment.
     """
     @dataclass
     class MSAData:
-        pass
+        taxa: list[str]
+        alignments: list[str]
+        guideTree: Tree
+    
+    _worker = {}
     
     @staticmethod
-    def clustalw(sequences: list[Sequence], score: Score):
-        # Produce distance matrix
-        distMatrix = np.zeros((len(sequences), len(sequences)))
-        for row, vSeq in enumerate(sequences[:-1]):
-            for col, hSeq in sequences[row+1:]:
-                distance = PWA.Global(hSeq, vSeq, score).distance()
-                distMatrix[row, col] = distance
-                distMatrix[col, row] = distance
-        print(distMatrix)
+    def _frequencies(block: np.ndarray, symbols: int) -> np.ndarray:
+        """Position specific frequency matrix of an aligned block of codes, gap code symbols counting
+        towards no monomer.
+
+        Returns:
+            np.ndarray: frequencies[column, code], each row summing to the column's residue fraction.
+        """
+        rows, columns = block.shape
+        counts = np.bincount((block + np.arange(columns)*(symbols + 1)).ravel(), minlength=columns*(symbols + 1))
+        return counts.reshape(columns, symbols + 1)[:, :symbols]/rows
+    
+    @staticmethod
+    def _profileInit(scoreArray: np.ndarray, exist: float, extend: float, maxCells: int):
+        MSA._worker.update(scoreArray=scoreArray, exist=exist, extend=extend, maxCells=maxCells)
+    
+    @staticmethod
+    def _profileMoves(node: int, hFrequencies: np.ndarray, vFrequencies: np.ndarray) -> tuple:
+        """Moves of an optimal global alignment of two profiles, scoring each pair of columns by the
+        expected substitution score, all pairs at once as vFrequencies @ scoreArray @ hFrequencies.T.
+        Column j of one profile and i of the other then index columnScores like codes index a score array.
+        The rows are kept for the traceback up to maxCells cells, larger profiles run Myers-Miller.
+        """
+        worker = MSA._worker
+        exist, extend = worker["exist"], worker["extend"]
+        columnScores = vFrequencies @ worker["scoreArray"] @ hFrequencies.T
+        hCodes, vCodes = np.arange(len(hFrequencies)), np.arange(len(vFrequencies))
+        if (len(hCodes) + 1)*(len(vCodes) + 1) <= worker["maxCells"]:
+            rows = list(PWA._forwardRows(hCodes, vCodes, columnScores, exist, extend, (0, 0), PWA._MATCH))
+            moves, _ = PWA._traceRows(rows, (0, 0), exist, extend)
+        else:
+            moves = []
+            PWA._linear(hCodes, vCodes, columnScores, exist, extend, (0, 0), PWA._MATCH, None, moves)
+        return node, np.array(moves)
+    
+    @staticmethod
+    def _mergeBlocks(hBlock: np.ndarray, vBlock: np.ndarray, moves: np.ndarray, gap: int) -> np.ndarray:
+        """Stacks two aligned blocks along the path, inserting gap columns where the other block advances alone.
+        """
+        merged = np.full((len(hBlock) + len(vBlock), len(moves)), gap, dtype=hBlock.dtype)
+        merged[:len(hBlock), moves != "U"] = hBlock
+        merged[len(hBlock):, moves != "L"] = vBlock
+        return merged
+    
+    @staticmethod
+    def clustalw(sequences: list[Sequence], score: Score, distance: Literal["global", "kmer", "minhash"]="global",
+                 workers: int=None, maxCells: int=1 << 20) -> MSAData:
+        """Progressive multiple sequence alignment along a UPGMA guide tree.
+
+        Every internal node of the guide tree aligns the profiles of its two children, position specific
+        frequency matrices, with the affine gap recurrence of PWA.Global. Nodes whose children are both
+        aligned are spread over a process pool, which only sees the frequency matrices and sends the path back.
+
+        Args:
+            sequences (list[Sequence]): Sequences to align.
+            score (Score): Scoring matrix and gap penalties.
+            distance (Literal["global", "kmer", "minhash"], optional): Guide tree distances, from global
+                alignments or alignment free k-mer estimates. Defaults to "global".
+            workers (int, optional): Number of processes, None for every core, 1 runs serially. Defaults to None.
+            maxCells (int, optional): Largest profile alignment, in cells, traced back from its stored rows,
+                larger ones run in linear memory. Defaults to 1 << 20.
+
+        Returns:
+            MSAData: Gapped sequences in input order and the guide tree.
+        """
+        # Produce distance matrix, from full global alignments or alignment free k-mer estimates
+        taxa = [sequence.taxa for sequence in sequences]
+        if len(sequences) < 2:
+            return MSA.MSAData(taxa, [sequence.sequence for sequence in sequences], Tree(taxa))
+        if distance == "global":
+            distMatrix = PWA.distanceMatrix(sequences, score, workers)
+        else:
+            distMatrix = Distance.matrix(sequences, distance)
 
         # Produce guide tree
-        cluster = Cluster(distMatrix, [sequence.taxa for sequence in sequences])
-        digraph = cluster.upgma()
+        tree = Cluster(distMatrix, taxa).upgma(asTree=True)
+        
+        # Follow guide tree for alignment, children always precede their parent in the tree
+        symbols = len(score.alphabet)
+        blocks = {leaf:score.encode(sequence).astype(np.uint8 if symbols < 255 else np.int16)[None, :] for leaf, sequence in enumerate(sequences)}
+        members = {leaf:[leaf] for leaf in range(len(sequences))}
+        frequencies = {leaf:MSA._frequencies(block, symbols) for leaf, block in blocks.items()}
+        
+        def merge(node, moves):
+            hChild, vChild = tree.children(node)
+            blocks[node] = MSA._mergeBlocks(blocks.pop(hChild), blocks.pop(vChild), moves, symbols)
+            members[node] = members.pop(hChild) + members.pop(vChild)
+            frequencies[node] = MSA._frequencies(blocks[node], symbols)
+            del frequencies[hChild], frequencies[vChild]
+        
+        def task(node):
+            hChild, vChild = tree.children(node)
+            return node, frequencies[hChild], frequencies[vChild]
+        
+        internal = range(tree.leafCount, len(tree))
+        workers = os.cpu_count() if workers is None else workers
+        if workers <= 1:
+            MSA._profileInit(score.array, score.existence, score.extension, maxCells)
+            for node in internal:
+                merge(*MSA._profileMoves(*task(node)))
+        else:
+            # Internal children every node still waits for, nodes waiting for none are submitted
+            waiting = {node:sum(not tree.isLeaf(child) for child in tree.children(node)) for node in internal}
+            with ProcessPoolExecutor(max_workers=workers, initializer=MSA._profileInit,
+                                     initargs=(score.array, score.existence, score.extension, maxCells)) as executor:
+                pending = {executor.submit(MSA._profileMoves, *task(node)) for node in internal if waiting[node] == 0}
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        node, moves = future.result()
+                        merge(node, moves)
+                        parent = int(tree.parent[node])
+                        if parent != -1:
+                            waiting[parent] -= 1
+                            if waiting[parent] == 0:
+                                pending.add(executor.submit(MSA._profileMoves, *task(parent)))
         
-        # Follow guide tree for alignment
-        return
\ No newline at end of file
+        block = blocks[tree.root]
+        letters = np.frombuffer(("".join(score.alphabet) + "-").encode("ascii"), dtype=np.uint8)
+        rows = np.empty(len(sequences), dtype=np.int64)
+        rows[members[tree.root]] = np.arange(len(sequences))
+        alignments = [letters[block[row]].tobytes().decode("ascii") for row in rows]
+        return MSA.MSAData(taxa, alignments, tree)
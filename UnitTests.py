@@ -1,9 +1,19 @@
+import gzip
+import time
+from collections import Counter
 import numpy as np
-from SequenceAlignment import PWA
+import pytest
+from SequenceAlignment import PWA, MSA
 from Sequence import Sequence, AASequence, NTSequence
 from Score import Score
-from Parser import Parser
+from Parser import Parser, IndexedFasta
+from Graph import Tree
 from Cluster import Cluster
+from Distance import Distance
+from Motif import MotifSearch
+from Index import FMIndex
+from HiddenMarkovModel import HMM, HMMNode, ProfileHMM
+from Error import InvalidAlignmentTypeError, InvalidDistanceTypeError, InvalidSequenceError, InvalidMatrixError, InvalidNewickError, InvalidHMMError
  
 def test_SequenceGeneneral():
     NTSeq = Sequence("ACTG", "A")
@@ -16,6 +26,22 @@ def test_SequenceGeneneral():
     assert type(AASeq) is AASequence
     assert AASeq.sequenceType == Sequence.AMINO_ACIDS
     
+def test_SequenceCodes():
+    NTSeq = Sequence("acgtTGCAa", "A")
+    assert NTSeq.sequence == "ACGTTGCAA"
+    assert NTSeq.codes.tolist() == [0, 1, 2, 3, 3, 2, 1, 0, 0]
+    assert NTSeq[3] == "T" and NTSeq[2:5] == "GTT"
+    assert NTSeq._data.nbytes == 3
+    assert NTSequence.fromCodes(NTSeq.codes, "A") == NTSeq
+    assert NTSeq.summary() == {"length": 9, "frequency": {"A": 3, "C": 2, "G": 2, "T": 2}}
+    
+    AASeq = Sequence("MKVL", "B")
+    assert AASeq.codes.dtype == np.uint8
+    assert AASequence.fromCodes(AASeq.codes, "B").sequence == "MKVL"
+    assert AASeq != Sequence("MKVI", "B")
+    with pytest.raises(InvalidSequenceError):
+        AASequence("MKXB", "C")
+
 def test_SequenceFindSubsequence():
     AASeq = Sequence("ATCCTCGTAATC", "A")
     indices = AASeq.findSubsequence("TC")
@@ -34,6 +60,36 @@ def test_NTSequenceFindFRSubsequence():
     assert frIndices["forward"] == [1, 4, 10]
     assert frIndices["reverse"] == [0]
     
+def test_MotifSearch():
+    search = MotifSearch(["TC", "GAN", "CCGG"])
+    NTSeq = Sequence("ATCCTCGTAATCGA", "A")
+    matches = search.search(NTSeq)
+    assert matches["TC"]["forward"].tolist() == [1, 4, 10]
+    assert matches["TC"]["reverse"].tolist() == [0]
+    assert matches["GAN"]["forward"].tolist() == []
+    assert matches["GAN"]["reverse"].tolist() == [2, 8, 11]
+    assert matches["CCGG"]["forward"].tolist() == []
+    
+    # The compiled automaton is reused, palindromes match on both strands
+    matches = search.search(Sequence("AACCGGTT", "B"), lanes=2)
+    assert matches["CCGG"]["forward"].tolist() == [2]
+    assert matches["CCGG"]["reverse"].tolist() == [2]
+
+def test_FMIndex(tmp_path):
+    NTSeq = Sequence("ATCCTCGTAATCGATCGATC", "A")
+    assert FMIndex.suffixArray(Sequence("ACA", "B").codes).tolist() == [3, 2, 0, 1]
+    
+    index = FMIndex.build(NTSeq, occRate=4, saRate=3)
+    assert index.count("TC") == 5
+    assert index.locate("TC").tolist() == NTSeq.findSubsequence("TC")
+    assert index.locate("ATCG").tolist() == [9, 13]
+    assert index.count("GGG") == 0 and len(index.locate("GGG")) == 0
+    
+    index.save(tmp_path / "index")
+    loaded = FMIndex.load(tmp_path / "index")
+    assert isinstance(loaded.bwt, np.memmap)
+    assert loaded.locate("CGATC").tolist() == [11, 15]
+
 def test_NTSequenceTo3AASequences():
     NTSeq = Sequence("ATGAATTAA", "A")
     AASeqs = NTSeq.to3AASequences()
@@ -42,13 +98,200 @@ def test_NTSequenceTo3AASequences():
     assert AASeqs[2] == AASequence("EL", "A_translated3")
     
 def test_NTSequenceToFR3AASequences():
-    pass
+    NTSeq = Sequence("ATGAATTAA", "A")
+    AASeqs = NTSeq.toFR3AASequences()
+    assert [AASeq.sequence for AASeq in AASeqs["forward"]] == ["MN", "", "EL"]
+    assert [AASeq.sequence for AASeq in AASeqs["reverse"]] == ["LIH", "", "NS"]
+    assert AASeqs["reverse"][0].taxa == "A_complement_translated1"
+    
+    frames = NTSeq.toFR3AACodes()
+    assert frames["forward"][0].tolist() == [Sequence.AMINO_ACIDS.index("M"), Sequence.AMINO_ACIDS.index("N"), NTSequence.STOP]
+    assert [len(frame) for frame in frames["reverse"]] == [3, 2, 2]
+
+def test_NTSequenceTRNAScan():
+    window = ["A"]*76
+    for key, base in {52: 'G', 54: 'T', 55: 'C', 60: 'C', 61: 'T', 62: 'T', 63: 'T', 64: 'T', 7: 'T', 9: 'G', 13: 'A', 24: 'C', 23: 'T', 22: 'T'}.items():
+        window[key] = base
+    NTSeq = Sequence("C"*10 + "".join(window) + "C"*10, "A")
+    positions, scores = NTSeq.tRNAScan()
+    assert positions.tolist() == [10]
+    assert scores.tolist() == [4]
+    
+    # Breaking the D arm pairing leaves the first three checks passing
+    window[24] = 'A'
+    positions, scores = Sequence("".join(window), "B").tRNAScan(minScore=3)
+    assert positions.tolist() == [0] and scores.tolist() == [3]
+
+def test_Score():
+    blosum = Score.preset("BLOSUM62", 11, 1)
+    assert (blosum.existence, blosum.extension) == (-11, -1)
+    assert blosum.array[blosum.alphabet.index("W"), blosum.alphabet.index("W")] == 11
+    assert Score.preset("PAM250", 10, 1).matrix["W"]["C"] == -8
+    
+    query = Sequence("MKW", "A")
+    profile = blosum.profile(query)
+    assert profile.shape == (len(blosum.alphabet), 3)
+    assert profile[blosum.alphabet.index("W")].tolist() == [-1, -3, 11]
+    
+    # Nucleotides score against the DNA preset through their own codes
+    dna = Score.preset("DNA", 10, 1)
+    hSeq, vSeq = Sequence("ACGTAC", "A"), Sequence("ACGAC", "B")
+    assert dna.encode(hSeq).tolist() == [dna.alphabet.index(monomer) for monomer in "ACGTAC"]
+    assert PWA.Global(hSeq, vSeq, dna).score == 5*5 - 11
+    with pytest.raises(InvalidMatrixError):
+        Score.preset("BLOSUM30", 10, 1)
 
 def test_PWAGlobal():
     matrix = Score(1, -1, 0, -2)
-    alignment = PWA.Global(Sequence("GTCGACGCA", "A"), Sequence("GATTACA", "B"), matrix)
+    alignment = PWA.Global(Sequence("GTCGACGCA", "A"), Sequence("GATTACA", "B"), matrix, maxAlignments=None)
     assert alignment.score == -3
     assert len(alignment.alignments) == 2
+    assert PWA.Global(Sequence("GTCGACGCA", "A"), Sequence("GATTACA", "B"), matrix).alignments == alignment.alignments[:1]
+
+def test_PWAGlobalEngine():
+    matrix = Score(2, -1, 3, 1)
+    hSeq, vSeq = Sequence("GATTACAGATTACA", "A"), Sequence("GCATGCATTTACA", "B")
+    pythonAlignment = PWA.Global(hSeq, vSeq, matrix, engine="python", maxAlignments=None)
+    numpyAlignment = PWA.Global(hSeq, vSeq, matrix, engine="numpy", maxAlignments=None)
+    assert numpyAlignment.score == pythonAlignment.score
+    assert numpyAlignment.alignments == pythonAlignment.alignments
+
+def test_PWAGlobalLinearMemory():
+    matrix = Score(2, -1, 3, 1)
+    hSeq, vSeq = Sequence("GATTACAGATTACAGGA", "A"), Sequence("GCATGCATTTACA", "B")
+    alignment = PWA.Global(hSeq, vSeq, matrix)
+    linearAlignment = PWA.Global(hSeq, vSeq, matrix, memory="linear")
+    assert linearAlignment.score == alignment.score
+    assert len(linearAlignment.alignments) == 1
+    hMatch, vMatch = linearAlignment.alignments[0]
+    assert hMatch.replace("-", "") == hSeq.sequence
+    assert vMatch.replace("-", "") == vSeq.sequence
+    with pytest.raises(InvalidAlignmentTypeError):
+        PWA.Global(hSeq, vSeq, matrix, engine="bogus", memory="linear")
+
+def test_PWAGlobalTraceback():
+    matrix = Score(1, -1, 3, 1)
+    hSeq, vSeq = Sequence("A"*1500, "A"), Sequence("A"*1000, "B")
+    alignment = PWA.Global(hSeq, vSeq, matrix, maxAlignments=3)
+    assert alignment.score == 1000 - 3 - 500
+    assert len(alignment.alignments) == 3
+    for hMatch, vMatch in alignment.alignments:
+        assert hMatch == hSeq.sequence
+        assert vMatch.replace("-", "") == vSeq.sequence
+    
+    # Affine traceback only keeps paths reaching the optimal score
+    alignments = PWA.iterGlobal(Sequence("ACGGT", "A"), Sequence("ACT", "B"), matrix)
+    assert next(alignments) == ("ACGGT", "AC--T")
+    assert list(alignments) == []
+
+def test_PWAGlobalBanded():
+    matrix = Score(2, -1, 3, 1)
+    hSeq, vSeq = Sequence("GATTACAGATTACAGGACCATG", "A"), Sequence("GATTACAGTTTACAGGACATG", "B")
+    alignment = PWA.Global(hSeq, vSeq, matrix, maxAlignments=None)
+    for band in (1, 2, 8):
+        bandedAlignment = PWA.Global(hSeq, vSeq, matrix, maxAlignments=None, band=band)
+        assert bandedAlignment.score == alignment.score
+        assert bandedAlignment.alignments == alignment.alignments
+    
+    # Unrelated sequences widen the band until it covers the optimum
+    hSeq, vSeq = Sequence("GGGGCATCAT", "A"), Sequence("CATCATTTTTTT", "B")
+    assert PWA.Global(hSeq, vSeq, matrix, band=1) == PWA.Global(hSeq, vSeq, matrix)
+    
+    # Substitution matrices bound the band by the monomers actually present
+    matrix = Score.preset("BLOSUM62", 10, 1)
+    protein = "MKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQAPILSRVGDGTQDNLSGAEKAVQVKVKALPDAQFEVVHSLAKWKRQTLGQHDFSAGEGLYTHMKALRPDEDRLSPLHSVYVDQWDWERVMGDGERQFSTLKSTVEAIWAGIKATEAAVSEEFGLAPFLPDQIHFVHSQELLSRYPDLDAKGRERAIAKDLGAVFLVGIGGKLSDGHRHDVRAPDYDDWNAPGDLA"
+    hSeq, vSeq = Sequence(protein, "A"), Sequence(protein[:100] + "W" + protein[103:150] + protein[151:], "B")
+    assert PWA.Global(hSeq, vSeq, matrix, band=4) == PWA.Global(hSeq, vSeq, matrix)
+
+def test_PWALocal():
+    matrix = Score(2, -1, 3, 1)
+    hSeq, vSeq = Sequence("GATTACA", "A"), Sequence("GCATGCA", "B")
+    alignment = PWA.Local(hSeq, vSeq, matrix)
+    assert alignment.score == 5
+    assert alignment.alignments == [("TACA", "TGCA")]
+    
+    hSeq, vSeq = Sequence("TTGACACCAGGATTACAGT", "A"), Sequence("GGCATGCATTTACAGA", "B")
+    stripedAlignment = PWA.Local(hSeq, vSeq, matrix, engine="striped")
+    pythonAlignment = PWA.Local(hSeq, vSeq, matrix, engine="python")
+    assert stripedAlignment.score == pythonAlignment.score
+    assert stripedAlignment.alignments == pythonAlignment.alignments
+    assert PWA.Local(Sequence("CA", "A"), Sequence("CCCAACAC", "B"), matrix).alignments == [("CA", "CA")]
+    
+    # Near identical sequences keep vertical gaps open across every segment of a column
+    rng = np.random.default_rng(0)
+    sequence = "".join(rng.choice(list("ACGT"), 1000))
+    hSeq, vSeq = Sequence(sequence, "A"), Sequence(sequence[:300] + "G" + sequence[301:700] + sequence[703:], "B")
+    start = time.perf_counter()
+    alignment = PWA.Local(hSeq, vSeq, matrix)
+    assert time.perf_counter() - start < 4
+    assert alignment.score == PWA.score(hSeq, vSeq, matrix, "local")
+
+def test_PWAScore():
+    matrix = Score(2, -1, 3, 1)
+    query = Sequence("GATTACA", "Q")
+    targets = [Sequence("GCATGCA", "A"), Sequence("GATTACA", "B"), Sequence("TTT", "C"), Sequence("GATCAGATTACAGG", "D")]
+    globalScores = PWA.scoreMany(query, targets, matrix, batchCells=10)
+    localScores = PWA.scoreMany(query, targets, matrix, "local")
+    assert globalScores.tolist() == [PWA.Global(target, query, matrix).score for target in targets]
+    assert localScores.tolist() == [PWA.Local(target, query, matrix).score for target in targets]
+    assert PWA.score(targets[0], query, matrix, "local") == 5
+    with pytest.raises(InvalidAlignmentTypeError):
+        PWA.score(targets[0], query, matrix, "semiglobal")
+
+def test_PWADistanceMatrix():
+    matrix = Score(1, -1, 3, 1)
+    sequences = Parser.Fasta("./Testfiles/test.fasta") + [Sequence("GATTACA", "D"), Sequence("GCATGCATT", "E")]
+    calls = []
+    serial = PWA.distanceMatrix(sequences, matrix, workers=1)
+    pooled = PWA.distanceMatrix(sequences, matrix, workers=2, chunkSize=3, progress=lambda done, total: calls.append((done, total)))
+    assert np.array_equal(serial, pooled)
+    assert calls[-1] == (10, 10)
+    for row, vSeq in enumerate(sequences):
+        for col, hSeq in enumerate(sequences[row+1:], row+1):
+            assert serial[row, col] == serial[col, row] == PWA.Global(hSeq, vSeq, matrix).distance()
+
+def test_MSAClustalw():
+    matrix = Score.preset("DNA", 10, 1)
+    sequences = Parser.Fasta("./Testfiles/test.fasta") + [Sequence("GATTACA", "D"), Sequence("GCATGCATT", "E")]
+    msa = MSA.clustalw(sequences, matrix, workers=1)
+    assert msa.taxa == ["A", "B", "C", "D", "E"]
+    assert len({len(alignment) for alignment in msa.alignments}) == 1
+    assert [alignment.replace("-", "") for alignment in msa.alignments] == [sequence.sequence for sequence in sequences]
+    # Near identical sequences align without gaps
+    assert msa.alignments[0][1:] == msa.alignments[1][1:] == msa.alignments[2][1:]
+    assert msa.guideTree.leaves[msa.guideTree.root] == 5
+    assert MSA.clustalw(sequences, matrix, workers=2).alignments == msa.alignments
+    assert MSA.clustalw(sequences, matrix, workers=1, maxCells=10).alignments == msa.alignments
+
+    pair = MSA.clustalw([Sequence("GATTACAGATTACA", "A"), Sequence("GCATGCATTTACA", "B")], matrix, distance="kmer", workers=1)
+    assert pair.alignments[0] == "GATTACAGATTACA" and pair.alignments[1].replace("-", "") == "GCATGCATTTACA"
+
+def test_Distance():
+    sequences = [Sequence("ACGTACGTAC", "A"), Sequence("ACGTACGTAC", "B"), Sequence("ACGTTCGTAC", "C"), Sequence("GGGGGGGGGG", "D")]
+    kmer = Distance.matrix(sequences, "kmer", k=3)
+    assert kmer[0, 1] == 0 and kmer[0, 3] == 1
+    assert kmer[0, 2] == pytest.approx(1 - 5/8)
+    
+    # With sketches holding every k-mer, MinHash gives the exact Mash distance
+    minhash = Distance.matrix(sequences, "minhash", k=3, size=100)
+    jaccard = 4/7
+    assert minhash[0, 1] == 0 and minhash[0, 3] == 1
+    assert minhash[0, 2] == pytest.approx(-np.log(2*jaccard/(1 + jaccard))/3)
+    assert np.array_equal(minhash, minhash.T)
+    
+    # Proteins share few 4-mers, so shared counts are merged per k-mer instead of over dense rows
+    rng = np.random.default_rng(4)
+    proteins = ["".join(rng.choice(list(Sequence.AMINO_ACIDS), int(length))) for length in rng.integers(2, 60, 12)]
+    proteins[5] = proteins[3][:40] + proteins[5]
+    kmer = Distance.matrix([AASequence(protein, str(i)) for i, protein in enumerate(proteins)], "kmer", k=4)
+    counts = [Counter(protein[i:i+4] for i in range(len(protein) - 3)) for protein in proteins]
+    for i in range(len(proteins)):
+        for j in range(len(proteins)):
+            shorter = min(sum(counts[i].values()), sum(counts[j].values()))
+            expected = 0 if i == j else 1 - (sum((counts[i] & counts[j]).values())/shorter if shorter else 0)
+            assert kmer[i, j] == pytest.approx(expected)
+    with pytest.raises(InvalidDistanceTypeError):
+        Distance.matrix(sequences, "bogus")
 
 def test_ParserFasta():
     filename = "./Testfiles/test.fasta"
@@ -60,6 +303,79 @@ def test_ParserFasta():
     assert collection[1].sequence == "tgcaccaaacatgtctaaagctggaaccaaaattactttctttgaagacaaaaactttcaaggccgccactatgacagcgattgcgactgtgcagatttccacatgtacctgagccgctg".upper()
     assert collection[2].sequence == "cgcaccaaacatgtctaaagctggaaccaaaattactttctttgaagacaaaaactttcaaggccgccactatgacagcgattgcgactgtgcagatttccacatgtacctgagccgctg".upper()
 
+def test_ParserIterFasta(tmp_path):
+    filename = "./Testfiles/test.fasta"
+    collection = Parser.Fasta(filename)
+    for chunkSize in (1, 7, 1 << 20):
+        records = list(Parser.iterFasta(filename, chunkSize))
+        assert [record.taxa for record in records] == ["A", "B", "C"]
+        assert [record.sequence for record in records] == [record.sequence for record in collection]
+    
+    gzipped = tmp_path / "test.fasta.gz"
+    with open(filename, 'rb') as file, gzip.open(gzipped, 'wb') as compressed:
+        compressed.write(file.read())
+    assert [record.sequence for record in Parser.iterFasta(gzipped, 5)] == [record.sequence for record in collection]
+    
+    # Single line records longer than a chunk, with separators falling across chunk boundaries
+    singleLine = tmp_path / "single.fasta"
+    singleLine.write_bytes(b">x\r\n" + b"ACGT"*50 + b"\r\n>y\n" + b"GATTACA"*30 + b"\n>z\n")
+    for chunkSize in (1, 2, 3, 16):
+        records = list(Parser.iterFasta(singleLine, chunkSize))
+        assert [(record.taxa, record.sequence) for record in records] == [("x", "ACGT"*50), ("y", "GATTACA"*30), ("z", "")]
+
+def test_ParserIndexedFasta(tmp_path):
+    filename = tmp_path / "test.fasta"
+    filename.write_bytes(open("./Testfiles/test.fasta", 'rb').read())
+    collection = Parser.Fasta(filename)
+    index = Parser.indexFasta(filename)
+    assert list(index) == ["A", "B", "C"]
+    assert open(f"{filename}.fai").readline().split("\t")[:2] == ["A", str(len(collection[0]))]
+    
+    with IndexedFasta(filename) as fasta:
+        assert fasta["B"].sequence == collection[1].sequence
+        assert fasta.fetch("C", 55, 70).sequence == collection[2].sequence[55:70]
+        assert fasta.fetch("C", 55, 70).taxa == "C:56-70"
+    assert Parser.fetchFasta(filename, "A", 100).sequence == collection[0].sequence[100:]
+
+def test_ParserNewick():
+    newick = "(Moth:17.0,(Tuna:14.5,((Turtle:4.0,Chicken:4.0):4.25,(Dog:6.25,(Human:0.5,Monkey:0.5):5.75):2.0):6.25):2.5):0.0"
+    digraph = Parser.Newick(newick + ";")
+    assert digraph.toNewick() == newick
+    assert sum(1 for children in digraph.adjList.values() if not children) == 7
+    assert digraph.root().leaves == 7
+    quoted = Parser.Newick("((a,'b c'''),(d)x:1e-3)root;").toNewick()
+    assert quoted == "((a:0.0,'b c''':0.0):0.0,(d:0.0):0.001):0.0"
+    assert Parser.Newick(quoted).toNewick() == quoted
+    assert Parser.Newick("(,);").toNewick() == "(:0.0,:0.0):0.0"
+    assert Parser.Newick("(:1,:2)r;").toNewick() == "(:1.0,:2.0):0.0"
+    assert Parser.Newick("(a,,b)").root().leaves == 3
+    for invalid in ["((a,b)", "(a,b))", "(a:x,b)", "a b", ";"]:
+        with pytest.raises(InvalidNewickError):
+            Parser.Newick(invalid)
+
+    # Caterpillar tree deeper than the recursion limit
+    newick = "t0:1.0"
+    for i in range(1, 5000):
+        newick = f"({newick},t{i}:1.0):1.0"
+    assert Parser.Newick(newick).toNewick() == newick
+
+def test_Tree():
+    newick = "(Moth:17.0,(Tuna:14.5,((Turtle:4.0,Chicken:4.0):4.25,(Dog:6.25,(Human:0.5,Monkey:0.5):5.75):2.0):6.25):2.5):0.0"
+    tree = Tree.fromDigraph(Parser.Newick(newick))
+    assert tree.names == ["Moth", "Tuna", "Turtle", "Chicken", "Dog", "Human", "Monkey"]
+    assert len(tree) == 13 and tree.root == 12 and tree.leaves[tree.root] == 7
+    assert tree.toNewick() == newick
+    assert tree.toDigraph().toNewick() == newick
+    assert [tree.names[node] for node in tree.preorder() if tree.isLeaf(node)] == tree.names
+    postorder = tree.postorder().tolist()
+    assert postorder[-1] == tree.root
+    assert all(postorder.index(child) < postorder.index(node) for node in range(len(tree)) for child in tree.children(node))
+
+    tree = Tree(["A", "B", "C"])
+    joined = tree.join((0, 1), (1.0, 2.0))
+    tree.join((2, joined), (3.0, 0.5))
+    assert tree.toNewick() == "(C:3.0,(A:1.0,B:2.0):0.5):0.0"
+
 def test_ClusterUPGMA():
     # data from table 3 of Fitch and Margoliash, Construction of Phylogenetic trees
     taxa = ["Turtle", "Human", "Tuna", "Chicken", "Moth", "Monkey", "Dog"]
@@ -78,6 +394,9 @@ def test_ClusterUPGMA():
     digraph = cluster.upgma()
     newick = digraph.toNewick()
     assert newick == "(Moth:17.0,(Tuna:14.5,((Turtle:4.0,Chicken:4.0):4.25,(Dog:6.25,(Human:0.5,Monkey:0.5):5.75):2.0):6.25):2.5):0.0"
+    assert Cluster(distances, taxa).upgma(engine="python").toNewick() == newick
+    assert Cluster(distances, taxa).upgma(asTree=True).toNewick() == newick
+    assert np.array_equal(cluster.distMatrix, distances)
     
     taxa = ["A", "B", "C", "D"]
     distances = np.array(
@@ -107,6 +426,9 @@ def test_ClusterNJ():
     digraph = cluster.nj()
     newick = digraph.toNewick()
     assert newick == "((i:11.0,j:2.0):2.0,(k:6.0,l:7.0):2.0):0.0"
+    assert Cluster(distances, taxa).nj(engine="python").toNewick() == newick
+    assert Cluster(distances, taxa).nj(engine="rapid").toNewick() == newick
+    assert Cluster(distances, taxa).nj(engine="rapid", asTree=True).toNewick() == newick
     
     taxa = ["A", "B", "C", "D"]
     distances = np.array(
@@ -121,4 +443,134 @@ def test_ClusterNJ():
     digraph = cluster.nj()
     newick = digraph.toNewick()
     print(newick)
-    
\ No newline at end of file
+    
+    # Integer distances with many ties, large enough for the numpy engine to compact retired slots
+    rng = np.random.default_rng(0)
+    points = rng.integers(0, 4, (40, 3))
+    distances = np.abs(points[:, None] - points[None, :]).sum(axis=2)
+    taxa = [f"t{i}" for i in range(40)]
+    newick = Cluster(distances, taxa).nj(engine="python").toNewick()
+    assert Cluster(distances, taxa).nj().toNewick() == newick
+    assert Cluster(distances, taxa).nj(engine="rapid").toNewick() == newick
+    
+
+def test_HMM():
+    from itertools import product
+    hmm = HMM.fromNodes([
+        HMMNode("fair", {'A': 0.25, 'C': 0.25, 'G': 0.25, 'T': 0.25}, {"fair": 0.9, "rich": 0.1}, 0.5),
+        HMMNode("rich", {'A': 0.1, 'C': 0.4, 'G': 0.4, 'T': 0.1}, {"fair": 0.2, "rich": 0.8}, 0.5)
+    ])
+    sequence = NTSequence("ACGGCGTA", "A")
+    codes = sequence.codes
+    total, best, posterior = 0.0, (0.0, None), np.zeros((len(codes), 2))
+    for path in product(range(2), repeat=len(codes)):
+        probability = hmm.start[path[0]]*np.prod([hmm.emissions[k, code] for k, code in zip(path, codes)])
+        probability *= np.prod([hmm.transitions[i, j] for i, j in zip(path, path[1:])])
+        total += probability
+        posterior[np.arange(len(codes)), path] += probability
+        best = max(best, (probability, path))
+    for checkpoint in (False, True):
+        path, logProbability = hmm.viterbi(sequence, checkpoint)
+        assert path.tolist() == list(best[1]) and np.isclose(logProbability, np.log(best[0]))
+        assert np.array_equal(hmm.posteriorDecode("ACGGCGTA", checkpoint), posterior.argmax(axis=1))
+    assert np.isclose(hmm.logLikelihood(sequence), np.log(total))
+    assert np.allclose(hmm.posterior(sequence), posterior/total)
+
+    codes = np.random.default_rng(1).integers(0, 4, 10000)
+    assert np.array_equal(hmm.viterbi(codes)[0], hmm.viterbi(codes, checkpoint=True)[0])
+    assert np.array_equal(hmm.posteriorDecode(codes), hmm.posteriorDecode(codes, checkpoint=True))
+    alpha, scales = hmm.forward(codes)
+    assert np.isclose(np.log(scales).sum(), hmm.logLikelihood(codes))
+    with pytest.raises(InvalidHMMError):
+        HMM([0.5, 0.4], [[1, 0], [0, 1]], [[0.25]*4]*2)
+
+def test_HMMViterbiTies():
+    # One letter alphabet, every lane holds many equally good paths
+    for seed in (5, 9, 19):
+        rng = np.random.default_rng(seed)
+        start, transitions = rng.random(3), rng.random((3, 3))
+        hmm = HMM(start/start.sum(), transitions/transitions.sum(axis=1, keepdims=True), np.ones((3, 1)), alphabet=["A"])
+        codes = np.zeros(100, dtype=np.intp)
+        best = hmm.logStart.copy()
+        for _ in range(99):
+            best = (best[:, None] + hmm.logTransitions).max(axis=0)
+        for checkpoint in (False, True):
+            path, logProbability = hmm.viterbi(codes, checkpoint)
+            assert np.isclose(logProbability, best.max())
+            assert np.isclose(hmm.logStart[path[0]] + hmm.logTransitions[path[:-1], path[1:]].sum(), logProbability)
+
+def test_HMMBaumWelch():
+    rng = np.random.default_rng(2)
+    sequences = [rng.choice(4, size=int(length), p=[0.4, 0.1, 0.1, 0.4]) for length in rng.integers(1, 60, 40)]
+    sequences.append(np.tile([1, 2], 3000))
+    models = []
+    for workers in (1, 2):
+        transitions = np.array([[0.8, 0.2], [0.3, 0.7]])
+        hmm = HMM([0.5, 0.5], transitions, [[0.3, 0.2, 0.2, 0.3], [0.2, 0.3, 0.3, 0.2]])
+        calls = []
+        logLikelihoods = hmm.baumWelch(sequences, iterations=15, workers=workers, chunkSize=8,
+                                       progress=lambda iteration, logLikelihood: calls.append(iteration))
+        assert calls == list(range(1, len(logLikelihoods) + 1))
+        assert all(after >= before - 1e-6 for before, after in zip(logLikelihoods, logLikelihoods[1:]))
+        assert np.allclose(hmm.transitions.sum(axis=1), 1) and np.allclose(hmm.emissions.sum(axis=1), 1)
+        assert np.array_equal(transitions, [[0.8, 0.2], [0.3, 0.7]])
+        models.append((logLikelihoods, hmm.emissions))
+    assert np.allclose(models[0][0], models[1][0]) and np.allclose(models[0][1], models[1][1])
+    assert np.isclose(models[0][0][0], sum(HMM([0.5, 0.5], [[0.8, 0.2], [0.3, 0.7]], [[0.3, 0.2, 0.2, 0.3], [0.2, 0.3, 0.3, 0.2]]).logLikelihood(sequence)
+                                           for sequence in sequences))
+
+def test_ProfileHMM():
+    alignments = ["MKV-LAWG", "MKVQLAWG", "MRV-LSWG", "MKI-LAW-"]
+    msa = MSA.MSAData(["a", "b", "c", "d"], alignments, Tree(["a", "b", "c", "d"]))
+    profile = ProfileHMM.fromMSA(msa)
+    assert len(profile) == 7
+    assert np.allclose(profile.transitions[:-1].sum(axis=2)[:, :2], 1) and np.allclose(profile.match.sum(axis=1), 1)
+    # Only b inserts, between the third and fourth match states
+    assert profile.transitions[3, 0, 1] > profile.transitions[2, 0, 1]
+    assert profile.match[0].argmax() == Sequence.AMINO_ACIDS.index('M')
+
+    rng = np.random.default_rng(3)
+    targets = ["".join(rng.choice(list(Sequence.AMINO_ACIDS), int(length))) for length in rng.integers(1, 120, 40)]
+    targets[17] = targets[17][:30] + "MKVLAWG" + targets[17][30:]
+    targets[29] = AASequence("PPMKVQLSWGPP", "homolog")
+    viterbi = profile.viterbi(targets, batchSize=7)
+    assert np.allclose(viterbi, profile.viterbi(targets))
+    assert np.all(profile.msv(targets, batchSize=5) <= viterbi + 1e-9)
+    assert min(viterbi[17], viterbi[29]) > np.delete(viterbi, [17, 29]).max()
+    assert [index for index, _ in profile.search(targets, pValue=0.05, msvPValue=0.5)][:2] == [17, 29]
+    with pytest.raises(InvalidHMMError):
+        ProfileHMM.fromMSA(MSA.MSAData(["a", "b"], ["MKV", "MK"], Tree(["a", "b"])))
+
+def _decay(x, t, k, s):
+    return s - k*x
+
+def test_ModelSweep():
+    pytest.importorskip("scipy")
+    matplotlib = pytest.importorskip("matplotlib")
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from Model import Model
+    from Error import InvalidModelError
+    
+    initials, rates = Model.Grid([[1, 0], [0, 0], [2, 1]], [[0.5, 1.0], [1.0, 0.0]])
+    assert initials.shape == rates.shape == (6, 2)
+    assert initials[:3].tolist() == [[1, 0], [1, 0], [0, 0]]
+    assert rates[:3].tolist() == [[0.5, 1.0], [1.0, 0.0], [0.5, 1.0]]
+    
+    time = np.arange(0, 2, 0.1)
+    serial = Model.Sweep(_decay, initials, rates, 0, 2, 0.1, workers=1)
+    assert serial.shape == (6, 20, 2)
+    k, s = rates[:, None, :1], rates[:, None, 1:]
+    exact = s/k + (initials[:, None, :] - s/k)*np.exp(-k*time[None, :, None])
+    assert np.allclose(serial, exact, atol=1e-6)
+    assert np.allclose(Model.Sweep(_decay, initials, rates, 0, 2, 0.1, workers=2, chunkSize=2), serial)
+    assert np.allclose(Model.Sweep(_decay, initials, rates, 0, 2, 0.1, vectorized=True), serial, atol=1e-6)
+    assert np.allclose(Model.Sweep(_decay, [1, 0], rates, 0, 2, 0.1, workers=1), serial[[0, 1, 0, 1, 0, 1]])
+    with pytest.raises(InvalidModelError):
+        Model.Sweep(_decay, initials, rates[:2], 0, 2, 0.1)
+    
+    Model.PlotBehavior(time, serial, runs=[0, 3])
+    assert len(plt.gca().get_lines()) == 4
+    behavior = Model(np.eye(2), np.ones(2)).Behavior(lambda x, t: -x, [1, 2], 0, 1, 0.1, plot=False)
+    assert np.allclose(behavior[-1], np.exp(-0.9)*np.array([1, 2]), atol=1e-6)
+    plt.close("all")